@@ -0,0 +1,327 @@
+"""
+Command line interface of the electrode localization pipeline.
+
+Usage:
+    python src/cli.py localize --scan SCAN --texture TEXTURE --output OUTPUT [options]
+    python src/cli.py batch (--manifest CSV | --sessions-dir DIR) --output-dir DIR [options]
+    python src/cli.py cache (inspect | clear) [options]
+    python src/cli.py study --sessions-dir DIR --output OUTPUT [options]
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+from config.electrode_detector import DetectorParameters, DogParameters, HoughParameters
+from config.logger_config import setup_logger
+from config.pipeline import BatchParameters, StageCacheParameters
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    setup_logger(logging.DEBUG if args.verbose else logging.INFO)
+    return args.run(args)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="elk", description="Electrode Localization Kit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log debug messages")
+    commands = parser.add_subparsers(title="commands", required=True)
+
+    localize = commands.add_parser("localize", help="localize the electrodes of one session")
+    add_session_arguments(localize)
+    localize.add_argument("--output", required=True, help="electrode locations file (.ced/.csv)")
+    localize.add_argument("--save-session", help="also save the session to this .npz file")
+    add_parameter_arguments(localize)
+    add_cache_arguments(localize)
+    localize.set_defaults(run=run_localize)
+
+    batch = commands.add_parser("batch", help="localize the electrodes of many sessions")
+    sessions = batch.add_mutually_exclusive_group(required=True)
+    sessions.add_argument(
+        "--manifest",
+        help="CSV with a session_id column and a column per session file "
+        "(scan, texture, montage, seed_labels, mri, scan_fiducials, mri_fiducials)",
+    )
+    sessions.add_argument("--sessions-dir", help="directory with one subdirectory per session")
+    batch.add_argument("--output-dir", required=True, help="directory of the output and status")
+    batch.add_argument("--montage", help="reference electrode locations of all sessions")
+    batch.add_argument(
+        "--workers", type=int, default=BatchParameters.MAX_WORKERS, help="worker processes"
+    )
+    batch.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(0, 1),
+        help="run shard I of N sessions, as I/N, e.g. to split a batch over machines",
+    )
+    batch.add_argument("--retry-failed", action="store_true", help="rerun failed sessions")
+    batch.add_argument(
+        "--save-sessions", action="store_true", help="also save every session as .npz file"
+    )
+    add_parameter_arguments(batch)
+    add_cache_arguments(batch)
+    batch.set_defaults(run=run_batch)
+
+    study = commands.add_parser("study", help="per-label statistics of saved sessions")
+    study.add_argument("--sessions-dir", required=True, help="directory of saved .npz sessions")
+    study.add_argument("--output", required=True, help="statistics file (.csv)")
+    study.add_argument("--montage", help="report every label of this montage, even if missing")
+    study.add_argument(
+        "--unit-sphere",
+        action="store_true",
+        help="average the directions from the cap centroid instead of the positions",
+    )
+    study.set_defaults(run=run_study)
+
+    cache = commands.add_parser("cache", help="inspect or clear the stage cache")
+    cache_commands = cache.add_subparsers(title="cache commands", required=True)
+    inspect = cache_commands.add_parser("inspect", help="show the size of the cached stages")
+    inspect.add_argument("--cache-dir", default=StageCacheParameters.CACHE_DIR)
+    inspect.add_argument("--entries", action="store_true", help="list every entry")
+    inspect.set_defaults(run=run_cache_inspect)
+    clear = cache_commands.add_parser("clear", help="remove cached stage outputs")
+    clear.add_argument("--cache-dir", default=StageCacheParameters.CACHE_DIR)
+    clear.add_argument("--stage", help="remove the outputs of this stage only")
+    clear.set_defaults(run=run_cache_clear)
+
+    return parser
+
+
+def add_session_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--scan", required=True, help="head surface mesh (.obj/.ply)")
+    parser.add_argument("--texture", required=True, help="texture image of the head surface")
+    parser.add_argument("--montage", help="reference electrode locations (.ced/.csv/.tsv)")
+    parser.add_argument(
+        "--seed-labels", help="locations of at least three labeled electrodes, in scan units"
+    )
+    parser.add_argument("--mri", help="MRI head surface (.gii)")
+    parser.add_argument("--scan-fiducials", help="fiducial locations on the scan, in scan units")
+    parser.add_argument("--mri-fiducials", help="fiducial locations on the MRI surface")
+
+
+def add_parameter_arguments(parser: argparse.ArgumentParser) -> None:
+    detection = parser.add_argument_group("detection")
+    detection.add_argument(
+        "--detector",
+        default=DetectorParameters.METHOD,
+        choices=DetectorParameters.METHODS,
+        help="electrode detection method",
+    )
+    detection.add_argument("--ksize", type=int, default=DogParameters.KSIZE)
+    detection.add_argument("--sigma", type=float, default=DogParameters.SIGMA)
+    detection.add_argument("--factor", type=float, default=DogParameters.FACTOR)
+    detection.add_argument("--param1", type=float, default=HoughParameters.PARAM1)
+    detection.add_argument("--param2", type=float, default=HoughParameters.PARAM2)
+    detection.add_argument("--min-distance", type=int, default=HoughParameters.MIN_DISTANCE)
+    detection.add_argument("--min-radius", type=int, default=HoughParameters.MIN_RADIUS)
+    detection.add_argument("--max-radius", type=int, default=HoughParameters.MAX_RADIUS)
+    detection.add_argument(
+        "--sweep-hough",
+        action="store_true",
+        help="choose the Hough parameters by a sweep scored against the montage size",
+    )
+
+    labeling = parser.add_argument_group("labeling")
+    labeling.add_argument("--no-autolabel", action="store_true", help="skip montage labeling")
+    labeling.add_argument(
+        "--no-interpolate", action="store_true", help="skip interpolating missing electrodes"
+    )
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    cache = parser.add_argument_group("stage cache")
+    cache.add_argument(
+        "--cache-dir",
+        default=StageCacheParameters.CACHE_DIR,
+        help="directory of the stage outputs reused by later runs",
+    )
+    cache.add_argument("--no-cache", action="store_true", help="compute every stage")
+
+
+def get_stage_cache(args: argparse.Namespace):
+    from pipeline.stage_cache import StageCache
+
+    return None if args.no_cache else StageCache(args.cache_dir)
+
+
+def get_localization_inputs(args: argparse.Namespace):
+    from pipeline.localization import LocalizationInputs
+
+    return LocalizationInputs(
+        scan_file=args.scan,
+        texture_file=args.texture,
+        montage_file=args.montage,
+        seed_labels_file=args.seed_labels,
+        mri_file=args.mri,
+        scan_fiducials_file=args.scan_fiducials,
+        mri_fiducials_file=args.mri_fiducials,
+    )
+
+
+def get_localization_parameters(args: argparse.Namespace):
+    from pipeline.localization import LocalizationParameters
+
+    return LocalizationParameters(**get_parameter_values(args))
+
+
+def get_parameter_values(args: argparse.Namespace) -> dict:
+    """Returns the keyword arguments of LocalizationParameters given on the command line."""
+    return {
+        "detector_method": args.detector,
+        "ksize": args.ksize,
+        "sigma": args.sigma,
+        "F": args.factor,
+        "param1": args.param1,
+        "param2": args.param2,
+        "min_distance_between_circles": args.min_distance,
+        "min_radius": args.min_radius,
+        "max_radius": args.max_radius,
+        "sweep_hough": args.sweep_hough,
+        "autolabel": not args.no_autolabel,
+        "interpolate": not args.no_interpolate,
+    }
+
+
+def run_localize(args: argparse.Namespace) -> int:
+    # the processing stack is imported only once the arguments are known to be valid
+    from pipeline.localization import localize_session
+
+    try:
+        result = localize_session(
+            get_localization_inputs(args),
+            get_localization_parameters(args),
+            args.output,
+            get_stage_cache(args),
+            args.save_session,
+        )
+    except (OSError, ValueError) as error:
+        logger.error(f"Localization failed: {error}")
+        return 1
+
+    logger.info(
+        f"Localized {result.detected_count} electrodes "
+        f"({result.labeled_count} labeled, {result.interpolated_count} interpolated) "
+        f"to {args.output}"
+    )
+    return 0
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    from pipeline.batch import BatchRunner, discover_sessions, read_session_manifest
+
+    try:
+        if args.manifest is not None:
+            sessions = read_session_manifest(args.manifest, args.montage)
+        else:
+            sessions = discover_sessions(args.sessions_dir, args.montage)
+
+        shard_index, shard_count = args.shard
+        runner = BatchRunner(
+            args.output_dir,
+            get_parameter_values(args),
+            max_workers=args.workers,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            retry_failed=args.retry_failed,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            save_sessions=args.save_sessions,
+        )
+        summary = runner.run(sessions)
+    except (OSError, ValueError, KeyError) as error:
+        logger.error(f"Batch failed: {error}")
+        return 1
+
+    logger.info(
+        f"Batch finished in {summary.seconds:.1f} s: {len(summary.completed)} completed, "
+        f"{len(summary.failed)} failed, {len(summary.skipped)} skipped"
+    )
+    return 0 if len(summary.failed) == 0 else 1
+
+
+def run_study(args: argparse.Namespace) -> int:
+    from data.loader import load_electrodes_from_file
+    from data_models.study import Study
+
+    try:
+        study = Study.from_directory(args.sessions_dir)
+        labels = None
+        if args.montage is not None:
+            labels = [electrode.label for electrode in load_electrodes_from_file(args.montage)]
+
+        statistics = study.compute_label_statistics(labels, unit_sphere=args.unit_sphere)
+        statistics.to_dataframe().to_csv(args.output, index=False)
+    except (OSError, ValueError) as error:
+        logger.error(f"Study statistics failed: {error}")
+        return 1
+
+    logger.info(
+        f"Wrote statistics of {len(statistics.labels)} labels "
+        f"over {statistics.session_count} sessions to {args.output}"
+    )
+    return 0
+
+
+def run_cache_inspect(args: argparse.Namespace) -> int:
+    from pipeline.stage_cache import StageCache
+
+    cache = StageCache(args.cache_dir)
+    entries = sorted(cache.get_entries(), key=lambda entry: entry.last_used, reverse=True)
+
+    if args.entries:
+        for entry in entries:
+            last_used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.last_used))
+            print(f"{entry.key}  {entry.stage:<12} {format_size(entry.nbytes):>10}  {last_used}")
+        print()
+
+    stages = {}
+    for entry in entries:
+        count, nbytes = stages.get(entry.stage, (0, 0))
+        stages[entry.stage] = (count + 1, nbytes + entry.nbytes)
+    for stage, (count, nbytes) in sorted(stages.items()):
+        print(f"{stage:<12} {count:>6} entries {format_size(nbytes):>10}")
+
+    total_bytes = sum(entry.nbytes for entry in entries)
+    print(
+        f"{'total':<12} {len(entries):>6} entries {format_size(total_bytes):>10} "
+        f"of {format_size(cache.max_bytes)} in {cache.cache_dir}"
+    )
+    return 0
+
+
+def run_cache_clear(args: argparse.Namespace) -> int:
+    from pipeline.stage_cache import StageCache
+
+    removed = StageCache(args.cache_dir).clear(args.stage)
+    logger.info(
+        f"Removed {len(removed)} entries "
+        f"({format_size(sum(entry.nbytes for entry in removed))}) from {args.cache_dir}"
+    )
+    return 0
+
+
+def format_size(nbytes: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if nbytes < 1024:
+            return f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} GiB"
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    try:
+        shard_index, shard_count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}") from None
+    if not 0 <= shard_index < shard_count:
+        raise argparse.ArgumentTypeError(f"shard {shard_index} is not in 0..{shard_count - 1}")
+    return shard_index, shard_count
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,23 @@
 Electrode detector configuration file
 """
 
+import os
+import tempfile
+
 
 class DogParameters:
     KSIZE = 39
     SIGMA = 16
     FACTOR = 1.1
     THRESHOLD_LEVEL = 1
+    # DoG filtering strategy: "auto", "separable" or "filter2d"
+    METHOD = "auto"
+    # kernel sizes for which separable filtering beats the dense kernel, from the measured
+    # crossovers on a 4096x4096 texture: OpenCV convolves the dense kernel directly up to
+    # ksize 11 (9: 0.22 s dense vs 0.17 s separable) and through the DFT from ksize 13,
+    # which is faster from ksize 15 on (15: 0.18 s vs 0.21 s, 39: 0.23 s vs 0.43 s)
+    SEPARABLE_MIN_KSIZE = 9
+    SEPARABLE_MAX_KSIZE = 13
 
 
 class HoughParameters:
@@ -16,3 +27,84 @@ class HoughParameters:
     MIN_DISTANCE = 68
     MIN_RADIUS = 13
     MAX_RADIUS = 16
+
+
+class BlobParameters:
+    # blob radii are accepted within this relative margin around the Hough radius window
+    RADIUS_TOLERANCE = 0.2
+    # blob area relative to the disc spanning its bounding box
+    MIN_CIRCULARITY = 0.5
+
+
+class ScaleSpaceParameters:
+    # gaussian scale of an electrode of the given Hough radius; calibrated on the dark
+    # centres of the electrode holders, which are smaller than the detected circles
+    RADIUS_TO_SIGMA = 0.5
+    SCALES_PER_OCTAVE = 4
+    # minimum DoG response in gray levels
+    THRESHOLD = 8
+    # the scale space is built on the coarsest pyramid level keeping sigmas above this
+    MIN_SIGMA = 1.6
+
+
+class DetectorParameters:
+    # electrode detectors, in the order the texture tab lists them
+    METHODS = ("hough", "blob", "scale_space")
+    # electrode detector used by the application
+    METHOD = "hough"
+
+
+class UVMappingParameters:
+    METHOD = "raster"
+    RASTER_CHUNK_PIXELS = 2**22
+    EDGE_TOLERANCE = 1e-6
+
+
+class ROIParameters:
+    # restrict detection to the texels covered by the mesh
+    ENABLED = True
+    # additionally restrict detection to cap colored texels
+    COLOR_MASK = False
+    CAP_LOWER_HSV = (0, 0, 150)
+    CAP_UPPER_HSV = (180, 60, 255)
+    # growth of the mask in full resolution pixels, larger than an electrode diameter
+    MARGIN = 32
+    # DoG is only computed on tiles of this size that overlap the mask
+    TILE_SIZE = 512
+
+
+class CacheParameters:
+    # memory budget of the DoG/Hough intermediate image cache
+    MAX_BYTES = 512 * 1024**2
+    # memory budget of the decoded textures shared by the detector and the head scan
+    TEXTURE_MAX_BYTES = 1024**3
+
+
+class PreviewParameters:
+    # quiet period after the last parameter change before the preview is recomputed
+    DEBOUNCE_MS = 150
+    # previews run on a downsampled pyramid level, but circle radii are kept above this
+    MIN_LEVEL_RADIUS = 5
+    # scaled preview pixmaps kept for redisplay on resizes and tab switches
+    MAX_CACHED_PIXMAPS = 8
+
+
+class HoughSweepParameters:
+    # candidate values evaluated by the Hough parameter sweep
+    PARAM1 = (3, 5, 7)
+    PARAM2 = (5, 7, 9)
+    MIN_DISTANCE = (48, 58, 68, 78)
+    # (min radius, max radius) pairs
+    RADII = ((11, 14), (13, 16), (15, 18))
+    # None uses all available cores
+    MAX_WORKERS = None
+
+
+class TilingParameters:
+    # textures with more pixels are memory-mapped and detected on tiles
+    MIN_PIXELS = 8192 * 8192
+    TILE_SIZE = 2048
+    # None uses as many threads as available cores
+    MAX_WORKERS = None
+    # decoded textures are memory-mapped from .npy files in this directory
+    CACHE_DIR = os.path.join(tempfile.gettempdir(), "elk", "textures")
@@ -6,3 +6,19 @@ Electrode labeling configuration file
 class ElasticAlignmentParameters:
     cutoff_deg = 30
     slope = 0.1
+
+
+class AutolabelParameters:
+    # correspondence factor thresholds, applied from the most to the least strict
+    threshold_start = 0.1
+    threshold_stop = 0.5
+    threshold_step = 0.05
+    # labeled measured electrodes needed to register the reference electrodes
+    min_labeled_electrodes = 3
+
+
+class HistoryParameters:
+    # undoable cap model operations, the oldest are dropped first
+    max_operations = 1000
+    # electrode rows the kept operations may record, which bounds the history memory
+    max_rows = 100_000
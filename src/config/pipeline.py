@@ -0,0 +1,36 @@
+"""
+Headless pipeline configuration file
+"""
+
+import os
+
+
+class BatchParameters:
+    # worker processes of a batch run; None uses all available cores
+    MAX_WORKERS = None
+    # per-session status records are kept in this directory of the output directory
+    STATUS_DIR = "batch_status"
+    # extension of the written electrode locations files
+    OUTPUT_EXTENSION = ".ced"
+    # extension of the saved sessions
+    SESSION_EXTENSION = ".npz"
+
+    # file name patterns of a session directory
+    SCAN_PATTERNS = ("*.obj", "*.ply")
+    TEXTURE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.tif", "*.tiff")
+    MRI_PATTERNS = ("*.gii",)
+    MONTAGE_PATTERNS = ("montage.*",)
+    SEED_LABELS_PATTERNS = ("seed_labels.*",)
+    SCAN_FIDUCIALS_PATTERNS = ("scan_fiducials.*",)
+    MRI_FIDUCIALS_PATTERNS = ("mri_fiducials.*",)
+
+
+class StageCacheParameters:
+    # stage outputs are stored in this directory, one subdirectory per entry
+    CACHE_DIR = os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+        "elk",
+        "stages",
+    )
+    # the least recently used entries are evicted above this size
+    MAX_BYTES = 8 * 1024**3
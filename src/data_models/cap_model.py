@@ -1,6 +1,5 @@
-import copy
+import contextlib
 from collections.abc import Iterable
-from queue import LifoQueue
 
 import numpy as np
 import vedo as vd
@@ -11,99 +10,98 @@ from config.sizes import ElectrodeSizes
 from data.exporter import export_electrodes_to_file
 from data.loader import load_electrodes_from_file
 from data_models.electrode import Electrode
+from data_models.electrode_store import ElectrodeStore
+from utils.spatial_index import UniformGridIndex
 
 
 class CapModel(QAbstractTableModel):
-    """CapModel class for displaying a list of electrodes in a Qt application."""
+    """
+    CapModel class for displaying a list of electrodes in a Qt application.
+
+    The electrodes are kept in a columnar ElectrodeStore, so that selections are array
+    masks; the electrodes returned by the model are views of its rows. Closest-electrode
+    and spacing queries go through a grid index per modality, rebuilt on the first query
+    after the electrodes changed.
+
+    Changes are recorded in the bounded history of the store: `undo` and `redo` revert and
+    repeat single operations, and data snapshots are checkpoints of the history, so that
+    restoring one reverts only the changes made since. A snapshot that would keep the
+    history over its limits keeps a copy of the data it marks instead.
+    """
 
     def __init__(self):
         super().__init__()
-        self._data = []
+        self._store = ElectrodeStore()
         self._labels = []
 
         self.correspondence = []
 
         # define Electrode class attributes to display in the table
         self._display_keys = ("label", "modality")
-        self._data_snapshots = LifoQueue()
+
+        # (modality, include_fiducials) -> (store version, rows, index)
+        self._spatial_indexes = {}
+
+    @property
+    def store(self) -> ElectrodeStore:
+        return self._store
 
     def set_labels(self, labels: list) -> None:
         self._labels = labels
 
     def rowCount(self, parent=QModelIndex()) -> int:
-        return len(self._data)
+        return len(self._store)
 
     def columnCount(self, parent=QModelIndex()) -> int:
         return len(self._display_keys)
 
     def get_electrode(self, index: int) -> Electrode:
-        return self._data[index]
+        return self._store.get_view(index)
 
     def set_electrode_labeled_flag(self, index: int, labeled: bool) -> None:
-        self._data[index].labeled = labeled
+        self._store.set_rows([index], "labeled", labeled)
 
     def get_labeled_electrodes(self, modality: list[str]) -> list[Electrode]:
-        return [
-            electrode
-            for electrode in self._data
-            if electrode.labeled and electrode.modality in modality and not electrode.fiducial
-        ]
+        return self._store.get_views_by_mask(
+            self._get_modality_mask(modality) & self._store.get_column("labeled")
+        )
 
     def get_unlabeled_electrodes(self, modality: list[str]) -> list[Electrode]:
-        return [
-            electrode
-            for electrode in self._data
-            if not electrode.labeled and electrode.modality in modality and not electrode.fiducial
-        ]
+        return self._store.get_views_by_mask(
+            self._get_modality_mask(modality) & ~self._store.get_column("labeled")
+        )
 
     def get_unaligned_electrodes(self, modality: list[str]) -> list[Electrode]:
-        return [
-            electrode
-            for electrode in self._data
-            if not electrode.aligned and electrode.modality in modality and not electrode.fiducial
-        ]
+        return self._store.get_views_by_mask(
+            self._get_modality_mask(modality) & ~self._store.get_column("aligned")
+        )
 
     def get_electrodes_by_modality(
         self, modality: list[str], include_fiducials: bool = False
     ) -> list[Electrode]:
-        return [
-            electrode
-            for electrode in self._data
-            if electrode.modality in modality and (not electrode.fiducial or include_fiducials)
-        ]
+        return self._store.get_views_by_mask(self._get_modality_mask(modality, include_fiducials))
 
     def get_fiducials(self, modality: list[str]) -> list[Electrode]:
-        return [
-            electrode
-            for electrode in self._data
-            if electrode.modality in modality and electrode.fiducial
-        ]
+        return self._store.get_views_by_mask(
+            self._store.get_modality_mask(modality) & self._store.get_column("fiducial")
+        )
 
     def get_interpolated_electrodes(self) -> list[Electrode]:
-        return [electrode for electrode in self._data if electrode.interpolated]
+        return self._store.get_views_by_mask(self._store.get_column("interpolated"))
 
     def get_electrode_by_object_id(self, object_id: int) -> Electrode | None:
-        electrodes = [electrode for electrode in self._data if id(electrode) == object_id]
-        if len(electrodes) == 1:
-            return electrodes[0]
-        return None
+        return self._store.get_view_by_object_id(object_id)
 
     def get_electrode_by_label_and_modality(self, label: str, modality: str) -> Electrode | None:
-        electrodes = [
-            electrode
-            for electrode in self._data
-            if electrode.label == label
-            and electrode.modality == modality
-            and not electrode.fiducial
-        ]
-        if len(electrodes) == 1:
-            return electrodes[0]
+        electrode_ids = self._store.get_ids_by_label(label, modality)
+        if len(electrode_ids) == 1:
+            return self._store.get_view_by_id(next(iter(electrode_ids)))
         return None
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole) -> str | None:
         if index.isValid():
             if role == Qt.ItemDataRole.DisplayRole or role == Qt.ItemDataRole.EditRole:
-                value = self._data[index.row()][self._display_keys[index.column()]]
+                value = self.get_electrode(index.row())[self._display_keys[index.column()]]
                 return str(value)
 
     def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole) -> str | None:
@@ -112,48 +110,62 @@ class CapModel(QAbstractTableModel):
         return super().headerData(section, orientation, role)
 
     def insert_electrode(self, electrode: Electrode, parent=QModelIndex()) -> None:
-        distances = self._calculate_distances(
-            electrode.coordinates, electrode.modality, include_fiducials=True
-        )
-
-        minimal_size = ElectrodeSizes.HEADSCAN_ELECTRODE_SIZE / 2
-        if electrode.modality == ModalitiesMapping.MRI:
-            minimal_size = ElectrodeSizes.MRI_ELECTRODE_SIZE / 2
-        elif electrode.modality == ModalitiesMapping.REFERENCE:
-            minimal_size = ElectrodeSizes.LABEL_ELECTRODE_SIZE / 2
-
-        too_close_electrodes = [d[0] for d in distances if (d[1] < minimal_size)]
-
-        if len(too_close_electrodes) > 0:
-            return
-
-        self.beginInsertRows(parent, self.rowCount(), self.rowCount())
-        self._data.append(electrode)
-        self.endInsertRows()
+        self.insert_electrodes([electrode], parent)
+
+    def insert_electrodes(self, electrodes: list[Electrode], parent=QModelIndex()) -> int:
+        """
+        Inserts the electrodes that keep the minimal spacing of their modality to the
+        electrodes of the cap and to the electrodes inserted before them, with a single row
+        insertion notification; returns the number inserted.
+        """
+        if len(electrodes) == 0:
+            return 0
+
+        coordinates = np.array([electrode.coordinates for electrode in electrodes], np.float64)
+        modalities = np.array([electrode.modality for electrode in electrodes], dtype=object)
+        accepted = np.ones(len(electrodes), dtype=bool)
+
+        for modality in set(modalities):
+            batch = np.flatnonzero(modalities == modality)
+            minimal_size = _get_minimal_spacing(modality)
+
+            # too close to an electrode already in the cap
+            _, index = self._get_spatial_index(modality, include_fiducials=True)
+            too_close, _ = index.query_radius(coordinates[batch], minimal_size)
+            accepted[batch[too_close]] = False
+
+            # too close to an earlier electrode of the batch that is inserted
+            if len(batch) < 2:
+                continue
+            i, j = UniformGridIndex(coordinates[batch], cell_size=minimal_size).query_pairs(
+                minimal_size
+            )
+            order = np.lexsort((i, j))
+            for first, second in zip(batch[i[order]], batch[j[order]]):
+                if accepted[first]:
+                    accepted[second] = False
+
+        inserted = [electrode for electrode, keep in zip(electrodes, accepted) if keep]
+        if len(inserted) > 0:
+            self.beginInsertRows(parent, self.rowCount(), self.rowCount() + len(inserted) - 1)
+            self._store.extend(inserted)
+            self.endInsertRows()
+        return len(inserted)
 
     def compute_centroid(self):
-        measured_electrodes = self.get_electrodes_by_modality(
-            [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI]
-        )
-        coordinates = [
-            electrode.coordinates for electrode in measured_electrodes if not electrode.fiducial
-        ]
-        centroid = np.mean(coordinates, axis=0)  # type: ignore
-
-        for electrode in measured_electrodes:
-            electrode.cap_centroid = centroid
-
-        reference_electrodes = self.get_electrodes_by_modality([ModalitiesMapping.REFERENCE])
-        coordinates = [electrode.coordinates for electrode in reference_electrodes]
-        centroid = np.mean(coordinates, axis=0)  # type: ignore
-
-        for electrode in reference_electrodes:
-            electrode.cap_centroid = centroid
+        fiducial = self._store.get_column("fiducial")
+        with self.operation():
+            for modalities in (
+                [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI],
+                [ModalitiesMapping.REFERENCE],
+            ):
+                electrodes = np.flatnonzero(self._store.get_modality_mask(modalities) & ~fiducial)
+                if len(electrodes) > 0:
+                    centroid = np.mean(self._store.coordinates[electrodes], axis=0)
+                    self._store.set_rows(electrodes, "cap_centroid", centroid)
 
     def read_electrodes_from_file(self, filename: str) -> None:
-        electrodes = load_electrodes_from_file(filename)
-        for electrode in electrodes:
-            self.insert_electrode(electrode)
+        self.insert_electrodes(load_electrodes_from_file(filename))
 
     def save_electrodes_to_file(self, filename: str) -> None:
         measured_electrodes = self.get_electrodes_by_modality(
@@ -168,87 +180,188 @@ class CapModel(QAbstractTableModel):
             export_electrodes_to_file(measured_electrodes, filename)
 
     def remove_electrode(self, elecrode_hash: int, parent=QModelIndex()) -> None:
-        self.beginRemoveRows(parent, self.rowCount(), self.rowCount())
-        self._data = [electrode for electrode in self._data if hash(electrode) != elecrode_hash]
-        self.endRemoveRows()
+        electrode = self.get_electrode_by_object_id(elecrode_hash)
+        if electrode is not None:
+            self._remove_rows([self.get_electrode_id(electrode)], parent)
 
     def get_electrode_id(self, electrode: Electrode) -> int:
-        return self._data.index(electrode)
-
-    def _calculate_distances(
-        self, target_coordinates: Iterable[float], modality, include_fiducials: bool = False
-    ) -> list[tuple[int, float]]:
-        """Calculates the distances between the given point and all points in the electrode cap."""
-        distances = []
-        for electrode in self.get_electrodes_by_modality([modality], include_fiducials):
-            point = np.array(electrode.coordinates)
-            dist = np.linalg.norm(point - target_coordinates)
-            distances.append((hash(electrode), dist))
-        return sorted(distances, key=lambda x: x[0])
+        if electrode._store is not self._store:
+            raise ValueError(f"{electrode} is not in the cap model")
+        return self._store.get_row(electrode._electrode_id)
+
+    def _get_spatial_index(
+        self, modality: str, include_fiducials: bool = False
+    ) -> tuple[np.ndarray, UniformGridIndex]:
+        """Returns the rows of the electrodes of a modality and a grid index over them."""
+        key = (modality, include_fiducials)
+        cached = self._spatial_indexes.get(key)
+        if cached is None or cached[0] != self._store.version:
+            rows = np.flatnonzero(self._get_modality_mask([modality], include_fiducials))
+            # cells of the electrode spacing keep the spacing checks to 27 cells per query
+            index = UniformGridIndex(
+                self._store.coordinates[rows], cell_size=_get_minimal_spacing(modality)
+            )
+            cached = (self._store.version, rows, index)
+            self._spatial_indexes[key] = cached
+        return cached[1], cached[2]
+
+    def _find_closest_row(
+        self, target_coordinates: Iterable[float], modality: str, include_fiducials: bool = False
+    ) -> int | None:
+        rows, index = self._get_spatial_index(modality, include_fiducials)
+        _, closest = index.query_nearest(np.asarray(target_coordinates, dtype=np.float64))
+        if closest[0] < 0:
+            return None
+        return int(rows[closest[0]])
 
     def remove_closest_electrode(
         self, target_coordinates: Iterable[float], modality: str, include_fiducials: bool = False
     ) -> None:
         """Removes the point in the electrode cap closest to the given point."""
-        distances = self._calculate_distances(target_coordinates, modality, include_fiducials)
-
-        # remove the point with the smallest distance
-        if len(distances) > 0:
-            min_distance = min(distances, key=lambda x: x[1])
-            self.remove_electrode(min_distance[0])
+        row = self._find_closest_row(target_coordinates, modality, include_fiducials)
+        if row is not None:
+            self._remove_rows([row])
 
     def label_closest_electrode(
         self, target_coordinates: Iterable[float], label: str, modality: str
     ) -> None:
         """Labels the point in the electrode cap closest to the given point."""
-        distances = self._calculate_distances(target_coordinates, modality)
-
-        if len(distances) > 0:
-            min_distance = min(distances, key=lambda x: x[1])
-            for electrode in self._data:
-                if hash(electrode) == min_distance[0]:
-                    electrode.label = label
-                    electrode.labeled = True
+        row = self._find_closest_row(target_coordinates, modality)
+        if row is not None:
+            with self.operation():
+                self._store.set_rows([row], "label", label)
+                self._store.set_rows([row], "labeled", True)
 
     def transform_electrodes(self, modality: str, A: np.ndarray) -> None:
         """Applies a transformation to all electrodes in the cap."""
-        for electrode in self._data:
-            if electrode.modality == modality:
-                electrode.apply_transformation(A)
+        electrodes = self._store.get_modality_mask([modality])
+        coordinates = self._store.coordinates[electrodes]
+        homogeneous = np.column_stack([coordinates, np.ones(len(coordinates))])
+        self._store.set_rows(
+            np.flatnonzero(electrodes), "coordinates", (homogeneous @ np.asarray(A).T)[:, :3]
+        )
 
     def project_electrodes_to_mesh(
         self, mesh: vd.Mesh, modality_from: str, modality_to: str
     ) -> None:
         """Projects all electrodes in the cap to the given mesh."""
-        for electrode in self._data:
-            if electrode.modality == modality_from:
-                electrode.project_to_mesh(mesh)
-                electrode.modality = modality_to
+        rows = np.flatnonzero(self._store.get_modality_mask([modality_from]))
+        coordinates = self._store.coordinates[rows]
+        for i, point in enumerate(coordinates):
+            closest_point = mesh.closest_point(point)
+            if isinstance(closest_point, np.ndarray):
+                coordinates[i] = closest_point
+        with self.operation():
+            self._store.set_rows(rows, "coordinates", coordinates)
+            self._store.set_rows(rows, "modality", modality_to)
 
     def clear(self) -> None:
         self.beginResetModel()
-        self._data = []
+        self._store.clear()
         self.endResetModel()
 
     def clear_electrodes_by_modality(self, modality: str) -> None:
         self.beginResetModel()
-        self._data = [electrode for electrode in self._data if electrode.modality != modality]
+        self._store.remove(np.flatnonzero(self._store.get_modality_mask([modality])))
         self.endResetModel()
 
+    def get_electrode_arrays(self) -> dict[str, np.ndarray]:
+        """Returns all electrodes as columnar arrays."""
+        return self._store.get_arrays()
+
+    def set_electrode_arrays(self, arrays: dict[str, np.ndarray]) -> None:
+        """Replaces all electrodes with the ones stored in columnar arrays."""
+        self.beginResetModel()
+        self._store.set_arrays(arrays)
+        # suggestions refer to the replaced electrodes
+        self.correspondence = []
+        self.endResetModel()
+
+    def get_correspondence_arrays(self) -> dict[str, np.ndarray]:
+        """Returns the suggested labels as columns, electrodes given by their row."""
+        return {
+            "row": np.array(
+                [self.get_electrode_id(entry["electrode"]) for entry in self.correspondence],
+                dtype=np.int64,
+            ),
+            "factor": np.array(
+                [entry["factor"] for entry in self.correspondence], dtype=np.float64
+            ),
+            "suggested_label": np.array(
+                [entry["suggested_label"] for entry in self.correspondence], dtype=str
+            ),
+        }
+
+    def set_correspondence_arrays(self, arrays: dict[str, np.ndarray]) -> None:
+        self.correspondence = [
+            {
+                "electrode": self._store.get_view(int(row)),
+                "factor": float(factor),
+                "suggested_label": str(suggested_label),
+            }
+            for row, factor, suggested_label in zip(
+                arrays["row"], arrays["factor"], arrays["suggested_label"]
+            )
+        ]
+
+    def operation(self) -> contextlib.AbstractContextManager:
+        """Groups the changes made within into one operation of the undo history."""
+        return self._store.operation()
+
+    def undo(self) -> bool:
+        self.beginResetModel()
+        undone = self._store.undo()
+        self.endResetModel()
+        return undone
+
+    def redo(self) -> bool:
+        self.beginResetModel()
+        redone = self._store.redo()
+        self.endResetModel()
+        return redone
+
     def make_data_snapshot(self) -> None:
-        self._data_snapshots.put(copy.deepcopy(self._data))
+        self._store.history.add_checkpoint()
 
-    def restore_data_snapshot(self) -> None:
+    def restore_data_snapshot(self) -> bool:
+        """
+        Returns exactly to the data of the last snapshot; returns False, without changing
+        anything, if there is no snapshot or it cannot be reached anymore.
+        """
         self.beginResetModel()
-        self._data = copy.deepcopy(self._data_snapshots.get())
+        restored = self._store.restore_checkpoint()
         self.endResetModel()
+        return restored
 
     def setData(self, index, value, role) -> bool:
         if role == Qt.ItemDataRole.EditRole:
-            self._data[index.row()][self._display_keys[index.column()]] = value
+            self.get_electrode(index.row())[self._display_keys[index.column()]] = value
             self.dataChanged.emit(index, index)
             return True
         return False
 
     def flags(self, index) -> Qt.ItemFlag:
         return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsEditable
+
+    def _get_modality_mask(
+        self, modality: Iterable[str], include_fiducials: bool = False
+    ) -> np.ndarray:
+        mask = self._store.get_modality_mask(modality)
+        if not include_fiducials:
+            mask &= ~self._store.get_column("fiducial")
+        return mask
+
+    def _remove_rows(self, rows: list[int], parent=QModelIndex()) -> None:
+        with self.operation():
+            for row in sorted(rows, reverse=True):
+                self.beginRemoveRows(parent, row, row)
+                self._store.remove([row])
+                self.endRemoveRows()
+
+
+def _get_minimal_spacing(modality: str) -> float:
+    if modality == ModalitiesMapping.MRI:
+        return ElectrodeSizes.MRI_ELECTRODE_SIZE / 2
+    if modality == ModalitiesMapping.REFERENCE:
+        return ElectrodeSizes.LABEL_ELECTRODE_SIZE / 2
+    return ElectrodeSizes.HEADSCAN_ELECTRODE_SIZE / 2
@@ -2,26 +2,99 @@ import pandas as pd
 import numpy as np
 import vedo as vd
 
-from dataclasses import dataclass
-
 from utils.spatial import (
     compute_unit_spherical_coordinates_from_cartesian,
     compute_cartesian_coordinates_from_unit_spherical,
 )
 
 
-@dataclass
+class _StoredAttribute:
+    """An electrode attribute, read from its store row while the electrode is in a store."""
+
+    def __init__(self, column: str):
+        self.column = column
+
+    def __get__(self, electrode, owner=None):
+        if electrode is None:
+            return self
+        if electrode._store is None:
+            return electrode._values[self.column]
+        return electrode._store.get_value(electrode._electrode_id, self.column)
+
+    def __set__(self, electrode, value):
+        if electrode._store is None:
+            electrode._values[self.column] = value
+        else:
+            electrode._store.set_value(electrode._electrode_id, self.column, value)
+
+
 class Electrode:
-    coordinates: np.ndarray
-    modality: str
-    label: str | None = None
-    labeled: bool = False
-    interpolated: bool = False
-    fiducial: bool = False
-    _cap_centroid: np.ndarray | None = None
-    _mapped_to_unit_sphere: bool = False
-    _aligned: bool = False
-    _interpolated_unit_sphere_coordinates: np.ndarray | None = None
+    """
+    A measured, reference or interpolated electrode.
+
+    Electrodes in a CapModel are views of a row of its ElectrodeStore: their attributes
+    read and write the store columns. Electrodes outside of a store hold their own values.
+    """
+
+    coordinates = _StoredAttribute("coordinates")
+    modality = _StoredAttribute("modality")
+    label = _StoredAttribute("label")
+    labeled = _StoredAttribute("labeled")
+    interpolated = _StoredAttribute("interpolated")
+    fiducial = _StoredAttribute("fiducial")
+    aligned = _StoredAttribute("aligned")
+    cap_centroid = _StoredAttribute("cap_centroid")
+    interpolated_unit_sphere_coordinates = _StoredAttribute("interpolated_unit_sphere_coordinates")
+    _mapped_to_unit_sphere = _StoredAttribute("mapped_to_unit_sphere")
+
+    def __init__(
+        self,
+        coordinates: np.ndarray,
+        modality: str,
+        label: str | None = None,
+        labeled: bool = False,
+        interpolated: bool = False,
+        fiducial: bool = False,
+        _cap_centroid: np.ndarray | None = None,
+        _mapped_to_unit_sphere: bool = False,
+        _aligned: bool = False,
+        _interpolated_unit_sphere_coordinates: np.ndarray | None = None,
+    ):
+        self._store = None
+        self._electrode_id = None
+        self._values = {
+            "coordinates": np.asarray(coordinates, dtype=np.float64),
+            "modality": modality,
+            "label": label,
+            "labeled": labeled,
+            "interpolated": interpolated,
+            "fiducial": fiducial,
+            "aligned": _aligned,
+            "cap_centroid": _cap_centroid,
+            "interpolated_unit_sphere_coordinates": _interpolated_unit_sphere_coordinates,
+            "mapped_to_unit_sphere": _mapped_to_unit_sphere,
+        }
+
+    @classmethod
+    def _create_view(cls, store, electrode_id: int) -> "Electrode":
+        electrode = cls.__new__(cls)
+        electrode._attach(store, electrode_id)
+        return electrode
+
+    def _attach(self, store, electrode_id: int) -> None:
+        self._store = store
+        self._electrode_id = electrode_id
+        self._values = None
+
+    def _detach(self, values: dict) -> None:
+        self._store = None
+        self._electrode_id = None
+        self._values = values
+
+    def _get_values(self) -> dict:
+        if self._store is None:
+            return dict(self._values)
+        return self._store.get_values(self._electrode_id)
 
     @property
     def keys(self):
@@ -37,8 +110,9 @@ class Electrode:
     def unit_sphere_cartesian_coordinates(self) -> np.ndarray:
         """Returns the electrode's cartesian coordinates in the unit sphere."""
 
-        if self._interpolated_unit_sphere_coordinates is not None:
-            return self._interpolated_unit_sphere_coordinates
+        interpolated_coordinates = self.interpolated_unit_sphere_coordinates
+        if interpolated_coordinates is not None:
+            return interpolated_coordinates
 
         if not self._mapped_to_unit_sphere:
             theta, phi = self._compute_unit_sphere_spherical_coordinates()
@@ -47,22 +121,6 @@ class Electrode:
             unit_sphere_coordinates = self.coordinates
         return unit_sphere_coordinates
 
-    @property
-    def aligned(self) -> bool:
-        return self._aligned
-
-    @aligned.setter
-    def aligned(self, value: bool):
-        self._aligned = value
-
-    @property
-    def cap_centroid(self):
-        return self._cap_centroid
-
-    @cap_centroid.setter
-    def cap_centroid(self, centroid: np.ndarray):
-        self._cap_centroid = centroid
-
     @spherical_coordinates.setter
     def spherical_coordinates(self, coordinates: np.ndarray):
         """Sets the electrode's spherical coordinates."""
@@ -79,8 +137,9 @@ class Electrode:
     def _compute_unit_sphere_spherical_coordinates(self) -> tuple[float, float]:
         """Computes the spherical coordinates of the electrode."""
         # compute centroid of the mesh
-        if self._cap_centroid is not None:
-            origin = self._cap_centroid
+        cap_centroid = self.cap_centroid
+        if cap_centroid is not None:
+            origin = cap_centroid
         else:
             origin = (0, 0, 0)
         (theta, phi) = compute_unit_spherical_coordinates_from_cartesian(
@@ -94,7 +153,8 @@ class Electrode:
         return np.array([x, y, z])
 
     def apply_transformation(self, A: np.matrix):
-        x = np.array([self.coordinates[0], self.coordinates[1], self.coordinates[2], 1])
+        coordinates = self.coordinates
+        x = np.array([coordinates[0], coordinates[1], coordinates[2], 1])
 
         x.shape = (4, 1)
         y4d = A @ x
@@ -113,14 +173,21 @@ class Electrode:
     def __eq__(self, other):
         return id(self) == id(other)
 
+    def __repr__(self):
+        return (
+            f"Electrode(coordinates={self.coordinates!r}, modality={self.modality!r}, "
+            f"label={self.label!r})"
+        )
+
     @property
     def df(self) -> pd.DataFrame:
         """Returns a DataFrame with the electrode's data."""
+        coordinates = self.coordinates
         df = pd.DataFrame(
             {
-                "x": self.coordinates[0],
-                "y": self.coordinates[1],
-                "z": self.coordinates[2],
+                "x": coordinates[0],
+                "y": coordinates[1],
+                "z": coordinates[2],
                 "modality": self.modality,
                 "label": self.label,
             },
@@ -128,14 +195,6 @@ class Electrode:
         )
         return df
 
-    @property
-    def interpolated_unit_sphere_coordinates(self):
-        return self._interpolated_unit_sphere_coordinates
-
-    @interpolated_unit_sphere_coordinates.setter
-    def interpolated_unit_sphere_coordinates(self, value):
-        self._interpolated_unit_sphere_coordinates = value
-
     def __getitem__(self, item):
         return getattr(self, item)
 
@@ -0,0 +1,659 @@
+import contextlib
+import logging
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from config.electrode_labeling import HistoryParameters
+from config.mappings import ModalitiesMapping
+from data_models.electrode import Electrode
+
+logger = logging.getLogger(__name__)
+
+VECTOR_COLUMNS = ("coordinates", "cap_centroid", "interpolated_unit_sphere_coordinates")
+FLAG_COLUMNS = ("labeled", "interpolated", "fiducial", "aligned", "mapped_to_unit_sphere")
+
+
+class ElectrodeStore:
+    """
+    Electrodes as columns: an (N, 3) coordinate array, integer-coded modalities, boolean
+    flags and a label column, with stable integer ids for the rows.
+
+    Rows keep their insertion order (the rows of the CapModel table). Electrodes handed out
+    by the store are views of their row: reading or writing their attributes reads or
+    writes the columns, and one view object is kept per row. Removed rows leave their
+    views with a copy of the last values.
+
+    `version` changes whenever rows are added or removed or their positions, modalities
+    or fiducial flags change, so that indexes over the rows know when to rebuild. The
+    electrodes are also indexed by (label, modality) and by the object id of their view.
+
+    Every change (inserted rows, removed rows, written values) is applied as a change
+    record that returns its inverse; the inverses are kept in `history` to undo and redo
+    the changes.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.history = ChangeHistory()
+        self._size = 0
+        self._next_id = 0
+        self._modalities = [
+            ModalitiesMapping.HEADSCAN,
+            ModalitiesMapping.MRI,
+            ModalitiesMapping.REFERENCE,
+        ]
+        self._columns = _allocate_columns(0)
+        self._rows = {}
+        self._views = {}
+        # id(view) -> electrode id
+        self._view_ids = {}
+        # (label, modality code) -> ids of the electrodes that are not fiducials
+        self._label_index = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.get_column("id")
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        return self.get_column("coordinates")
+
+    @property
+    def modality_codes(self) -> np.ndarray:
+        return self.get_column("modality")
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self.get_column("label")
+
+    def get_column(self, name: str) -> np.ndarray:
+        """
+        Returns a read-only column of all rows; columns are written with `set_rows`, which
+        records the change and keeps the indexes current.
+        """
+        column = self._columns[name][: self._size]
+        column.flags.writeable = False
+        return column
+
+    def set_rows(self, rows: np.ndarray | list[int], name: str, values) -> None:
+        """Writes the values of a column for some rows."""
+        if name == "modality":
+            values = self.get_modality_code(values)
+        self._change(("write", self.ids[np.asarray(rows, dtype=np.int64)].copy(), name, values))
+
+    def get_modality_code(self, modality: str) -> int:
+        if modality not in self._modalities:
+            self._modalities.append(modality)
+        return self._modalities.index(modality)
+
+    def get_modality_mask(self, modalities: Iterable[str]) -> np.ndarray:
+        codes = [self._modalities.index(m) for m in modalities if m in self._modalities]
+        return np.isin(self.modality_codes, codes)
+
+    def get_row(self, electrode_id: int) -> int:
+        return self._rows[electrode_id]
+
+    def get_ids_by_label(self, label: str, modality: str) -> set[int]:
+        """Returns the ids of the electrodes with a label and modality, except fiducials."""
+        if modality not in self._modalities:
+            return set()
+        return self._label_index.get((label, self._modalities.index(modality)), set())
+
+    def get_view(self, row: int) -> Electrode:
+        electrode_id = int(self._columns["id"][row])
+        view = self._views.get(electrode_id)
+        if view is None:
+            view = Electrode._create_view(self, electrode_id)
+            self._add_view(electrode_id, view)
+        return view
+
+    def get_view_by_id(self, electrode_id: int) -> Electrode:
+        return self.get_view(self._rows[electrode_id])
+
+    def get_view_by_object_id(self, object_id: int) -> Electrode | None:
+        electrode_id = self._view_ids.get(object_id)
+        if electrode_id is None:
+            return None
+        return self._views[electrode_id]
+
+    def get_views(self, rows: Iterable[int]) -> list[Electrode]:
+        return [self.get_view(int(row)) for row in rows]
+
+    def get_views_by_mask(self, mask: np.ndarray) -> list[Electrode]:
+        return self.get_views(np.flatnonzero(mask))
+
+    def get_value(self, electrode_id: int, name: str):
+        value = self._columns[name][self._rows[electrode_id]]
+        if name in _VECTOR_COLUMN_SET:
+            # NaN rows mark missing vectors
+            return None if value[0] != value[0] else value.copy()
+        if name in _FLAG_COLUMN_SET:
+            return bool(value)
+        if name == "modality":
+            return self._modalities[value]
+        return value
+
+    def set_value(self, electrode_id: int, name: str, value) -> None:
+        if name in _VECTOR_COLUMN_SET and value is None:
+            value = np.nan
+        elif name == "modality":
+            value = self.get_modality_code(value)
+        self._change(("write", np.array([electrode_id]), name, value))
+
+    def get_values(self, electrode_id: int) -> dict:
+        return {name: self.get_value(electrode_id, name) for name in _VALUE_COLUMNS}
+
+    def extend(self, electrodes: list[Electrode]) -> np.ndarray:
+        """
+        Appends the electrodes and returns their ids. Electrodes that are not yet in a
+        store become views of their rows.
+        """
+        values = [electrode._get_values() for electrode in electrodes]
+        return self._append_rows(
+            {
+                name: [electrode_values[name] for electrode_values in values]
+                for name in _VALUE_COLUMNS
+            },
+            views=[electrode if electrode._store is None else None for electrode in electrodes],
+        )
+
+    def remove(self, rows: np.ndarray | list[int]) -> None:
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) > 0:
+            self._change(("remove", self.ids[rows].copy()))
+
+    def clear(self) -> None:
+        self.remove(np.arange(self._size))
+
+    @contextlib.contextmanager
+    def operation(self) -> Iterator[None]:
+        """Groups the changes made within into one operation of the history."""
+        with self.history.operation():
+            yield
+        if not self.history.in_operation:
+            self._trim_history()
+
+    def undo(self) -> bool:
+        """Reverts the last operation; returns False if there is none."""
+        operation = self.history.pop_undo()
+        if operation is None:
+            return False
+        self.history.push_redo(self._revert(operation))
+        return True
+
+    def redo(self) -> bool:
+        """Repeats the last undone operation; returns False if there is none."""
+        operation = self.history.pop_redo()
+        if operation is None:
+            return False
+        self.history.push_undo(self._revert(operation))
+        return True
+
+    def restore_checkpoint(self) -> bool:
+        """
+        Returns exactly to the data of the last checkpoint of the history; returns False,
+        without changing anything, if there is no checkpoint or it cannot be reached.
+        """
+        checkpoint = self.history.pop_checkpoint()
+        if checkpoint is None:
+            return False
+        if isinstance(checkpoint, dict):
+            self.set_arrays(checkpoint)
+            return True
+
+        if checkpoint < 0 or checkpoint > self.history.undo_count + self.history.redo_count:
+            logger.warning("The operations back to the last checkpoint are no longer kept")
+            return False
+        while self.history.undo_count > checkpoint:
+            self.undo()
+        while self.history.undo_count < checkpoint:
+            self.redo()
+        return True
+
+    def get_arrays(self) -> dict[str, np.ndarray]:
+        """
+        Returns the rows as columns of equal length, e.g. to store them; missing labels,
+        centroids and interpolated coordinates are marked by `has_label` and NaN rows.
+        """
+        labels = self.labels
+        has_label = np.array([label is not None for label in labels], dtype=bool)
+        arrays = {
+            "coordinates": self.coordinates.copy(),
+            "modality": np.array(self._modalities, dtype=str)[self.modality_codes],
+            "label": np.array(
+                [str(label) if label is not None else "" for label in labels], dtype=str
+            ),
+            "has_label": has_label,
+        }
+        for name in FLAG_COLUMNS:
+            arrays[name] = self.get_column(name).copy()
+        for name in VECTOR_COLUMNS[1:]:
+            arrays[name] = self.get_column(name).copy()
+        return arrays
+
+    def set_arrays(self, arrays: dict[str, np.ndarray]) -> None:
+        """Replaces all rows with the ones stored in the columns of `get_arrays`."""
+        with self.operation():
+            self.clear()
+            self._append_rows(self._get_array_columns(arrays))
+
+    def _get_array_columns(self, arrays: dict[str, np.ndarray]) -> dict:
+        has_label = np.asarray(arrays["has_label"], dtype=bool)
+        labels = np.empty(len(has_label), dtype=object)
+        labels[has_label] = [str(label) for label in np.asarray(arrays["label"])[has_label]]
+
+        columns = {
+            "modality": [str(modality) for modality in arrays["modality"]],
+            "label": labels,
+        }
+        for name in VECTOR_COLUMNS + FLAG_COLUMNS:
+            columns[name] = np.asarray(arrays[name])
+        return columns
+
+    def _append_rows(self, columns: dict, views: list | None = None) -> np.ndarray:
+        count = len(columns["coordinates"])
+        ids = np.arange(self._next_id, self._next_id + count)
+        self._next_id += count
+
+        labels = np.empty(count, dtype=object)
+        labels[:] = list(columns["label"])
+        data = {
+            "id": ids,
+            "modality": np.array(
+                [self.get_modality_code(m) for m in columns["modality"]], dtype=np.int16
+            ).reshape(count),
+            "label": labels,
+        }
+        for name in FLAG_COLUMNS:
+            data[name] = np.asarray(columns[name], dtype=bool).reshape(count)
+        for name in VECTOR_COLUMNS:
+            data[name] = _get_vectors(columns[name], count)
+
+        positions = np.arange(self._size, self._size + count)
+        self._change(("insert", positions, data, views or [None] * count))
+        return ids
+
+    def _change(self, change: tuple) -> None:
+        if self.history.redo_count > 0:
+            # the change discards the undone operations; checkpoints among them keep the
+            # data they mark instead
+            self._save_redo_checkpoints()
+            self.history.clear_redo()
+        self.history.record(self._apply(change))
+        if not self.history.in_operation:
+            self._trim_history()
+
+    def _trim_history(self) -> None:
+        # a checkpoint that keeps the history over its limits keeps the data it marks
+        # instead, so that the older operations can be dropped
+        checkpoint = self.history.get_blocking_checkpoint()
+        while checkpoint is not None:
+            self.history.set_checkpoint_snapshot(checkpoint, self._get_arrays_at(checkpoint))
+            self.history.drop_oldest()
+            checkpoint = self.history.get_blocking_checkpoint()
+
+    def _get_arrays_at(self, operation_count: int) -> dict[str, np.ndarray]:
+        current_count = self.history.operation_count
+        while self.history.operation_count > operation_count:
+            self.undo()
+        arrays = self.get_arrays()
+        while self.history.operation_count < current_count:
+            self.redo()
+        return arrays
+
+    def _save_redo_checkpoints(self) -> None:
+        # the checkpoint of the current state keeps its operations while redoing
+        self.history.add_checkpoint()
+        operation_count = self.history.operation_count
+        for checkpoint in self.history.get_redo_checkpoints():
+            while self.history.operation_count < checkpoint:
+                self.redo()
+            self.history.set_checkpoint_snapshot(checkpoint, self.get_arrays())
+        while self.history.operation_count > operation_count:
+            self.undo()
+        self.history.pop_checkpoint()
+
+    def _revert(self, operation: list[tuple]) -> list[tuple]:
+        # applies the inverse changes of an operation, last first, and returns the changes
+        # that redo it
+        return [self._apply(change) for change in reversed(operation)]
+
+    def _apply(self, change: tuple) -> tuple:
+        """Applies a change record and returns the record of the inverse change."""
+        if change[0] == "write":
+            return self._write_rows(*change[1:])
+        if change[0] == "remove":
+            return self._remove_rows(*change[1:])
+        return self._insert_rows(*change[1:])
+
+    def _write_rows(self, ids: np.ndarray, name: str, values) -> tuple:
+        rows = np.array([self._rows[electrode_id] for electrode_id in ids.tolist()], np.int64)
+        column = self._columns[name]
+        previous_values = column[rows].copy()
+
+        relabeled = name in _LABEL_INDEX_COLUMNS
+        if relabeled:
+            self._unindex_labels(rows)
+        column[rows] = values
+        if relabeled:
+            self._index_labels(rows)
+        if name in _INDEXED_COLUMNS:
+            self.version += 1
+        return ("write", ids, name, previous_values)
+
+    def _remove_rows(self, ids: np.ndarray) -> tuple:
+        rows = np.sort([self._rows[electrode_id] for electrode_id in ids.tolist()])
+        data = {name: column[rows].copy() for name, column in self._columns.items()}
+
+        self._unindex_labels(rows)
+        views = []
+        for electrode_id in data["id"].tolist():
+            view = self._views.pop(electrode_id, None)
+            if view is not None:
+                del self._view_ids[id(view)]
+                view._detach(self.get_values(electrode_id))
+            views.append(view)
+
+        keep = np.ones(self._size, dtype=bool)
+        keep[rows] = False
+        size = int(np.count_nonzero(keep))
+        for column in self._columns.values():
+            column[:size] = column[: self._size][keep]
+        self._clear_rows(size, self._size)
+        self._size = size
+        self._rows = {electrode_id: row for row, electrode_id in enumerate(self.ids.tolist())}
+        self.version += 1
+        return ("insert", rows, data, views)
+
+    def _insert_rows(self, positions: np.ndarray, data: dict, views: list) -> tuple:
+        # positions are the rows of the inserted electrodes after the insertion
+        count = len(positions)
+        size = self._size + count
+        self._reserve(size)
+
+        if count > 0 and positions[0] == self._size:
+            for name, column in self._columns.items():
+                column[self._size : size] = data[name]
+            for row, electrode_id in enumerate(data["id"].tolist(), start=self._size):
+                self._rows[electrode_id] = row
+        else:
+            inserted = np.zeros(size, dtype=bool)
+            inserted[positions] = True
+            for name, column in self._columns.items():
+                column[:size][~inserted] = column[: self._size].copy()
+                column[:size][inserted] = data[name]
+        self._size = size
+        if len(self._rows) != size:
+            self._rows = {electrode_id: row for row, electrode_id in enumerate(self.ids.tolist())}
+
+        self._index_labels(positions)
+        for electrode_id, view in zip(data["id"].tolist(), views):
+            if view is not None and view._store is None:
+                view._attach(self, electrode_id)
+                self._add_view(electrode_id, view)
+        self.version += 1
+        return ("remove", data["id"].copy())
+
+    def _add_view(self, electrode_id: int, view: Electrode) -> None:
+        self._views[electrode_id] = view
+        self._view_ids[id(view)] = electrode_id
+
+    def _index_labels(self, rows: np.ndarray) -> None:
+        columns = self._columns
+        for row in rows[~columns["fiducial"][rows]].tolist():
+            key = (columns["label"][row], int(columns["modality"][row]))
+            self._label_index.setdefault(key, set()).add(int(columns["id"][row]))
+
+    def _unindex_labels(self, rows: np.ndarray) -> None:
+        columns = self._columns
+        for row in rows[~columns["fiducial"][rows]].tolist():
+            key = (columns["label"][row], int(columns["modality"][row]))
+            electrode_ids = self._label_index.get(key)
+            if electrode_ids is not None:
+                electrode_ids.discard(int(columns["id"][row]))
+                if len(electrode_ids) == 0:
+                    del self._label_index[key]
+
+    def _reserve(self, capacity: int) -> None:
+        current_capacity = len(self._columns["id"])
+        if capacity <= current_capacity:
+            return
+
+        columns = _allocate_columns(max(capacity, 2 * current_capacity, 16))
+        for name, column in self._columns.items():
+            columns[name][: self._size] = column[: self._size]
+        self._columns = columns
+
+    def _clear_rows(self, start: int, stop: int) -> None:
+        # unused rows hold no labels, so that they do not keep objects alive
+        self._columns["label"][start:stop] = None
+
+
+# the values of one electrode, in the keyword names of the Electrode columns
+_VALUE_COLUMNS = ("modality", "label") + VECTOR_COLUMNS + FLAG_COLUMNS
+_VECTOR_COLUMN_SET = frozenset(VECTOR_COLUMNS)
+_FLAG_COLUMN_SET = frozenset(FLAG_COLUMNS)
+# columns that decide where an electrode is found by spatial queries
+_INDEXED_COLUMNS = frozenset(("coordinates", "modality", "fiducial"))
+# columns that decide where an electrode is found by label
+_LABEL_INDEX_COLUMNS = frozenset(("label", "modality", "fiducial"))
+
+
+def _allocate_columns(capacity: int) -> dict[str, np.ndarray]:
+    columns = {
+        "id": np.zeros(capacity, dtype=np.int64),
+        "modality": np.zeros(capacity, dtype=np.int16),
+        "label": np.full(capacity, None, dtype=object),
+    }
+    for name in FLAG_COLUMNS:
+        columns[name] = np.zeros(capacity, dtype=bool)
+    for name in VECTOR_COLUMNS:
+        columns[name] = np.full((capacity, 3), np.nan)
+    return columns
+
+
+def _get_vectors(values, count: int) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return np.asarray(values, dtype=np.float64).reshape(count, 3)
+
+    vectors = np.full((count, 3), np.nan)
+    for i, value in enumerate(values):
+        if value is not None:
+            vectors[i] = np.asarray(value, dtype=np.float64).reshape(3)
+    return vectors
+
+
+class ChangeHistory:
+    """
+    Bounded undo and redo stacks of operations, each a list of inverse change records.
+
+    Changes recorded inside `operation()` form one operation; repeated writes of a value
+    within an operation only keep its first previous value, so an operation records each
+    changed value once. The oldest operations are dropped beyond `max_operations`, or
+    when the operations record more than `max_rows` rows, except for the operations
+    needed to return to a checkpoint.
+
+    Checkpoints mark a number of operations to return to. A checkpoint among undone
+    operations that a new operation discards, or one that keeps the history over its
+    limits (`get_blocking_checkpoint`), is replaced by a snapshot of its data
+    (`set_checkpoint_snapshot`), so that every checkpoint can be returned to exactly.
+    """
+
+    def __init__(
+        self,
+        max_operations: int = HistoryParameters.max_operations,
+        max_rows: int = HistoryParameters.max_rows,
+    ):
+        self.max_operations = max_operations
+        self.max_rows = max_rows
+
+        self._undo = deque()
+        self._redo = []
+        self._row_count = 0
+        # checkpoints count the operations since the history started, dropped ones included
+        self._checkpoints = []
+        self._dropped_count = 0
+
+        self._depth = 0
+        self._operation = None
+        self._written = None
+
+    @property
+    def undo_count(self) -> int:
+        return len(self._undo)
+
+    @property
+    def redo_count(self) -> int:
+        return len(self._redo)
+
+    @property
+    def in_operation(self) -> bool:
+        return self._depth > 0
+
+    @property
+    def operation_count(self) -> int:
+        """Counts the undo operations since the history started, dropped ones included."""
+        return self._dropped_count + len(self._undo)
+
+    @contextlib.contextmanager
+    def operation(self) -> Iterator[None]:
+        """Groups the changes recorded within into a single operation."""
+        if self._depth == 0:
+            self._operation = []
+            self._written = set()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                operation, self._operation, self._written = self._operation, None, None
+                if len(operation) > 0:
+                    self._push(operation)
+
+    def record(self, change: tuple) -> None:
+        if self._operation is None:
+            self._push([change])
+            return
+
+        if change[0] == "write":
+            # only the value before the operation is needed to revert it
+            ids, name = change[1], change[2]
+            first = np.array(
+                [(electrode_id, name) not in self._written for electrode_id in ids.tolist()]
+            )
+            if not np.any(first):
+                return
+            self._written.update((electrode_id, name) for electrode_id in ids[first].tolist())
+            change = ("write", ids[first], name, change[3][first])
+        self._operation.append(change)
+
+    def pop_undo(self) -> list[tuple] | None:
+        if len(self._undo) == 0:
+            return None
+        operation = self._undo.pop()
+        self._row_count -= _count_rows(operation)
+        return operation
+
+    def push_undo(self, operation: list[tuple]) -> None:
+        self._undo.append(operation)
+        self._row_count += _count_rows(operation)
+        self.drop_oldest()
+
+    def pop_redo(self) -> list[tuple] | None:
+        if len(self._redo) == 0:
+            return None
+        return self._redo.pop()
+
+    def push_redo(self, operation: list[tuple]) -> None:
+        self._redo.append(operation)
+
+    def clear_redo(self) -> None:
+        self._redo.clear()
+
+    def add_checkpoint(self) -> None:
+        self._checkpoints.append(self.operation_count)
+
+    def pop_checkpoint(self) -> int | dict | None:
+        """
+        Returns the number of kept undo operations at the last checkpoint, or the data
+        snapshot that replaced it.
+        """
+        if len(self._checkpoints) == 0:
+            return None
+        checkpoint = self._checkpoints.pop()
+        if isinstance(checkpoint, dict):
+            return checkpoint
+        return checkpoint - self._dropped_count
+
+    def get_redo_checkpoints(self) -> list[int]:
+        """Returns the ascending operation counts of the checkpoints among the redo operations."""
+        return sorted(
+            {
+                checkpoint
+                for checkpoint in self._checkpoints
+                if not isinstance(checkpoint, dict) and checkpoint > self.operation_count
+            }
+        )
+
+    def set_checkpoint_snapshot(self, operation_count: int, arrays: dict) -> None:
+        """Replaces the checkpoints at an operation count by a data snapshot."""
+        self._checkpoints = [
+            (
+                arrays
+                if not isinstance(checkpoint, dict) and checkpoint == operation_count
+                else checkpoint
+            )
+            for checkpoint in self._checkpoints
+        ]
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+        self._row_count = 0
+        self._checkpoints = []
+
+    def _push(self, operation: list[tuple]) -> None:
+        self._redo.clear()
+        self.push_undo(operation)
+
+    def get_blocking_checkpoint(self) -> int | None:
+        """
+        Returns the operation count of the checkpoint that keeps the history over its
+        limits, or None if there is none.
+        """
+        oldest_checkpoint = self._get_oldest_checkpoint()
+        if (
+            oldest_checkpoint is None
+            or oldest_checkpoint > self._dropped_count
+            or not self._is_over_limits()
+        ):
+            return None
+        return oldest_checkpoint
+
+    def drop_oldest(self) -> None:
+        """Drops the oldest operations beyond the limits, up to the oldest checkpoint."""
+        # the operations after the oldest checkpoint are kept to return to it
+        oldest_checkpoint = self._get_oldest_checkpoint()
+        while self._is_over_limits() and (
+            oldest_checkpoint is None or self._dropped_count < oldest_checkpoint
+        ):
+            self._row_count -= _count_rows(self._undo.popleft())
+            self._dropped_count += 1
+
+    def _get_oldest_checkpoint(self) -> int | None:
+        return min((c for c in self._checkpoints if not isinstance(c, dict)), default=None)
+
+    def _is_over_limits(self) -> bool:
+        return len(self._undo) > 1 and (
+            len(self._undo) > self.max_operations or self._row_count > self.max_rows
+        )
+
+
+def _count_rows(operation: list[tuple]) -> int:
+    return sum(len(change[1]) for change in operation)
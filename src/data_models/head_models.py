@@ -10,7 +10,13 @@ from data.loader import (
     load_mri_surface_mesh_from_file,
 )
 from processing_models.surface_registrator import BaseSurfaceRegistrator
-from utils.mesh import normalize_mesh, rescale_to_original_size
+from utils.mesh import (
+    create_mesh_from_arrays,
+    get_mesh_arrays,
+    normalize_mesh,
+    rescale_to_original_size,
+)
+from utils.texture_store import texture_store
 
 try:
     import vedo.vtkclasses as vtk
@@ -49,15 +55,46 @@ class HeadScan(BaseHeadModel):
 
         self.apply_texture()
 
+    @classmethod
+    def from_arrays(
+        cls, arrays: dict[str, np.ndarray], surface_file: str, texture_file: str | None = None
+    ) -> "HeadScan":
+        """Rebuilds a normalized head scan from the arrays of `get_arrays`, without loading."""
+        head_scan = cls.__new__(cls)
+        head_scan.surface_file = surface_file
+        head_scan.texture_file = texture_file
+        head_scan.mesh = create_mesh_from_arrays(arrays)
+        head_scan.modality = ModalitiesMapping.HEADSCAN
+        head_scan.fiducials = []
+        head_scan.normalization_scale = float(arrays["normalization_scale"])
+        head_scan._registered = False
+
+        head_scan.apply_texture()
+        return head_scan
+
+    def get_arrays(self) -> dict[str, np.ndarray]:
+        """Returns the normalized mesh and its normalization scale as numpy arrays."""
+        return {
+            **get_mesh_arrays(self.mesh),  # type: ignore
+            "normalization_scale": np.array(self.normalization_scale, dtype=np.float64),
+        }
+
     def normalize(self):
         self.normalization_scale = normalize_mesh(self.mesh)  # type: ignore
 
     def rescale_to_original_size(self):
         self.normalization_scale = rescale_to_original_size(self.mesh, self.normalization_scale)  # type: ignore
 
+    def set_texture(self, texture_file: str | None):
+        """Textures the scan with another file; the replaced texture is released."""
+        if texture_file != self.texture_file:
+            texture_store.release(self.texture_file)
+        self.texture_file = texture_file
+        self.apply_texture()
+
     def apply_texture(self):
         if self.texture_file is not None:
-            self.mesh = self.mesh.texture(self.texture_file)  # type: ignore
+            self.mesh = self.mesh.texture(texture_store.get_vtk_texture(self.texture_file))  # type: ignore
 
     def register_mesh(self, surface_registrator: BaseSurfaceRegistrator) -> np.ndarray:
         transform_matrix = surface_registrator.register()  # type: ignore
@@ -1,9 +1,110 @@
+import os
+
+import numpy as np
+
 from data_models.head_models import HeadScan
 from data_models.cap_model import CapModel
+from utils.npz import load_npz, save_npz
+
+# bump when the layout of session files changes
+SESSION_FORMAT_VERSION = 1
 
 
 class Session:
-    def __init__(self, session_id: str, head_scan: HeadScan, electrode_cap: CapModel):
+    """
+    A localization session: the normalized head scan, its electrode cap and the matrices
+    of its registrations (e.g. "reference_to_scan", "scan_to_mri").
+
+    Sessions are stored as uncompressed .npz files holding the mesh arrays, the electrodes
+    and the label correspondence as columns; reopening memory-maps them instead of loading
+    and normalizing the surface file again or redoing the detection.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        head_scan: HeadScan,
+        electrode_cap: CapModel,
+        registration_matrices: dict[str, np.ndarray] | None = None,
+    ):
         self.session_id = session_id
         self.head_scan = head_scan
         self.electrode_cap = electrode_cap
+        self.registration_matrices = registration_matrices or {}
+
+    def save(self, filename: str) -> None:
+        arrays = {
+            "format_version": np.array(SESSION_FORMAT_VERSION),
+            "session_id": np.array(self.session_id),
+            "surface_file": np.array(self.head_scan.surface_file),
+            "texture_file": np.array(self.head_scan.texture_file or ""),
+            "registered": np.array(self.head_scan._registered),
+        }
+        arrays.update(_add_prefix("mesh", self.head_scan.get_arrays()))
+        arrays.update(_add_prefix("electrodes", self.electrode_cap.get_electrode_arrays()))
+        arrays.update(_add_prefix("correspondence", self.electrode_cap.get_correspondence_arrays()))
+        arrays.update(_add_prefix("registration", self.registration_matrices))
+        save_npz(filename, arrays)
+
+    @classmethod
+    def load(cls, filename: str, apply_texture: bool = True) -> "Session":
+        """
+        Reopens a saved session; the texture is re-applied from its file, if it still
+        exists and `apply_texture` is set.
+        """
+        arrays = load_npz(filename)
+        _check_format_version(filename, arrays)
+
+        texture_file = str(arrays["texture_file"]) or None
+        head_scan = HeadScan.from_arrays(
+            _get_prefixed(arrays, "mesh"),
+            str(arrays["surface_file"]),
+            texture_file if apply_texture and _exists(texture_file) else None,
+        )
+        head_scan.texture_file = texture_file
+        head_scan._registered = bool(arrays["registered"])
+
+        electrode_cap = CapModel()
+        electrode_cap.set_electrode_arrays(_get_prefixed(arrays, "electrodes"))
+        electrode_cap.set_correspondence_arrays(_get_prefixed(arrays, "correspondence"))
+
+        return cls(
+            str(arrays["session_id"]),
+            head_scan,
+            electrode_cap,
+            {
+                name: np.array(matrix)
+                for name, matrix in _get_prefixed(arrays, "registration").items()
+            },
+        )
+
+
+def load_session_electrode_arrays(filename: str) -> dict[str, np.ndarray]:
+    """Memory-maps only the electrode columns of a saved session."""
+    arrays = load_npz(
+        filename,
+        select=lambda name: name == "format_version" or name.startswith("electrodes."),
+    )
+    _check_format_version(filename, arrays)
+    return _get_prefixed(arrays, "electrodes")
+
+
+def _add_prefix(prefix: str, arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    return {f"{prefix}.{name}": array for name, array in arrays.items()}
+
+
+def _get_prefixed(arrays: dict[str, np.ndarray], prefix: str) -> dict[str, np.ndarray]:
+    return {
+        name[len(prefix) + 1 :]: array
+        for name, array in arrays.items()
+        if name.startswith(f"{prefix}.")
+    }
+
+
+def _exists(file: str | None) -> bool:
+    return file is not None and os.path.exists(file)
+
+
+def _check_format_version(filename: str, arrays: dict[str, np.ndarray]) -> None:
+    if "format_version" not in arrays or int(arrays["format_version"]) > SESSION_FORMAT_VERSION:
+        raise ValueError(f"{filename} is not a session file of a supported version")
@@ -0,0 +1,249 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config.mappings import ModalitiesMapping
+from data_models.session import Session, load_session_electrode_arrays
+
+MEASURED_MODALITIES = (ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI)
+
+
+@dataclass
+class LabelStatistics:
+    """
+    Per-label statistics of a study, one row per label.
+
+    Positions are averaged over the sessions that measured the label; `dispersion` is the
+    root mean square distance of those positions from the mean position. A label is
+    missing from a session with neither a measured nor an interpolated electrode.
+    """
+
+    labels: np.ndarray
+    session_count: int
+    measured_count: np.ndarray
+    interpolated_count: np.ndarray
+    mean_position: np.ndarray
+    standard_deviation: np.ndarray
+    dispersion: np.ndarray
+
+    @property
+    def interpolated_rate(self) -> np.ndarray:
+        return self.interpolated_count / max(self.session_count, 1)
+
+    @property
+    def missing_rate(self) -> np.ndarray:
+        missing_count = self.session_count - self.measured_count - self.interpolated_count
+        return np.clip(missing_count, 0, None) / max(self.session_count, 1)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "label": self.labels,
+                "measured": self.measured_count,
+                "interpolated": self.interpolated_count,
+                "missing_rate": self.missing_rate,
+                "interpolated_rate": self.interpolated_rate,
+                "x": self.mean_position[:, 0],
+                "y": self.mean_position[:, 1],
+                "z": self.mean_position[:, 2],
+                "sd_x": self.standard_deviation[:, 0],
+                "sd_y": self.standard_deviation[:, 1],
+                "sd_z": self.standard_deviation[:, 2],
+                "dispersion": self.dispersion,
+            }
+        )
+
+
+class LabelStatisticsAccumulator:
+    """
+    Streaming per-label position statistics.
+
+    Every session is folded into running counts, means and sums of squared deviations
+    (Welford/Chan updates) with array operations over its labels, so memory depends on the
+    number of labels only. Accumulators of study parts can be merged.
+    """
+
+    def __init__(self, labels: list[str] | None = None):
+        self._label_index = {}
+        self._labels = []
+        self.session_count = 0
+
+        self._measured_count = np.zeros(0, dtype=np.int64)
+        self._interpolated_count = np.zeros(0, dtype=np.int64)
+        self._mean = np.zeros((0, 3))
+        self._m2 = np.zeros((0, 3))
+
+        for label in labels or []:
+            self._get_label_indices(np.array([label]))
+
+    def update(
+        self,
+        electrode_arrays: dict[str, np.ndarray],
+        modalities: tuple[str, ...] = MEASURED_MODALITIES,
+        unit_sphere: bool = False,
+    ) -> None:
+        """Adds one session given by its electrode columns."""
+        self.session_count += 1
+
+        selected = (
+            np.isin(electrode_arrays["modality"], modalities)
+            & np.asarray(electrode_arrays["labeled"])
+            & np.asarray(electrode_arrays["has_label"])
+            & ~np.asarray(electrode_arrays["fiducial"])
+        )
+        interpolated = np.asarray(electrode_arrays["interpolated"])
+        positions = _get_positions(electrode_arrays, unit_sphere)
+
+        interpolated_labels = np.unique(electrode_arrays["label"][selected & interpolated])
+        indices = self._get_label_indices(interpolated_labels)
+        self._interpolated_count[indices] += 1
+
+        measured = selected & ~interpolated
+        if not np.any(measured):
+            return
+
+        # duplicate labels of a session are averaged into a single sample
+        session_labels, inverse = np.unique(
+            electrode_arrays["label"][measured], return_inverse=True
+        )
+        counts = np.bincount(inverse).astype(np.float64)
+        session_means = (
+            np.column_stack(
+                [np.bincount(inverse, weights=positions[measured, axis]) for axis in range(3)]
+            )
+            / counts[:, None]
+        )
+
+        indices = self._get_label_indices(session_labels)
+        self._add_samples(
+            indices, np.ones(len(indices)), session_means, np.zeros_like(session_means)
+        )
+
+    def merge(self, other: "LabelStatisticsAccumulator") -> None:
+        """Adds the sessions accumulated by another accumulator."""
+        self.session_count += other.session_count
+        indices = self._get_label_indices(np.array(other._labels, dtype=str))
+        self._interpolated_count[indices] += other._interpolated_count
+
+        measured = other._measured_count > 0
+        self._add_samples(
+            indices[measured],
+            other._measured_count[measured].astype(np.float64),
+            other._mean[measured],
+            other._m2[measured],
+        )
+
+    def get_statistics(self) -> LabelStatistics:
+        count = self._measured_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = self._m2 / count[:, None]
+        mean = np.where(count[:, None] > 0, self._mean, np.nan)
+
+        return LabelStatistics(
+            labels=np.array(self._labels, dtype=str),
+            session_count=self.session_count,
+            measured_count=count.copy(),
+            interpolated_count=self._interpolated_count.copy(),
+            mean_position=mean,
+            standard_deviation=np.sqrt(variance),
+            dispersion=np.sqrt(np.sum(variance, axis=1)),
+        )
+
+    def _add_samples(
+        self, indices: np.ndarray, counts: np.ndarray, means: np.ndarray, m2: np.ndarray
+    ) -> None:
+        # Chan et al. combination of the running statistics with a batch of samples
+        count_a = self._measured_count[indices].astype(np.float64)
+        total = count_a + counts
+        delta = means - self._mean[indices]
+
+        self._mean[indices] += delta * (counts / total)[:, None]
+        self._m2[indices] += m2 + delta**2 * (count_a * counts / total)[:, None]
+        self._measured_count[indices] += counts.astype(np.int64)
+
+    def _get_label_indices(self, labels: np.ndarray) -> np.ndarray:
+        new_labels = [str(label) for label in labels if str(label) not in self._label_index]
+        if len(new_labels) > 0:
+            for label in new_labels:
+                self._label_index[label] = len(self._labels)
+                self._labels.append(label)
+            grow = len(new_labels)
+            self._measured_count = np.concatenate([self._measured_count, np.zeros(grow, np.int64)])
+            self._interpolated_count = np.concatenate(
+                [self._interpolated_count, np.zeros(grow, np.int64)]
+            )
+            self._mean = np.concatenate([self._mean, np.zeros((grow, 3))])
+            self._m2 = np.concatenate([self._m2, np.zeros((grow, 3))])
+
+        return np.array([self._label_index[str(label)] for label in labels], dtype=np.int64)
+
+
+class Study:
+    """
+    Saved sessions of a study, indexed by session id.
+
+    Only the session files are kept; sessions are opened when they are needed, and the
+    study-wide statistics map the electrode columns of one session at a time.
+    """
+
+    def __init__(self, session_files: dict[str, str] | None = None):
+        self.session_files = dict(session_files or {})
+
+    @classmethod
+    def from_directory(cls, directory: str, pattern: str = "*.npz") -> "Study":
+        """Indexes the session files of a directory by their file names."""
+        return cls({file.stem: str(file) for file in sorted(Path(directory).glob(pattern))})
+
+    def __len__(self) -> int:
+        return len(self.session_files)
+
+    @property
+    def session_ids(self) -> list[str]:
+        return list(self.session_files)
+
+    def add_session(self, session_id: str, session_file: str) -> None:
+        self.session_files[session_id] = session_file
+
+    def get_session(self, session_id: str, apply_texture: bool = False) -> Session:
+        return Session.load(self.session_files[session_id], apply_texture=apply_texture)
+
+    def iter_electrode_arrays(self) -> Iterator[tuple[str, dict[str, np.ndarray]]]:
+        for session_id, session_file in self.session_files.items():
+            yield session_id, load_session_electrode_arrays(session_file)
+
+    def compute_label_statistics(
+        self,
+        labels: list[str] | None = None,
+        modalities: tuple[str, ...] = MEASURED_MODALITIES,
+        unit_sphere: bool = False,
+    ) -> LabelStatistics:
+        """
+        Streams over the sessions and returns the statistics of every label.
+
+        `labels` (e.g. the montage labels) are reported even if no session has them.
+        Positions are in the space of each session (normalized scan or MRI); with
+        `unit_sphere` they are the directions from the cap centroid instead, which compare
+        across heads of different shape.
+        """
+        accumulator = LabelStatisticsAccumulator(labels)
+        for _, electrode_arrays in self.iter_electrode_arrays():
+            accumulator.update(electrode_arrays, modalities, unit_sphere)
+        return accumulator.get_statistics()
+
+
+def _get_positions(electrode_arrays: dict[str, np.ndarray], unit_sphere: bool) -> np.ndarray:
+    coordinates = np.asarray(electrode_arrays["coordinates"], dtype=np.float64)
+    if not unit_sphere:
+        return coordinates
+
+    directions = coordinates - np.nan_to_num(np.asarray(electrode_arrays["cap_centroid"]))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+
+    interpolated_directions = np.asarray(electrode_arrays["interpolated_unit_sphere_coordinates"])
+    known = ~np.isnan(interpolated_directions[:, 0])
+    directions[known] = interpolated_directions[known]
+    return directions
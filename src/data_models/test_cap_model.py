@@ -0,0 +1,82 @@
+import numpy as np
+
+from config.mappings import ModalitiesMapping
+from data_models.cap_model import CapModel
+from data_models.electrode import Electrode
+
+
+def _create_electrodes(count: int, seed: int) -> list[Electrode]:
+    rng = np.random.default_rng(seed)
+    modalities = [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI, ModalitiesMapping.REFERENCE]
+    return [
+        Electrode(
+            coordinates=rng.uniform(0, 0.1, 3),
+            modality=modalities[i % len(modalities)],
+            label=f"E{i}" if i % 2 == 0 else None,
+            fiducial=i % 7 == 0,
+        )
+        for i in range(count)
+    ]
+
+
+def _copy_electrodes(electrodes: list[Electrode]) -> list[Electrode]:
+    return [
+        Electrode(
+            coordinates=electrode.coordinates,
+            modality=electrode.modality,
+            label=electrode.label,
+            fiducial=electrode.fiducial,
+        )
+        for electrode in electrodes
+    ]
+
+
+def _assert_arrays_equal(arrays: dict, expected: dict) -> None:
+    assert arrays.keys() == expected.keys()
+    for name, array in arrays.items():
+        assert np.array_equal(array, expected[name], equal_nan=array.dtype.kind == "f"), name
+
+
+def test_batch_insert():
+    # candidates closer than the electrode spacing are rejected in insertion order
+    electrodes = _create_electrodes(60, seed=2)
+    existing = _create_electrodes(10, seed=3)
+
+    one_at_a_time = CapModel()
+    one_at_a_time.insert_electrodes(_copy_electrodes(existing))
+    for electrode in _copy_electrodes(electrodes):
+        one_at_a_time.insert_electrode(electrode)
+
+    batch = CapModel()
+    batch.insert_electrodes(_copy_electrodes(existing))
+    inserted_count = batch.insert_electrodes(_copy_electrodes(electrodes))
+
+    assert 0 < inserted_count < len(electrodes)
+    _assert_arrays_equal(batch.get_electrode_arrays(), one_at_a_time.get_electrode_arrays())
+
+
+def test_batch_insert_degenerate_fiducials():
+    # a small batch on a line used to make the in-batch pair search scan billions of cells
+    fiducials = [
+        Electrode(np.array([x, 1e-8 * x, 0.0]), ModalitiesMapping.MRI, label, fiducial=True)
+        for x, label in ((0.0, "NAS"), (60.0, "LPA"), (120.0, "RPA"))
+    ]
+    model = CapModel()
+    assert model.insert_electrodes(fiducials) == 3
+    too_close = Electrode(np.array([60.0, 1.0, 0.0]), ModalitiesMapping.MRI, "Cz")
+    assert model.insert_electrodes([too_close]) == 0
+
+
+def test_insert_degenerate_electrodes():
+    # nearly collinear electrodes used to make the spacing check scan billions of cells
+    model = CapModel()
+    inserted_count = model.insert_electrodes(
+        [
+            Electrode(np.array([0.0, 0.0, 0.0]), ModalitiesMapping.REFERENCE),
+            Electrode(np.array([1.0, 1e-7, 1e-7]), ModalitiesMapping.REFERENCE),
+        ]
+    )
+    assert inserted_count == 2
+
+    model.insert_electrode(Electrode(np.array([1.0, 1e-7, 1e-9]), ModalitiesMapping.REFERENCE))
+    assert model.rowCount() == 2
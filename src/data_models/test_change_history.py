@@ -0,0 +1,114 @@
+import numpy as np
+
+from config.mappings import ModalitiesMapping
+from data_models.electrode import Electrode
+from data_models.electrode_store import ChangeHistory, ElectrodeStore
+
+
+def _create_electrodes(count: int, seed: int = 0) -> list[Electrode]:
+    rng = np.random.default_rng(seed)
+    modalities = [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI, ModalitiesMapping.REFERENCE]
+    return [
+        Electrode(
+            coordinates=rng.uniform(0, 0.1, 3),
+            modality=modalities[i % len(modalities)],
+            label=f"E{i}" if i % 2 == 0 else None,
+            fiducial=i % 7 == 0,
+        )
+        for i in range(count)
+    ]
+
+
+def _create_store(history: ChangeHistory) -> ElectrodeStore:
+    store = ElectrodeStore()
+    store.history = history
+    store.extend(_create_electrodes(12))
+    return store
+
+
+def _assert_arrays_equal(arrays: dict, expected: dict) -> None:
+    assert arrays.keys() == expected.keys()
+    for name, array in arrays.items():
+        assert np.array_equal(array, expected[name], equal_nan=array.dtype.kind == "f"), name
+
+
+def test_undo_redo():
+    store = ElectrodeStore()
+    states = [store.get_arrays()]
+
+    store.extend(_create_electrodes(12))
+    states.append(store.get_arrays())
+    store.remove([0, 2])
+    states.append(store.get_arrays())
+    store.set_rows([1, 3], "label", "Fz")
+    states.append(store.get_arrays())
+    with store.operation():
+        store.get_view(0).coordinates = np.zeros(3)
+        store.extend(_create_electrodes(3, seed=1))
+    states.append(store.get_arrays())
+
+    for state in reversed(states[:-1]):
+        assert store.undo()
+        _assert_arrays_equal(store.get_arrays(), state)
+    assert not store.undo()
+
+    for state in states[1:]:
+        assert store.redo()
+        _assert_arrays_equal(store.get_arrays(), state)
+    assert not store.redo()
+
+
+def test_restore_checkpoint():
+    store = _create_store(ChangeHistory(max_operations=3))
+    store.history.add_checkpoint()
+    checkpoint = store.get_arrays()
+
+    # more operations than the history keeps
+    for seed in range(6):
+        store.extend(_create_electrodes(1, seed=seed + 1))
+    assert store.restore_checkpoint()
+    _assert_arrays_equal(store.get_arrays(), checkpoint)
+
+    # a checkpoint among undone operations discarded by a new operation
+    store.remove([0])
+    store.history.add_checkpoint()
+    checkpoint = store.get_arrays()
+    store.undo()
+    store.set_rows([1], "label", "Oz")
+    assert store.restore_checkpoint()
+    _assert_arrays_equal(store.get_arrays(), checkpoint)
+
+    assert not store.restore_checkpoint()
+
+
+def test_checkpoints_keep_limits():
+    max_operations = 5
+    store = _create_store(ChangeHistory(max_operations=max_operations, max_rows=40))
+    checkpoints = []
+
+    # checkpoints that are never restored, as made by the proceed buttons
+    for step in range(3):
+        store.history.add_checkpoint()
+        checkpoints.append(store.get_arrays())
+        for seed in range(4 * max_operations):
+            if seed % 3 == 0:
+                with store.operation():
+                    store.set_rows([seed % len(store)], "label", f"L{step}.{seed}")
+                    store.extend(_create_electrodes(2, seed=100 * step + seed))
+            else:
+                store.remove([len(store) - 1])
+                store.extend(_create_electrodes(1, seed=100 * step + seed))
+            assert store.history.undo_count <= max_operations
+            assert store.history._row_count <= 40
+
+    state = store.get_arrays()
+    for _ in range(store.history.undo_count):
+        assert store.undo()
+    for _ in range(store.history.redo_count):
+        assert store.redo()
+    _assert_arrays_equal(store.get_arrays(), state)
+
+    for checkpoint in reversed(checkpoints):
+        assert store.restore_checkpoint()
+        _assert_arrays_equal(store.get_arrays(), checkpoint)
+    assert not store.restore_checkpoint()
@@ -0,0 +1,103 @@
+import numpy as np
+
+from config.mappings import ModalitiesMapping
+from data_models.cap_model import CapModel
+from data_models.electrode import Electrode
+from data_models.electrode_store import ElectrodeStore
+
+
+def _create_electrodes(count: int, seed: int = 0) -> list[Electrode]:
+    rng = np.random.default_rng(seed)
+    modalities = [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI, ModalitiesMapping.REFERENCE]
+    return [
+        Electrode(
+            coordinates=rng.uniform(0, 0.1, 3),
+            modality=modalities[i % len(modalities)],
+            label=f"E{i}" if i % 2 == 0 else None,
+            fiducial=i % 7 == 0,
+        )
+        for i in range(count)
+    ]
+
+
+def _create_store(count: int = 12) -> ElectrodeStore:
+    store = ElectrodeStore()
+    store.extend(_create_electrodes(count))
+    return store
+
+
+def _assert_label_index(store: ElectrodeStore) -> None:
+    # the (label, modality) index as rebuilt from the columns
+    expected = {}
+    for row in range(len(store)):
+        view = store.get_view(row)
+        if not view.fiducial:
+            expected.setdefault((view.label, view.modality), set()).add(int(store.ids[row]))
+
+    assert store._label_index.keys() == {
+        (label, store.get_modality_code(modality)) for label, modality in expected
+    }
+    for (label, modality), electrode_ids in expected.items():
+        assert store.get_ids_by_label(label, modality) == electrode_ids
+
+
+def test_label_index():
+    store = _create_store()
+    view = store.get_view(3)
+    electrode_id = int(store.ids[3])
+
+    view.label = "Cz"
+    assert store.get_ids_by_label("Cz", view.modality) == {electrode_id}
+
+    store.set_rows([3], "modality", ModalitiesMapping.MRI)
+    assert store.get_ids_by_label("Cz", ModalitiesMapping.MRI) == {electrode_id}
+
+    # fiducials are not found by label
+    store.set_rows([3], "fiducial", True)
+    assert store.get_ids_by_label("Cz", ModalitiesMapping.MRI) == set()
+    _assert_label_index(store)
+
+
+def test_label_index_history():
+    store = _create_store()
+    store.set_rows([1, 2, 5], "label", "Fz")
+    store.remove([0, 2])
+    with store.operation():
+        store.set_rows([0], "modality", ModalitiesMapping.REFERENCE)
+        store.extend(_create_electrodes(4, seed=1))
+    _assert_label_index(store)
+
+    while store.undo():
+        _assert_label_index(store)
+    while store.redo():
+        _assert_label_index(store)
+
+
+def test_object_id_index():
+    store = _create_store()
+    views = [store.get_view(row) for row in range(len(store))]
+    for view in views:
+        assert store.get_view_by_object_id(id(view)) is view
+
+    # removed views are no longer found, and found again once the removal is undone
+    store.remove([2])
+    assert store.get_view_by_object_id(id(views[2])) is None
+    store.undo()
+    assert store.get_view_by_object_id(id(views[2])) is views[2]
+
+
+def test_cap_model_lookups():
+    model = CapModel()
+    model.insert_electrodes(
+        [
+            Electrode(np.array([0.0, 0.0, 0.0]), ModalitiesMapping.HEADSCAN, "Cz"),
+            Electrode(np.array([1.0, 0.0, 0.0]), ModalitiesMapping.HEADSCAN, "Pz"),
+            Electrode(np.array([2.0, 0.0, 0.0]), ModalitiesMapping.HEADSCAN, "Pz"),
+        ]
+    )
+    electrode = model.get_electrode_by_label_and_modality("Cz", ModalitiesMapping.HEADSCAN)
+    assert electrode is model.get_electrode(0)
+    assert model.get_electrode_by_object_id(id(electrode)) is electrode
+    # ambiguous and missing labels are not resolved
+    assert model.get_electrode_by_label_and_modality("Pz", ModalitiesMapping.HEADSCAN) is None
+    assert model.get_electrode_by_label_and_modality("Cz", ModalitiesMapping.MRI) is None
@@ -0,0 +1,81 @@
+import numpy as np
+
+from config.mappings import ModalitiesMapping
+from data_models.electrode import Electrode
+from data_models.electrode_store import ElectrodeStore
+
+
+def _create_electrodes(count: int, seed: int = 0) -> list[Electrode]:
+    rng = np.random.default_rng(seed)
+    modalities = [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI, ModalitiesMapping.REFERENCE]
+    return [
+        Electrode(
+            coordinates=rng.uniform(0, 0.1, 3),
+            modality=modalities[i % len(modalities)],
+            label=f"E{i}" if i % 2 == 0 else None,
+            fiducial=i % 7 == 0,
+        )
+        for i in range(count)
+    ]
+
+
+def _create_store(count: int = 12) -> ElectrodeStore:
+    store = ElectrodeStore()
+    store.extend(_create_electrodes(count))
+    return store
+
+
+def test_insert():
+    electrodes = _create_electrodes(5)
+    store = ElectrodeStore()
+    ids = store.extend(electrodes)
+
+    assert len(store) == 5
+    assert np.array_equal(store.ids, ids)
+    for row, electrode in enumerate(electrodes):
+        # inserted electrodes become the views of their rows
+        assert store.get_view(row) is electrode
+        assert store.get_row(int(ids[row])) == row
+    assert np.array_equal(store.coordinates[2], electrodes[2].coordinates)
+
+
+def test_remove():
+    store = _create_store()
+    ids = store.ids.copy()
+    coordinates = store.coordinates.copy()
+
+    store.remove([1, 4, 5])
+
+    keep = np.ones(len(ids), dtype=bool)
+    keep[[1, 4, 5]] = False
+    assert np.array_equal(store.ids, ids[keep])
+    assert np.array_equal(store.coordinates, coordinates[keep])
+    for row, electrode_id in enumerate(store.ids.tolist()):
+        assert store.get_row(electrode_id) == row
+
+
+def test_view_write_through():
+    store = _create_store()
+    view = store.get_view(1)
+
+    view.coordinates = np.array([1.0, 2.0, 3.0])
+    view.labeled = True
+    assert np.array_equal(store.coordinates[1], [1.0, 2.0, 3.0])
+    assert store.get_column("labeled")[1]
+
+    store.set_rows([1], "label", "Pz")
+    assert view.label == "Pz"
+
+
+def test_detach_on_remove():
+    store = _create_store()
+    view = store.get_view(2)
+    values = store.get_values(int(store.ids[2]))
+
+    store.remove([2])
+    assert view._store is None
+    # the view keeps the last values and no longer writes through
+    assert view.label == values["label"]
+    assert np.array_equal(view.coordinates, values["coordinates"])
+    view.label = "detached"
+    assert "detached" not in store.labels
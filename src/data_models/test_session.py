@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import vedo as vd
+
+from config.mappings import ModalitiesMapping
+from data_models.cap_model import CapModel
+from data_models.electrode import Electrode
+from data_models.head_models import HeadScan
+from data_models.session import Session, load_session_electrode_arrays
+from utils.mesh import get_mesh_arrays
+
+
+def _create_session() -> Session:
+    head_scan = HeadScan.from_arrays(
+        {**get_mesh_arrays(vd.Sphere(res=12)), "normalization_scale": np.array(2.5)},
+        "scan.obj",
+    )
+    head_scan._registered = True
+
+    electrode_cap = CapModel()
+    rng = np.random.default_rng(0)
+    electrode_cap.insert_electrodes(
+        [
+            Electrode(
+                coordinates=rng.uniform(0, 1, 3),
+                modality=ModalitiesMapping.HEADSCAN,
+                label="Cz" if i == 3 else None,
+            )
+            for i in range(8)
+        ]
+    )
+    electrode_cap.set_correspondence_arrays(
+        {
+            "row": np.array([1, 5]),
+            "factor": np.array([0.25, 0.75]),
+            "suggested_label": np.array(["Fz", "Pz"]),
+        }
+    )
+    return Session("s01", head_scan, electrode_cap, {"scan_to_mri": np.eye(4) * 2})
+
+
+def test_save_load(tmp_path):
+    session = _create_session()
+    filename = str(tmp_path / "s01.npz")
+    session.save(filename)
+    loaded = Session.load(filename)
+
+    assert loaded.session_id == "s01"
+    assert loaded.head_scan.surface_file == "scan.obj"
+    assert loaded.head_scan.texture_file is None
+    assert loaded.head_scan._registered
+    assert loaded.head_scan.normalization_scale == 2.5
+    mesh_arrays = get_mesh_arrays(session.head_scan.mesh)
+    loaded_mesh_arrays = get_mesh_arrays(loaded.head_scan.mesh)
+    assert loaded_mesh_arrays.keys() == mesh_arrays.keys()
+    for name, array in mesh_arrays.items():
+        assert np.array_equal(loaded_mesh_arrays[name], array), name
+    assert np.array_equal(loaded.registration_matrices["scan_to_mri"], np.eye(4) * 2)
+
+    electrode_arrays = session.electrode_cap.get_electrode_arrays()
+    loaded_arrays = loaded.electrode_cap.get_electrode_arrays()
+    assert loaded_arrays.keys() == electrode_arrays.keys()
+    for name, array in electrode_arrays.items():
+        # unset columns hold nan
+        np.testing.assert_array_equal(loaded_arrays[name], array, err_msg=name)
+
+    # suggestions point at the loaded electrodes of the same rows
+    correspondence = loaded.electrode_cap.get_correspondence_arrays()
+    assert np.array_equal(correspondence["row"], [1, 5])
+    assert np.array_equal(correspondence["factor"], [0.25, 0.75])
+    assert np.array_equal(correspondence["suggested_label"], ["Fz", "Pz"])
+
+    electrodes_only = load_session_electrode_arrays(filename)
+    for name, array in electrode_arrays.items():
+        np.testing.assert_array_equal(electrodes_only[name], array, err_msg=name)
+
+
+def test_load_unsupported_version(tmp_path):
+    filename = str(tmp_path / "other.npz")
+    np.savez(filename, points=np.zeros(3))
+    with pytest.raises(ValueError):
+        Session.load(filename)
@@ -0,0 +1,111 @@
+import numpy as np
+
+from config.mappings import ModalitiesMapping
+from data_models.session import SESSION_FORMAT_VERSION
+from data_models.study import LabelStatisticsAccumulator, Study
+from utils.npz import save_npz
+
+LABELS = ["Fz", "Cz", "Pz", "Oz", "T7", "T8"]
+
+
+def _create_electrode_arrays(seed: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    count = 15
+    labels = rng.choice(LABELS, count)
+    return {
+        "coordinates": rng.normal(0, 1, (count, 3)),
+        "modality": rng.choice(
+            [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI, ModalitiesMapping.REFERENCE],
+            count,
+        ),
+        "label": labels,
+        "has_label": rng.uniform(size=count) < 0.9,
+        "labeled": rng.uniform(size=count) < 0.9,
+        "fiducial": rng.uniform(size=count) < 0.1,
+        "interpolated": rng.uniform(size=count) < 0.2,
+    }
+
+
+def _get_statistics_brute_force(sessions: list[dict[str, np.ndarray]]) -> dict:
+    # per label: the session means of its measured electrodes, and its interpolated count
+    samples = {label: [] for label in LABELS}
+    interpolated = dict.fromkeys(LABELS, 0)
+    for arrays in sessions:
+        for label in LABELS:
+            selected = (
+                (arrays["label"] == label)
+                & (arrays["modality"] != ModalitiesMapping.REFERENCE)
+                & arrays["labeled"]
+                & arrays["has_label"]
+                & ~arrays["fiducial"]
+            )
+            measured = selected & ~arrays["interpolated"]
+            if np.any(measured):
+                samples[label].append(arrays["coordinates"][measured].mean(axis=0))
+            interpolated[label] += int(np.any(selected & arrays["interpolated"]))
+    return {
+        label: (len(samples[label]), interpolated[label], np.array(samples[label]))
+        for label in LABELS
+    }
+
+
+def _check_statistics(accumulator: LabelStatisticsAccumulator, sessions: list) -> None:
+    statistics = accumulator.get_statistics()
+    assert statistics.session_count == len(sessions)
+    for label, (measured, interpolated, samples) in _get_statistics_brute_force(sessions).items():
+        row = list(statistics.labels).index(label)
+        assert statistics.measured_count[row] == measured
+        assert statistics.interpolated_count[row] == interpolated
+        if measured == 0:
+            assert np.all(np.isnan(statistics.mean_position[row]))
+            continue
+        assert np.allclose(statistics.mean_position[row], samples.mean(axis=0))
+        assert np.allclose(statistics.standard_deviation[row], samples.std(axis=0))
+        dispersion = np.sqrt(np.mean(np.sum((samples - samples.mean(axis=0)) ** 2, axis=1)))
+        assert np.isclose(statistics.dispersion[row], dispersion)
+
+
+def test_update():
+    sessions = [_create_electrode_arrays(seed) for seed in range(12)]
+    accumulator = LabelStatisticsAccumulator(LABELS)
+    for arrays in sessions:
+        accumulator.update(arrays)
+    _check_statistics(accumulator, sessions)
+
+
+def test_merge():
+    sessions = [_create_electrode_arrays(seed) for seed in range(12)]
+    accumulator = LabelStatisticsAccumulator(LABELS)
+    for part in (sessions[0:1], sessions[1:7], [], sessions[7:12]):
+        # parts see their labels in a different order than the merged accumulator
+        part_accumulator = LabelStatisticsAccumulator()
+        for arrays in part:
+            part_accumulator.update(arrays)
+        accumulator.merge(part_accumulator)
+    _check_statistics(accumulator, sessions)
+
+
+def test_compute_label_statistics(tmp_path):
+    sessions = [_create_electrode_arrays(seed) for seed in range(5)]
+    for session_id, arrays in enumerate(sessions):
+        save_npz(
+            str(tmp_path / f"s{session_id:02d}.npz"),
+            {
+                "format_version": np.array(SESSION_FORMAT_VERSION),
+                **{f"electrodes.{name}": array for name, array in arrays.items()},
+            },
+        )
+
+    study = Study.from_directory(str(tmp_path))
+    assert study.session_ids == ["s00", "s01", "s02", "s03", "s04"]
+    statistics = study.compute_label_statistics(labels=["Iz"])
+    # requested labels are reported without any session having them
+    assert statistics.labels[0] == "Iz" and statistics.measured_count[0] == 0
+
+    accumulator = LabelStatisticsAccumulator()
+    for arrays in sessions:
+        accumulator.update(arrays)
+    expected = accumulator.get_statistics()
+    rows = [list(statistics.labels).index(label) for label in expected.labels]
+    assert np.array_equal(statistics.measured_count[rows], expected.measured_count)
+    assert np.allclose(statistics.mean_position[rows], expected.mean_position, equal_nan=True)
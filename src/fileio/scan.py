@@ -60,7 +60,14 @@ def load_texture(
     if electrode_detector:
         electrode_detector.apply_texture(files["texture"])
 
-    headmodels["scan"] = HeadScan(files["scan"], files["texture"])
+    # the loaded surface only needs to be re-textured, not read and normalized again
+    if headmodels["scan"] is not None and headmodels["scan"].surface_file == files["scan"]:
+        headmodels["scan"].set_texture(files["texture"])
+    else:
+        headmodels["scan"] = HeadScan(files["scan"], files["texture"])
+
+    if electrode_detector:
+        electrode_detector.set_region_of_interest(headmodels["scan"].mesh)
 
     for label, frame in frames:
         views[label] = create_surface_view(
@@ -7,11 +7,14 @@ from ui.platform_styles import apply_platform_specific_styles, get_platform_styl
 
 from data_models.cap_model import CapModel
 
-from processing_models.electrode_detector import DogHoughElectrodeDetector
+from processing_models.electrode_detector import create_electrode_detector
 from processing_models.electrode_registrator import RigidElectrodeRegistrator
 from processing_models.electrode_aligner import ElasticElectrodeAligner
 from processing_models.surface_registrator import LandmarkSurfaceRegistrator
 
+from ui.preview_scheduler import PreviewScheduler
+from ui.image_presenter import ImagePresenter
+
 from ui.state_manager.state_machine import States, StateMachine
 from ui.state_manager.states import initialize_fileio_states, initialize_processing_states
 from ui.state_manager.transitions import (
@@ -90,7 +93,9 @@ class StartQt6(QMainWindow):
         # main processing models
         self.model = CapModel()
         # detector for 2D image electrode detection
-        self.electrode_detector = DogHoughElectrodeDetector()
+        self.electrode_detector = create_electrode_detector()
+        # background computation of the texture DoG and Hough previews
+        self.preview_scheduler = PreviewScheduler(parent=self)
         # registrator for headscan to MRI surface registration
         self.surface_registrator = LandmarkSurfaceRegistrator()
         # registrator for reference (manufacturer) and measured locations registration
@@ -160,7 +165,8 @@ class StartQt6(QMainWindow):
             "mri": None,
         }
 
-        self.images = {"dog": None, "hough": None}
+        # latest DoG and Hough previews with their scaled pixmaps
+        self.images = ImagePresenter()
 
     def update_button_states(self, **kwargs):
         for button_name, enabled_state in kwargs.items():
@@ -194,6 +200,9 @@ class StartQt6(QMainWindow):
                 ("labeling_main", self.ui.labeling_main_frame),
                 ("labeling_reference", self.ui.labeling_reference_frame),
             ],
+            self.images,
+            self.ui.photo_label,
+            self.ui.texture_frame,
         )
 
     def on_close(self):
@@ -0,0 +1,416 @@
+"""
+Batch localization of many sessions in a process pool.
+
+Sessions come from a manifest CSV or a directory with one subdirectory per session. Every
+finished session is appended to a status log as one JSON line, so an interrupted run
+resumes with the sessions that have no record yet. Machines sharing a filesystem split a
+batch into shards; each shard writes its own status log, and all logs are read on resume.
+
+This module imports no processing code itself; the pipeline is imported once per worker.
+"""
+
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import zlib
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+
+from config.pipeline import BatchParameters, StageCacheParameters
+
+logger = logging.getLogger(__name__)
+
+# manifest CSV column -> BatchSession file field
+MANIFEST_COLUMNS = {
+    "scan": "scan_file",
+    "texture": "texture_file",
+    "montage": "montage_file",
+    "seed_labels": "seed_labels_file",
+    "mri": "mri_file",
+    "scan_fiducials": "scan_fiducials_file",
+    "mri_fiducials": "mri_fiducials_file",
+}
+
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+@dataclass
+class BatchSession:
+    session_id: str
+    scan_file: str
+    texture_file: str
+    montage_file: str | None = None
+    seed_labels_file: str | None = None
+    mri_file: str | None = None
+    scan_fiducials_file: str | None = None
+    mri_fiducials_file: str | None = None
+
+    def get_files(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "session_id"}
+
+
+@dataclass
+class BatchSummary:
+    completed: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def read_session_manifest(
+    manifest_file: str, montage_file: str | None = None
+) -> list[BatchSession]:
+    """
+    Reads sessions from a CSV with a session_id column and the columns of MANIFEST_COLUMNS.
+
+    Empty cells are missing files, relative paths are relative to the manifest and
+    `montage_file` is used for sessions without a montage of their own.
+    """
+    root = Path(manifest_file).parent
+
+    sessions = []
+    with open(manifest_file, newline="") as file:
+        for row in csv.DictReader(file):
+            files = {
+                name: str(root / row[column]) if row.get(column) else None
+                for column, name in MANIFEST_COLUMNS.items()
+            }
+            if files["montage_file"] is None:
+                files["montage_file"] = montage_file
+            sessions.append(BatchSession(session_id=row["session_id"], **files))
+
+    _check_unique_session_ids(sessions)
+    return sessions
+
+
+def discover_sessions(sessions_dir: str, montage_file: str | None = None) -> list[BatchSession]:
+    """
+    Finds the sessions of a directory layout, one subdirectory per session named by its id.
+
+    A session directory holds a scan and a texture, and optionally an MRI surface, a
+    montage, seed labels and fiducials named as in BatchParameters; directories without a
+    scan or texture are skipped.
+    """
+    sessions = []
+    for directory in sorted(Path(sessions_dir).iterdir()):
+        if not directory.is_dir():
+            continue
+
+        scan_file = _find_file(directory, BatchParameters.SCAN_PATTERNS)
+        texture_file = _find_file(directory, BatchParameters.TEXTURE_PATTERNS)
+        if scan_file is None or texture_file is None:
+            logger.warning(f"Skipping {directory}: no scan or texture file")
+            continue
+
+        sessions.append(
+            BatchSession(
+                session_id=directory.name,
+                scan_file=scan_file,
+                texture_file=texture_file,
+                montage_file=_find_file(directory, BatchParameters.MONTAGE_PATTERNS)
+                or montage_file,
+                seed_labels_file=_find_file(directory, BatchParameters.SEED_LABELS_PATTERNS),
+                mri_file=_find_file(directory, BatchParameters.MRI_PATTERNS),
+                scan_fiducials_file=_find_file(directory, BatchParameters.SCAN_FIDUCIALS_PATTERNS),
+                mri_fiducials_file=_find_file(directory, BatchParameters.MRI_FIDUCIALS_PATTERNS),
+            )
+        )
+    return sessions
+
+
+def select_shard(
+    sessions: list[BatchSession], shard_index: int, shard_count: int
+) -> list[BatchSession]:
+    """Returns the sessions of one shard; a session always falls into the same shard."""
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard_index} of {shard_count}")
+    return [
+        session
+        for session in sessions
+        if zlib.crc32(session.session_id.encode()) % shard_count == shard_index
+    ]
+
+
+class BatchStatusLog:
+    """
+    Append-only log of session records, one JSON object per line.
+
+    Every shard appends to its own file in the status directory, so no two processes
+    write the same file; reading merges the files of all shards, later records of a
+    session replacing earlier ones.
+    """
+
+    def __init__(self, status_dir: str | Path, shard_index: int = 0, shard_count: int = 1):
+        self.status_dir = Path(status_dir)
+        self.status_file = self.status_dir / f"status-{shard_index}-of-{shard_count}.jsonl"
+
+    def read(self) -> dict[str, dict]:
+        records = {}
+        for status_file in sorted(self.status_dir.glob("status-*.jsonl")):
+            with open(status_file) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line of an interrupted write
+                        continue
+                    records[record["session_id"]] = record
+        return records
+
+    def append(self, record: dict) -> None:
+        self.status_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.status_file, "a") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class BatchRunner:
+    """
+    Localizes sessions in a pool of worker processes and records every session in a
+    status log in the output directory.
+
+    `parameters` are keyword arguments of LocalizationParameters. Sessions with a completed
+    record and an existing output are skipped, as are failed sessions unless
+    `retry_failed` is set. Workers share the stage cache in `cache_dir`; None disables it.
+    With `save_sessions` every session is also saved next to its output.
+
+    A worker that dies, e.g. killed by the out of memory killer, breaks the whole pool.
+    The sessions that had started by then are rerun one by one in a pool of their own, so
+    that only a session that kills its worker again is recorded as failed; the sessions
+    that had not started continue in a fresh pool.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        parameters: dict | None = None,
+        max_workers: int | None = BatchParameters.MAX_WORKERS,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        retry_failed: bool = False,
+        cache_dir: str | None = StageCacheParameters.CACHE_DIR,
+        save_sessions: bool = False,
+    ):
+        self.output_dir = Path(output_dir)
+        self.parameters = parameters or {}
+        self.max_workers = max_workers
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.retry_failed = retry_failed
+        self.cache_dir = cache_dir
+        self.save_sessions = save_sessions
+
+        self.status_log = BatchStatusLog(
+            self.output_dir / BatchParameters.STATUS_DIR, shard_index, shard_count
+        )
+
+    def get_output_file(self, session: BatchSession) -> Path:
+        return self.output_dir / f"{session.session_id}{BatchParameters.OUTPUT_EXTENSION}"
+
+    def get_session_file(self, session: BatchSession) -> Path:
+        return self.output_dir / f"{session.session_id}{BatchParameters.SESSION_EXTENSION}"
+
+    def get_pending_sessions(self, sessions: list[BatchSession]) -> list[BatchSession]:
+        records = self.status_log.read()
+
+        pending = []
+        for session in select_shard(sessions, self.shard_index, self.shard_count):
+            status = records.get(session.session_id, {}).get("status")
+            if status == COMPLETED and self.get_output_file(session).exists():
+                continue
+            if status == FAILED and not self.retry_failed:
+                continue
+            pending.append(session)
+        return pending
+
+    def run(self, sessions: list[BatchSession]) -> BatchSummary:
+        _check_unique_session_ids(sessions)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        start = time.perf_counter()
+        summary = BatchSummary()
+
+        pending = self.get_pending_sessions(sessions)
+        pending_ids = {session.session_id for session in pending}
+        summary.skipped = [
+            session.session_id
+            for session in select_shard(sessions, self.shard_index, self.shard_count)
+            if session.session_id not in pending_ids
+        ]
+        logger.info(f"Localizing {len(pending)} sessions, skipping {len(summary.skipped)}")
+
+        remaining = pending
+        while len(remaining) > 0:
+            started, remaining, error = self._run_pool(remaining, summary, len(pending))
+            if error is None:
+                break
+
+            if len(started) == 0:
+                # no session got to start, e.g. the worker initializer failed
+                started, remaining = remaining, []
+            logger.warning(
+                f"A worker died ({error!r}); rerunning {len(started)} sessions one by one"
+            )
+            for session in started:
+                crashed, _, error = self._run_pool([session], summary, len(pending), 1)
+                if len(crashed) > 0:
+                    record = _create_record(session, FAILED, error=repr(error))
+                    self._record(session, record, summary, len(pending))
+
+        summary.seconds = time.perf_counter() - start
+        return summary
+
+    def _run_pool(
+        self,
+        sessions: list[BatchSession],
+        summary: BatchSummary,
+        total_count: int,
+        max_workers: int | None = None,
+    ) -> tuple[list[BatchSession], list[BatchSession], BrokenExecutor | None]:
+        # Localizes sessions in a fresh pool and records them. When a worker dies, returns
+        # the unfinished sessions that had started and the ones that had not, with the error.
+        started_queue = multiprocessing.SimpleQueue()
+        unfinished = []
+        broken_error = None
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers or self.max_workers,
+            initializer=_initialize_worker,
+            initargs=(started_queue,),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _localize_session,
+                    session,
+                    str(self.get_output_file(session)),
+                    self.parameters,
+                    self.cache_dir,
+                    str(self.get_session_file(session)) if self.save_sessions else None,
+                ): session
+                for session in sessions
+            }
+            for future in as_completed(futures):
+                session = futures[future]
+                try:
+                    record = future.result()
+                except BrokenExecutor as error:
+                    unfinished.append(session)
+                    broken_error = error
+                    continue
+                self._record(session, record, summary, total_count)
+
+        started_ids = set()
+        while not started_queue.empty():
+            started_ids.add(started_queue.get())
+
+        started = [session for session in unfinished if session.session_id in started_ids]
+        not_started = [session for session in unfinished if session.session_id not in started_ids]
+        return started, not_started, broken_error
+
+    def _record(
+        self, session: BatchSession, record: dict, summary: BatchSummary, total_count: int
+    ) -> None:
+        self.status_log.append(record)
+        if record["status"] == COMPLETED:
+            summary.completed.append(session.session_id)
+        else:
+            summary.failed.append(session.session_id)
+        logger.info(
+            f"Session {session.session_id} {record['status']} "
+            f"({len(summary.completed) + len(summary.failed)}/{total_count})"
+        )
+
+
+# session ids are reported here when a worker starts them
+_started_queue = None
+
+
+def _initialize_worker(started_queue):
+    # the processing stack is imported once per worker; sessions run in parallel already,
+    # so OpenCV does not spread single operations over threads as well
+    import cv2 as cv
+
+    import pipeline.localization  # noqa: F401
+
+    global _started_queue
+    _started_queue = started_queue
+
+    cv.setNumThreads(1)
+
+
+def _localize_session(
+    session: BatchSession,
+    output_file: str,
+    parameters: dict,
+    cache_dir: str | None,
+    session_file: str | None,
+) -> dict:
+    from pipeline.localization import (
+        LocalizationInputs,
+        LocalizationParameters,
+        localize_session,
+    )
+    from pipeline.stage_cache import StageCache
+
+    _started_queue.put(session.session_id)  # type: ignore
+
+    start = time.perf_counter()
+    try:
+        result = localize_session(
+            LocalizationInputs(**session.get_files()),
+            LocalizationParameters(**parameters),
+            output_file,
+            StageCache(cache_dir) if cache_dir is not None else None,
+            session_file,
+        )
+    except Exception as error:
+        logger.exception(f"Localizing session {session.session_id} failed")
+        return _create_record(
+            session, FAILED, seconds=time.perf_counter() - start, error=repr(error)
+        )
+
+    return _create_record(
+        session,
+        COMPLETED,
+        seconds=time.perf_counter() - start,
+        output_file=output_file,
+        session_file=session_file,
+        detected_count=result.detected_count,
+        labeled_count=result.labeled_count,
+        interpolated_count=result.interpolated_count,
+        hough_parameters=result.hough_parameters,
+        stage_seconds=result.stage_seconds,
+        cached_stages=result.cached_stages,
+    )
+
+
+def _create_record(session: BatchSession, status: str, **values) -> dict:
+    return {
+        "session_id": session.session_id,
+        "status": status,
+        "host": socket.gethostname(),
+        "pid": os.getpid(),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        **values,
+    }
+
+
+def _find_file(directory: Path, patterns: tuple[str, ...]) -> str | None:
+    for pattern in patterns:
+        matches = sorted(directory.glob(pattern))
+        if len(matches) > 0:
+            return str(matches[0])
+    return None
+
+
+def _check_unique_session_ids(sessions: list[BatchSession]) -> None:
+    session_ids = [session.session_id for session in sessions]
+    if len(set(session_ids)) != len(session_ids):
+        raise ValueError("Session ids of a batch must be unique")
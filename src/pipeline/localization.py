@@ -0,0 +1,480 @@
+import functools
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from config.electrode_detector import (
+    BlobParameters,
+    DetectorParameters,
+    DogParameters,
+    HoughParameters,
+    HoughSweepParameters,
+    ROIParameters,
+    ScaleSpaceParameters,
+    TilingParameters,
+    UVMappingParameters,
+)
+from config.electrode_labeling import AutolabelParameters, ElasticAlignmentParameters
+from config.mappings import ModalitiesMapping
+from data.loader import load_electrodes_from_file
+from data_models.cap_model import CapModel
+from data_models.electrode import Electrode
+from data_models.head_models import HeadScan, MRIScan
+from data_models.session import Session
+from pipeline.stage_cache import StageCache, StageRunner, get_config_parameters
+from pipeline.steps import (
+    align_reference_electrodes,
+    align_scan_to_mri_fiducials,
+    autolabel_electrodes,
+    insert_scan_electrodes,
+    interpolate_missing_electrodes,
+    project_scan_electrodes_to_mri,
+    register_reference_electrodes,
+)
+from processing_models.electrode_aligner import ElasticElectrodeAligner
+from processing_models.electrode_detector import (
+    DogHoughElectrodeDetector,
+    create_electrode_detector,
+)
+from processing_models.electrode_registrator import RigidElectrodeRegistrator
+from processing_models.hough_sweep import HoughParameterSweep
+from processing_models.surface_registrator import LandmarkSurfaceRegistrator
+from timing.timer import StageTimer
+from utils.texture_store import texture_store
+from utils.tiling import is_tiled_texture
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LocalizationInputs:
+    """
+    Files of one localization session.
+
+    Seed labels and scan fiducials are given in the units of the scan file, MRI fiducials
+    in the units of the MRI surface; all of them are read like electrode location files.
+    The seed labels stand in for the electrodes labeled by hand in the GUI; at least three
+    are needed to label the detected electrodes from the montage.
+    """
+
+    scan_file: str
+    texture_file: str
+    montage_file: str | None = None
+    seed_labels_file: str | None = None
+    mri_file: str | None = None
+    scan_fiducials_file: str | None = None
+    mri_fiducials_file: str | None = None
+
+
+@dataclass
+class LocalizationParameters:
+    detector_method: str = DetectorParameters.METHOD
+    ksize: int = DogParameters.KSIZE
+    sigma: float = DogParameters.SIGMA
+    F: float = DogParameters.FACTOR
+    threshold_level: int = DogParameters.THRESHOLD_LEVEL
+    param1: float = HoughParameters.PARAM1
+    param2: float = HoughParameters.PARAM2
+    min_distance_between_circles: int = HoughParameters.MIN_DISTANCE
+    min_radius: int = HoughParameters.MIN_RADIUS
+    max_radius: int = HoughParameters.MAX_RADIUS
+    # choose the Hough parameters by a sweep scored against the montage size
+    sweep_hough: bool = False
+    autolabel: bool = True
+    interpolate: bool = True
+
+    @property
+    def dog_parameters(self) -> dict:
+        return {
+            "ksize": self.ksize,
+            "sigma": self.sigma,
+            "F": self.F,
+            "threshold_level": self.threshold_level,
+        }
+
+    @property
+    def hough_parameters(self) -> dict:
+        return {
+            "param1": self.param1,
+            "param2": self.param2,
+            "min_distance_between_circles": self.min_distance_between_circles,
+            "min_radius": self.min_radius,
+            "max_radius": self.max_radius,
+        }
+
+
+@dataclass
+class LocalizationResult:
+    model: CapModel
+    detected_count: int = 0
+    labeled_count: int = 0
+    interpolated_count: int = 0
+    aligned_to_mri: bool = False
+    hough_parameters: dict = field(default_factory=dict)
+    # "reference_to_scan" and "scan_to_mri", as far as the session got
+    registration_matrices: dict = field(default_factory=dict)
+    head_scan: HeadScan | None = None
+    stage_seconds: dict = field(default_factory=dict)
+    # stages whose outputs were found in the stage cache
+    cached_stages: list = field(default_factory=list)
+
+
+def localize_session(
+    inputs: LocalizationInputs,
+    parameters: LocalizationParameters | None = None,
+    output_file: str | None = None,
+    cache: StageCache | None = None,
+    session_file: str | None = None,
+) -> LocalizationResult:
+    """
+    Runs detect -> register -> align -> autolabel -> interpolate -> (MRI alignment) -> export
+    on one session without a GUI.
+
+    Without a montage the detected electrodes are exported unlabeled; without an MRI and
+    both fiducial files they stay in the normalized scan space, as in the GUI. Raises
+    ValueError when a requested step lacks the inputs it needs.
+
+    With a stage cache the outputs of the scan, DoG, Hough sweep, circles, electrodes,
+    labeling and MRI stages are looked up first, keyed by their input files, parameters and
+    upstream stages (tiled textures have no DoG stage, their circles are detected tile by
+    tile); a changed parameter only recomputes the stages downstream of it, and the texture
+    is not decoded at all when the detection stages are found.
+
+    With a session file the head scan, electrodes and registrations are also saved as a
+    session named after the file, to be reopened without redoing the localization.
+    """
+    if parameters is None:
+        parameters = LocalizationParameters()
+
+    timer = StageTimer()
+    timer.start()
+
+    stages = StageRunner(cache)
+    model = CapModel()
+    result = LocalizationResult(model=model)
+
+    scan_key, head_scan = _load_head_scan(stages, inputs.scan_file)
+    # recorded for saved sessions; the headless pipeline never renders the scan itself
+    head_scan.texture_file = inputs.texture_file
+    result.head_scan = head_scan
+    texture_key = stages.get_file_key(inputs.texture_file)
+    montage_key = stages.get_file_key(inputs.montage_file)
+    if inputs.montage_file is not None:
+        model.read_electrodes_from_file(inputs.montage_file)
+    timer.log("load")
+
+    @functools.cache
+    def get_electrode_detector() -> DogHoughElectrodeDetector:
+        electrode_detector = create_electrode_detector(parameters.detector_method)
+        electrode_detector.apply_texture(inputs.texture_file)
+        if electrode_detector.texture is None:
+            raise ValueError(f"Could not read the texture {inputs.texture_file}")
+        electrode_detector.set_region_of_interest(head_scan.mesh)
+        return electrode_detector
+
+    # the region of interest is taken from the UV coordinates of the scan
+    texture_inputs = [texture_key, scan_key if ROIParameters.ENABLED else None]
+    detector_parameters = {
+        "detector_method": parameters.detector_method,
+        **get_config_parameters(ROIParameters),
+    }
+
+    result.hough_parameters = _select_hough_parameters(
+        stages, get_electrode_detector, head_scan, model, parameters, texture_inputs, montage_key
+    )
+
+    # tiled textures are filtered tile by tile; their full resolution DoG is never formed
+    tiled = is_tiled_texture(inputs.texture_file)
+    if tiled:
+        dog = None
+    else:
+        dog = stages.run(
+            "dog",
+            {**detector_parameters, **parameters.dog_parameters},
+            texture_inputs,
+            lambda: {
+                "dog": get_electrode_detector().get_difference_of_gaussians(
+                    **parameters.dog_parameters
+                )
+            },
+        )
+
+    def compute_circles() -> dict[str, np.ndarray]:
+        electrode_detector = get_electrode_detector()
+        if dog is None:
+            electrode_detector.set_detection_parameters(
+                parameters.dog_parameters, result.hough_parameters
+            )
+        else:
+            electrode_detector.set_difference_of_gaussians(
+                dog.arrays["dog"], **parameters.dog_parameters
+            )
+            electrode_detector.get_circles(**result.hough_parameters)
+        circles = electrode_detector.get_detection_circles()
+        if circles is None:
+            circles = np.empty((1, 0, 3), dtype=np.uint16)
+        return {"circles": circles}
+
+    circles = stages.run(
+        "circles",
+        {
+            **detector_parameters,
+            **parameters.dog_parameters,
+            **result.hough_parameters,
+            **get_config_parameters(BlobParameters, ScaleSpaceParameters),
+            "tiled": tiled,
+            "tile_size": TilingParameters.TILE_SIZE,
+        },
+        texture_inputs if dog is None else [dog.key],
+        compute_circles,
+    )
+
+    def compute_electrodes() -> dict[str, np.ndarray]:
+        pixels = np.asarray(circles.arrays["circles"][0, :, 0:2], dtype=np.float64)
+        if len(pixels) == 0:
+            return {"coordinates": np.empty((0, 3))}
+        return {
+            "coordinates": get_electrode_detector().get_surface_positions(pixels, head_scan.mesh)
+        }
+
+    electrodes = stages.run(
+        "electrodes",
+        get_config_parameters(UVMappingParameters),
+        [circles.key, scan_key],
+        compute_electrodes,
+    )
+    result.detected_count = insert_scan_electrodes(model, electrodes.arrays["coordinates"])
+    timer.log("detect")
+    logger.info(f"Detected {result.detected_count} electrodes on {inputs.scan_file}")
+
+    labeling_key = None
+    if inputs.montage_file is not None and parameters.autolabel:
+
+        def compute_labeling() -> dict[str, np.ndarray]:
+            _label_seed_electrodes(model, head_scan, inputs.seed_labels_file)
+
+            electrode_registrator = RigidElectrodeRegistrator()
+            if not register_reference_electrodes(model, electrode_registrator):
+                raise ValueError(
+                    "Registering the montage needs at least three seed labels matching "
+                    "detected electrodes"
+                )
+            timer.log("register")
+
+            electrode_aligner = ElasticElectrodeAligner()
+            align_reference_electrodes(model, electrode_aligner)
+            timer.log("align")
+
+            autolabel_electrodes(model, electrode_aligner)
+            timer.log("autolabel")
+
+            if parameters.interpolate:
+                interpolate_missing_electrodes(model)
+                timer.log("interpolate")
+
+            return {
+                **_get_model_arrays(model),
+                "reference_to_scan": electrode_registrator.transformation_matrix,
+            }
+
+        labeling = stages.run(
+            "labeling",
+            {
+                "interpolate": parameters.interpolate,
+                **get_config_parameters(AutolabelParameters, ElasticAlignmentParameters),
+            },
+            [electrodes.key, montage_key, stages.get_file_key(inputs.seed_labels_file)],
+            compute_labeling,
+        )
+        if labeling.cached:
+            _set_model_arrays(model, labeling.arrays)
+            timer.log("labeling")
+        labeling_key = labeling.key
+        result.registration_matrices["reference_to_scan"] = np.array(
+            labeling.arrays["reference_to_scan"]
+        )
+        result.interpolated_count = len(model.get_interpolated_electrodes())
+
+    if inputs.mri_file is not None:
+
+        def compute_mri_alignment() -> dict[str, np.ndarray]:
+            scan_to_mri = _align_to_mri(model, head_scan, inputs)
+            return {**_get_model_arrays(model), "scan_to_mri": scan_to_mri}
+
+        mri_alignment = stages.run(
+            "mri",
+            {},
+            [
+                electrodes.key,
+                labeling_key,
+                montage_key,
+                stages.get_file_key(inputs.mri_file),
+                stages.get_file_key(inputs.scan_fiducials_file),
+                stages.get_file_key(inputs.mri_fiducials_file),
+            ],
+            compute_mri_alignment,
+        )
+        scan_to_mri = np.array(mri_alignment.arrays["scan_to_mri"])
+        if mri_alignment.cached:
+            _set_model_arrays(model, mri_alignment.arrays)
+            head_scan.mesh.apply_transform(scan_to_mri)  # type: ignore
+            head_scan._registered = True
+        result.registration_matrices["scan_to_mri"] = scan_to_mri
+        result.aligned_to_mri = True
+        timer.log("mri")
+
+    result.labeled_count = len(
+        model.get_labeled_electrodes([ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI])
+    )
+
+    if output_file is not None:
+        model.save_electrodes_to_file(output_file)
+        timer.log("export")
+
+    if session_file is not None:
+        Session(Path(session_file).stem, head_scan, model, result.registration_matrices).save(
+            session_file
+        )
+        timer.log("session")
+
+    # the next session of a worker process has a texture of its own
+    texture_store.release(inputs.texture_file)
+
+    result.stage_seconds = dict(timer.stages)
+    result.cached_stages = stages.cached_stages
+    return result
+
+
+def _load_head_scan(stages: StageRunner, scan_file: str) -> tuple[str, HeadScan]:
+    head_scans = []
+
+    def compute_head_scan() -> dict[str, np.ndarray]:
+        head_scans.append(HeadScan(scan_file))
+        return head_scans[0].get_arrays()
+
+    scan = stages.run("scan", {}, [stages.get_file_key(scan_file)], compute_head_scan)
+    if scan.cached:
+        return scan.key, HeadScan.from_arrays(scan.arrays, scan_file)
+    return scan.key, head_scans[0]
+
+
+def _get_model_arrays(model: CapModel) -> dict[str, np.ndarray]:
+    # the suggested labels of the autolabeling are kept along with the electrodes
+    arrays = model.get_electrode_arrays()
+    for name, array in model.get_correspondence_arrays().items():
+        arrays[f"correspondence_{name}"] = array
+    return arrays
+
+
+def _set_model_arrays(model: CapModel, arrays: dict[str, np.ndarray]) -> None:
+    # setting the electrodes clears the suggested labels, which refer to the old ones
+    model.set_electrode_arrays(arrays)
+    model.set_correspondence_arrays(
+        {
+            name[len("correspondence_") :]: array
+            for name, array in arrays.items()
+            if name.startswith("correspondence_")
+        }
+    )
+
+
+def _select_hough_parameters(
+    stages: StageRunner,
+    get_electrode_detector,
+    head_scan: HeadScan,
+    model: CapModel,
+    parameters: LocalizationParameters,
+    texture_inputs: list,
+    montage_key: str | None,
+) -> dict:
+    if not parameters.sweep_hough:
+        return parameters.hough_parameters
+
+    expected_count = len(model.get_electrodes_by_modality([ModalitiesMapping.REFERENCE]))
+    if expected_count == 0:
+        raise ValueError("The Hough parameter sweep needs a montage to score against")
+
+    def compute_sweep() -> dict[str, np.ndarray]:
+        sweep_result = HoughParameterSweep().run(
+            get_electrode_detector(),
+            head_scan.mesh,  # type: ignore
+            expected_count,
+            ksize=parameters.ksize,
+            sigma=parameters.sigma,
+            F=parameters.F,
+        )
+        if sweep_result is None:
+            best_parameters = parameters.hough_parameters
+        else:
+            best_parameters = sweep_result.best_parameters
+        return {name: np.array(value) for name, value in best_parameters.items()}
+
+    sweep = stages.run(
+        "hough_sweep",
+        {
+            "detector_method": parameters.detector_method,
+            "ksize": parameters.ksize,
+            "sigma": parameters.sigma,
+            "F": parameters.F,
+            "fallback": parameters.hough_parameters,
+            **get_config_parameters(ROIParameters, HoughSweepParameters, UVMappingParameters),
+        },
+        [*texture_inputs, montage_key],
+        compute_sweep,
+    )
+    best_parameters = {name: value.item() for name, value in sweep.arrays.items()}
+
+    logger.info(f"Hough parameter sweep selected {best_parameters}")
+    return best_parameters
+
+
+def _label_seed_electrodes(
+    model: CapModel, head_scan: HeadScan, seed_labels_file: str | None
+) -> None:
+    if seed_labels_file is None:
+        return
+
+    # seeds are given in scan units, the scan is normalized on load
+    for seed in load_electrodes_from_file(seed_labels_file):
+        model.label_closest_electrode(
+            seed.coordinates * head_scan.normalization_scale,
+            seed.label,  # type: ignore
+            ModalitiesMapping.HEADSCAN,
+        )
+
+
+def _align_to_mri(model: CapModel, head_scan: HeadScan, inputs: LocalizationInputs) -> np.ndarray:
+    if inputs.scan_fiducials_file is None or inputs.mri_fiducials_file is None:
+        raise ValueError("Aligning the scan to the MRI needs scan and MRI fiducials")
+
+    mri_scan = MRIScan(inputs.mri_file)  # type: ignore
+    model.insert_electrodes(
+        [
+            _create_fiducial(
+                fiducial.coordinates * head_scan.normalization_scale,
+                ModalitiesMapping.HEADSCAN,
+                fiducial.label,  # type: ignore
+            )
+            for fiducial in load_electrodes_from_file(inputs.scan_fiducials_file)
+        ]
+    )
+    model.insert_electrodes(
+        [
+            _create_fiducial(fiducial.coordinates, ModalitiesMapping.MRI, fiducial.label)  # type: ignore
+            for fiducial in load_electrodes_from_file(inputs.mri_fiducials_file)
+        ]
+    )
+
+    surface_registrator = LandmarkSurfaceRegistrator()
+    transformation_matrix = align_scan_to_mri_fiducials(head_scan, model, surface_registrator)
+    if transformation_matrix is None:
+        raise ValueError("The scan and MRI share fewer than three fiducials")
+
+    project_scan_electrodes_to_mri(mri_scan, model)
+    return transformation_matrix
+
+
+def _create_fiducial(coordinates: np.ndarray, modality: str, label: str) -> Electrode:
+    return Electrode(coordinates, modality=modality, label=label, fiducial=True)
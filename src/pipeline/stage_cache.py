@@ -0,0 +1,239 @@
+"""
+Content-addressed on-disk cache of pipeline stage outputs.
+
+A stage output is a dict of numpy arrays stored under a key hashing the stage name, its
+parameters and its inputs: the digests of input files and the keys of upstream stages. A
+changed parameter changes the key of its stage and of every stage downstream of it, while
+the stages upstream are still found. Entries are directories of .npy files that are read
+back memory-mapped; the least recently used entries are evicted above a size limit.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from config.pipeline import StageCacheParameters
+
+logger = logging.getLogger(__name__)
+
+# bump when stage outputs change meaning, to invalidate all stored entries
+CACHE_FORMAT_VERSION = 3
+
+ENTRY_FILE = "entry.json"
+
+
+@dataclass
+class StageCacheEntry:
+    key: str
+    stage: str
+    nbytes: int
+    created: float
+    last_used: float
+
+
+class StageOutput(NamedTuple):
+    key: str
+    arrays: dict[str, np.ndarray]
+    cached: bool
+
+
+class StageCache:
+    """
+    Stage outputs stored in `cache_dir`, one directory of .npy files per key.
+
+    Entries are written to a temporary directory and renamed into place, so concurrent
+    writers (e.g. batch workers) never expose a partial entry; reading an entry marks it
+    as used for the eviction order.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = StageCacheParameters.CACHE_DIR,
+        max_bytes: int = StageCacheParameters.MAX_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def get(self, key: str) -> dict[str, np.ndarray] | None:
+        entry_dir = self._get_entry_dir(key)
+        try:
+            entry = json.loads((entry_dir / ENTRY_FILE).read_text())
+            arrays = {
+                name: np.load(entry_dir / f"{name}.npy", mmap_mode="r") for name in entry["arrays"]
+            }
+            os.utime(entry_dir / ENTRY_FILE)
+        except (OSError, ValueError, KeyError):
+            # missing, or evicted by another process while reading
+            return None
+        return arrays
+
+    def put(self, key: str, stage: str, arrays: dict[str, np.ndarray]) -> None:
+        entry_dir = self._get_entry_dir(key)
+        if entry_dir.exists():
+            return
+
+        partial_dir = entry_dir.with_name(f"{key}.{os.getpid()}.partial")
+        try:
+            partial_dir.mkdir(parents=True, exist_ok=True)
+            nbytes = 0
+            for name, array in arrays.items():
+                array = np.asarray(array)
+                np.save(partial_dir / f"{name}.npy", array, allow_pickle=False)
+                nbytes += array.nbytes
+            entry = {
+                "stage": stage,
+                "arrays": list(arrays),
+                "nbytes": nbytes,
+                "created": time.time(),
+            }
+            (partial_dir / ENTRY_FILE).write_text(json.dumps(entry))
+            os.replace(partial_dir, entry_dir)
+        except OSError as error:
+            # e.g. another process stored the same entry first, or the disk is full
+            logger.debug(f"Stage {stage} output not cached: {error}")
+            shutil.rmtree(partial_dir, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def get_entries(self) -> list[StageCacheEntry]:
+        entries = []
+        for entry_file in self.cache_dir.glob(f"*/*/{ENTRY_FILE}"):
+            if entry_file.parent.name.endswith(".partial"):
+                continue
+            try:
+                entry = json.loads(entry_file.read_text())
+                last_used = entry_file.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            entries.append(
+                StageCacheEntry(
+                    key=entry_file.parent.name,
+                    stage=entry["stage"],
+                    nbytes=entry["nbytes"],
+                    created=entry["created"],
+                    last_used=last_used,
+                )
+            )
+        return entries
+
+    def evict(self, max_bytes: int | None = None) -> list[StageCacheEntry]:
+        """Removes the least recently used entries until the cache fits into max_bytes."""
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+
+        entries = sorted(self.get_entries(), key=lambda entry: entry.last_used)
+        total_bytes = sum(entry.nbytes for entry in entries)
+
+        evicted = []
+        for entry in entries:
+            if total_bytes <= max_bytes:
+                break
+            self._remove_entry(entry.key)
+            total_bytes -= entry.nbytes
+            evicted.append(entry)
+        return evicted
+
+    def clear(self, stage: str | None = None) -> list[StageCacheEntry]:
+        """Removes all entries, or all entries of one stage."""
+        removed = [entry for entry in self.get_entries() if stage is None or entry.stage == stage]
+        for entry in removed:
+            self._remove_entry(entry.key)
+        return removed
+
+    def _get_entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _remove_entry(self, key: str) -> None:
+        # arrays still memory-mapped by a reader stay valid after the files are removed
+        shutil.rmtree(self._get_entry_dir(key), ignore_errors=True)
+
+
+class StageRunner:
+    """
+    Runs pipeline stages, looking their outputs up in a stage cache first.
+
+    Without a cache every stage is computed, and input files are keyed by their path
+    instead of their digest.
+    """
+
+    def __init__(self, cache: StageCache | None = None):
+        self.cache = cache
+        self.cached_stages = []
+
+    def get_file_key(self, file: str | None) -> str | None:
+        if file is None:
+            return None
+        if self.cache is None:
+            return os.path.abspath(file)
+        return compute_file_digest(file)
+
+    def run(
+        self,
+        stage: str,
+        parameters: dict,
+        inputs: list[str | None],
+        compute: Callable[[], dict[str, np.ndarray]],
+    ) -> StageOutput:
+        key = compute_stage_key(stage, parameters, inputs)
+
+        if self.cache is not None:
+            arrays = self.cache.get(key)
+            if arrays is not None:
+                logger.info(f"Stage {stage} found in the cache")
+                self.cached_stages.append(stage)
+                return StageOutput(key, arrays, True)
+
+        arrays = compute()
+        if self.cache is not None:
+            self.cache.put(key, stage, arrays)
+        return StageOutput(key, arrays, False)
+
+
+def compute_stage_key(stage: str, parameters: dict, inputs: list[str | None]) -> str:
+    content = json.dumps(
+        {
+            "version": CACHE_FORMAT_VERSION,
+            "stage": stage,
+            "parameters": parameters,
+            "inputs": inputs,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(content.encode(), digest_size=20).hexdigest()
+
+
+def compute_file_digest(file: str) -> str:
+    """Returns the digest of the file contents, computed once per file version."""
+    stat = os.stat(file)
+    return _compute_file_digest(os.path.abspath(file), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _compute_file_digest(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as file:
+        while chunk := file.read(2**20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_config_parameters(*config_classes: type) -> dict:
+    """Returns the constants of configuration classes, to key the stages that use them."""
+    return {
+        f"{config_class.__name__}.{name}": value
+        for config_class in config_classes
+        for name, value in vars(config_class).items()
+        if not name.startswith("_")
+    }
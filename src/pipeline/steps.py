@@ -0,0 +1,217 @@
+"""
+Qt-free steps of the electrode localization pipeline.
+
+Every step works on the cap model and the processing models only; the GUI handlers call
+the same steps and update their views afterwards, and the headless pipeline chains them.
+"""
+
+import numpy as np
+
+from config.electrode_labeling import AutolabelParameters
+from config.mappings import ModalitiesMapping
+from data_models.cap_model import CapModel
+from data_models.electrode import Electrode
+from data_models.head_models import HeadScan, MRIScan
+from processing_models.electrode_aligner import (
+    BaseElectrodeLabelingAligner,
+    compute_electrode_correspondence,
+)
+from processing_models.electrode_detector import BaseElectrodeDetector
+from processing_models.electrode_registrator import BaseElectrodeRegistrator
+from processing_models.surface_registrator import LandmarkSurfaceRegistrator
+from utils.spatial import compute_distance_between_coordinates
+
+MEASURED_MODALITIES = [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI]
+
+
+def detect_scan_electrodes(
+    head_scan: HeadScan, electrode_detector: BaseElectrodeDetector, model: CapModel
+) -> int:
+    """Detects the electrodes on the textured head scan; returns the number inserted."""
+    return model.insert_electrodes(electrode_detector.detect(head_scan.mesh))  # type: ignore
+
+
+def insert_scan_electrodes(model: CapModel, coordinates: np.ndarray) -> int:
+    """Inserts electrodes detected at the given scan coordinates; returns the number inserted."""
+    return model.insert_electrodes(
+        [
+            Electrode(np.array(vertex), modality=ModalitiesMapping.HEADSCAN, label="None")
+            for vertex in coordinates
+        ]
+    )
+
+
+def align_scan_to_mri_fiducials(
+    head_scan: HeadScan, model: CapModel, surface_registrator: LandmarkSurfaceRegistrator
+) -> np.ndarray | None:
+    """
+    Registers the head scan to the MRI surface by the fiducials both modalities share and
+    moves the scan electrodes along; returns None if fewer than three fiducials match.
+    """
+    scan_fiducials = {fid.label: fid for fid in model.get_fiducials([ModalitiesMapping.HEADSCAN])}
+    mri_fiducials = {fid.label: fid for fid in model.get_fiducials([ModalitiesMapping.MRI])}
+
+    labels = sorted(set(scan_fiducials).intersection(mri_fiducials))
+    if len(labels) < 3:
+        return None
+
+    surface_registrator.set_mesh(head_scan.mesh)  # type: ignore
+    surface_registrator.set_landmarks(
+        [scan_fiducials[label].coordinates for label in labels],  # type: ignore
+        [mri_fiducials[label].coordinates for label in labels],  # type: ignore
+    )
+
+    transformation_matrix = head_scan.register_mesh(surface_registrator)
+    if transformation_matrix is not None:
+        model.transform_electrodes(ModalitiesMapping.HEADSCAN, transformation_matrix)
+    return transformation_matrix
+
+
+def project_scan_electrodes_to_mri(mri_scan: MRIScan, model: CapModel) -> None:
+    model.project_electrodes_to_mesh(
+        mesh=mri_scan.mesh,
+        modality_from=ModalitiesMapping.HEADSCAN,
+        modality_to=ModalitiesMapping.MRI,
+    )
+
+
+def register_reference_electrodes(
+    model: CapModel, electrode_registrator: BaseElectrodeRegistrator
+) -> bool:
+    """
+    Registers the reference (montage) electrodes to the labeled measured electrodes;
+    returns False if too few measured electrodes are labeled.
+    """
+    model.compute_centroid()
+
+    labeled_measured_electrodes = model.get_labeled_electrodes(MEASURED_MODALITIES)
+    if len(labeled_measured_electrodes) < AutolabelParameters.min_labeled_electrodes:
+        return False
+
+    with model.operation():
+        electrode_registrator.register(
+            source_electrodes=model.get_electrodes_by_modality([ModalitiesMapping.REFERENCE]),
+            target_electrodes=labeled_measured_electrodes,
+        )
+    return True
+
+
+def align_reference_electrodes(
+    model: CapModel, electrode_aligner: BaseElectrodeLabelingAligner
+) -> None:
+    """Moves the reference electrodes onto the measured electrodes carrying their labels."""
+    labeled_measured_electrodes = model.get_labeled_electrodes(MEASURED_MODALITIES)
+    reference_electrodes = model.get_electrodes_by_modality([ModalitiesMapping.REFERENCE])
+    reference_labels = {electrode.label for electrode in reference_electrodes}
+
+    # TODO: missing a check for unique labels
+    matching_electrodes = [
+        electrode
+        for electrode in labeled_measured_electrodes
+        if electrode.label in reference_labels
+    ]
+
+    # check if all labels are unique
+    assert len({electrode.label for electrode in matching_electrodes}) == len(matching_electrodes)
+
+    electrode_aligner.set_source_electrodes(reference_electrodes)
+    with model.operation():
+        for electrode in matching_electrodes:
+            if electrode.label is not None:
+                electrode_aligner.align(electrode)
+
+
+def compute_labeling_correspondence(model: CapModel, factor_threshold: float) -> list[dict]:
+    """Suggests reference labels for the unlabeled measured electrodes."""
+    model.correspondence = compute_electrode_correspondence(
+        labeled_reference_electrodes=model.get_unaligned_electrodes([ModalitiesMapping.REFERENCE]),
+        unlabeled_measured_electrodes=model.get_unlabeled_electrodes(MEASURED_MODALITIES),
+        factor_threshold=factor_threshold,
+    )
+    return model.correspondence
+
+
+def apply_labeling_correspondence(
+    model: CapModel, electrode_aligner: BaseElectrodeLabelingAligner
+) -> None:
+    """Labels the measured electrodes as suggested and re-aligns the reference electrodes."""
+    with model.operation():
+        for entry in model.correspondence:
+            unlabeled_electrode = entry["electrode"]
+            reference_electrode = model.get_electrode_by_label_and_modality(
+                entry["suggested_label"], ModalitiesMapping.REFERENCE
+            )
+            if unlabeled_electrode is not None and reference_electrode is not None:
+                unlabeled_electrode.label = reference_electrode.label
+                unlabeled_electrode.labeled = True
+
+        align_reference_electrodes(model, electrode_aligner)
+
+
+def autolabel_electrodes(
+    model: CapModel,
+    electrode_aligner: BaseElectrodeLabelingAligner,
+    thresholds: np.ndarray | None = None,
+) -> None:
+    """Labels the measured electrodes in rounds of increasingly permissive correspondence."""
+    if thresholds is None:
+        thresholds = np.arange(
+            AutolabelParameters.threshold_start,
+            AutolabelParameters.threshold_stop,
+            AutolabelParameters.threshold_step,
+        )
+
+    with model.operation():
+        for threshold in thresholds:
+            compute_labeling_correspondence(model, threshold)
+            apply_labeling_correspondence(model, electrode_aligner)
+
+
+def interpolate_missing_electrodes(model: CapModel) -> int:
+    """
+    Places the reference electrodes without a measured counterpart on the scan, at the
+    mean cap radius of their three closest measured electrodes; returns how many were added.
+    """
+    measured_electrodes = model.get_electrodes_by_modality([ModalitiesMapping.HEADSCAN])
+    reference_electrodes = model.get_electrodes_by_modality([ModalitiesMapping.REFERENCE])
+
+    measured_labels = set([electrode.label for electrode in measured_electrodes])
+    reference_labels = set([electrode.label for electrode in reference_electrodes])
+    missing_electrodes = set.difference(reference_labels, measured_labels)
+
+    interpolated_electrodes = []
+    for label in missing_electrodes:
+        reference_electrode = model.get_electrode_by_label_and_modality(
+            label, ModalitiesMapping.REFERENCE
+        )
+        closest_measured_electrodes = sorted(
+            measured_electrodes,
+            key=lambda electrode: compute_distance_between_coordinates(
+                electrode.unit_sphere_cartesian_coordinates,
+                reference_electrode.unit_sphere_cartesian_coordinates,  # type: ignore
+            ),
+        )[:3]
+
+        mean_radius = np.mean(
+            [
+                np.linalg.norm(electrode.coordinates - electrode.cap_centroid)
+                for electrode in closest_measured_electrodes
+            ]
+        )
+        interpolated_electrode_coordinates = (
+            mean_radius * reference_electrode.unit_sphere_cartesian_coordinates  # type: ignore
+        )  # type: ignore
+        electrode = Electrode(
+            coordinates=interpolated_electrode_coordinates
+            + closest_measured_electrodes[0].cap_centroid,  # type: ignore
+            modality=ModalitiesMapping.HEADSCAN,
+            label=label,
+            labeled=True,
+            interpolated=True,
+        )
+        electrode.interpolated_unit_sphere_coordinates = (
+            reference_electrode.unit_sphere_cartesian_coordinates  # type: ignore
+        )
+        interpolated_electrodes.append(electrode)
+
+    return model.insert_electrodes(interpolated_electrodes)
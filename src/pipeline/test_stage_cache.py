@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+
+from pipeline.stage_cache import (
+    ENTRY_FILE,
+    StageCache,
+    StageRunner,
+    compute_file_digest,
+    compute_stage_key,
+)
+
+
+def _create_arrays(size: int = 10) -> dict[str, np.ndarray]:
+    points = np.arange(size * 3, dtype=np.float64).reshape(size, 3)
+    return {"points": points, "ids": np.arange(size)}
+
+
+def _set_last_used(cache: StageCache, key: str, last_used: float) -> None:
+    os.utime(cache._get_entry_dir(key) / ENTRY_FILE, (last_used, last_used))
+
+
+def test_put_get(tmp_path):
+    cache = StageCache(tmp_path)
+    arrays = _create_arrays()
+    assert cache.get("ab" * 20) is None
+
+    cache.put("ab" * 20, "detection", arrays)
+    stored = cache.get("ab" * 20)
+    assert stored.keys() == arrays.keys()
+    for name, array in arrays.items():
+        assert isinstance(stored[name], np.memmap)
+        assert np.array_equal(stored[name], array)
+
+    (entry,) = cache.get_entries()
+    assert (entry.key, entry.stage) == ("ab" * 20, "detection")
+    assert entry.nbytes == sum(array.nbytes for array in arrays.values())
+    # no partial directories are left behind
+    assert not list(tmp_path.glob("*/*.partial"))
+
+
+def test_compute_stage_key(tmp_path):
+    key = compute_stage_key("detection", {"ksize": 9}, ["a", None])
+    assert key == compute_stage_key("detection", {"ksize": 9}, ["a", None])
+    assert key != compute_stage_key("detection", {"ksize": 11}, ["a", None])
+    assert key != compute_stage_key("detection", {"ksize": 9}, ["b", None])
+    assert key != compute_stage_key("labeling", {"ksize": 9}, ["a", None])
+
+    file = tmp_path / "scan.obj"
+    file.write_bytes(b"v 0 0 0\n")
+    digest = compute_file_digest(str(file))
+    file.write_bytes(b"v 0 0 1\n")
+    os.utime(file, ns=(0, os.stat(file).st_mtime_ns + 10**9))
+    assert compute_file_digest(str(file)) != digest
+
+
+def test_evict(tmp_path):
+    arrays = _create_arrays()
+    nbytes = sum(array.nbytes for array in arrays.values())
+    cache = StageCache(tmp_path, max_bytes=10 * nbytes)
+    keys = [f"{i:02d}" * 20 for i in range(4)]
+    for last_used, key in enumerate(keys):
+        cache.put(key, "detection", arrays)
+        _set_last_used(cache, key, 1000.0 + last_used)
+
+    # reading an entry makes it the most recently used
+    cache.get(keys[0])
+    evicted = cache.evict(2 * nbytes)
+    assert [entry.key for entry in evicted] == keys[1:3]
+    assert {entry.key for entry in cache.get_entries()} == {keys[0], keys[3]}
+
+
+def test_clear(tmp_path):
+    cache = StageCache(tmp_path)
+    cache.put("aa" * 20, "detection", _create_arrays())
+    cache.put("bb" * 20, "labeling", _create_arrays())
+
+    assert [entry.key for entry in cache.clear("labeling")] == ["bb" * 20]
+    assert cache.get("bb" * 20) is None
+    assert cache.get("aa" * 20) is not None
+    cache.clear()
+    assert cache.get_entries() == []
+
+
+def test_stage_runner(tmp_path):
+    runner = StageRunner(StageCache(tmp_path))
+    calls = []
+
+    def compute() -> dict[str, np.ndarray]:
+        calls.append(1)
+        return _create_arrays()
+
+    first = runner.run("detection", {"ksize": 9}, ["scan"], compute)
+    second = runner.run("detection", {"ksize": 9}, ["scan"], compute)
+    third = runner.run("detection", {"ksize": 11}, ["scan"], compute)
+
+    assert (first.cached, second.cached, third.cached) == (False, True, False)
+    assert first.key == second.key != third.key
+    assert np.array_equal(second.arrays["points"], first.arrays["points"])
+    assert len(calls) == 2
+    assert runner.cached_stages == ["detection"]
+
+    # without a cache every stage is computed
+    uncached = StageRunner()
+    assert not uncached.run("detection", {"ksize": 9}, ["scan"], compute).cached
+    assert len(calls) == 3
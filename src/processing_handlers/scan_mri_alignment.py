@@ -7,6 +7,7 @@ from config.mappings import ModalitiesMapping
 from processing_models.surface_registrator import LandmarkSurfaceRegistrator
 
 from data_models.cap_model import CapModel
+from pipeline.steps import align_scan_to_mri_fiducials, project_scan_electrodes_to_mri
 from utils.warnings import throw_fiducials_warning
 from ui.callbacks.display import display_surface
 
@@ -18,37 +19,13 @@ def align_scan_to_mri(
     surface_registrator: LandmarkSurfaceRegistrator,
     ui: Ui_ELK | None,
 ):
-    scan_fiducials = model.get_fiducials([ModalitiesMapping.HEADSCAN])
-    mri_fiducials = model.get_fiducials([ModalitiesMapping.MRI])
-
-    scan_fiducials_labels = [fid.label for fid in scan_fiducials]
-    mri_fiducials_labels = [fid.label for fid in mri_fiducials]
-
-    fiducials_labels_intersection = set(scan_fiducials_labels).intersection(
-        set(mri_fiducials_labels)
+    transformation_matrix = align_scan_to_mri_fiducials(
+        headmodels["scan"], model, surface_registrator
     )
-
-    if len(fiducials_labels_intersection) < 3:
+    if transformation_matrix is None:
         throw_fiducials_warning()
         return
 
-    scan_landmarks = []
-    mri_landmarks = []
-    for scan_fiducial_label in scan_fiducials_labels:
-        scan_landmarks.append(
-            [fid.coordinates for fid in scan_fiducials if fid.label == scan_fiducial_label][0]
-        )
-        mri_landmarks.append(
-            [fid.coordinates for fid in mri_fiducials if fid.label == scan_fiducial_label][0]
-        )
-
-    surface_registrator.set_mesh(headmodels["scan"].mesh)
-    surface_registrator.set_landmarks(scan_landmarks, mri_landmarks)
-
-    transformation_matrix = headmodels["scan"].register_mesh(surface_registrator)  # type: ignore
-    if transformation_matrix is not None:
-        model.transform_electrodes(ModalitiesMapping.HEADSCAN, transformation_matrix)
-
     if ui:
         ui.display_secondary_mesh_checkbox.setChecked(True)
         ui.project_electrodes_button.setEnabled(True)
@@ -71,11 +48,7 @@ def undo_scan2mri_transformation(
 
 
 def project_electrodes_to_mri(headmodels: dict, model: CapModel, views: dict):
-    model.project_electrodes_to_mesh(
-        mesh=headmodels["mri"].mesh,
-        modality_from=ModalitiesMapping.HEADSCAN,
-        modality_to=ModalitiesMapping.MRI,
-    )
+    project_scan_electrodes_to_mri(headmodels["mri"], model)
     display_surface(views["mri"])
 
 
@@ -6,6 +6,7 @@ from view.labeling_surface_view import LabelingSurfaceView
 from processing_models.electrode_detector import BaseElectrodeDetector
 from data_models.cap_model import CapModel
 from data_models.head_models import HeadScan, MRIScan, UnitSphere
+from pipeline.steps import detect_scan_electrodes
 
 from config.mappings import ModalitiesMapping
 
@@ -16,9 +17,7 @@ def detect_electrodes(
     model: CapModel,
     ui: Ui_ELK | None,
 ):
-    electrodes = electrode_detector.detect(headmodel.mesh)  # type: ignore
-    for electrode in electrodes:
-        model.insert_electrode(electrode)
+    detect_scan_electrodes(headmodel, electrode_detector, model)
 
     measured_electrodes = model.get_electrodes_by_modality(
         [ModalitiesMapping.HEADSCAN, ModalitiesMapping.MRI]
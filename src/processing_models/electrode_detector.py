@@ -1,13 +1,64 @@
 from abc import ABC, abstractmethod
+from collections.abc import Callable
+import hashlib
 import numpy as np
-import cv2 as cv
 import vedo as vd
 
 from data_models.electrode import Electrode
 
-from utils.texture import compute_difference_of_gaussians, compute_hough_circles
+from utils.cache import LRUCache
+from utils.texture import (
+    compute_difference_of_gaussians,
+    detect_blob_circles,
+    detect_hough_circles,
+    draw_circles,
+    compute_pyramid_level,
+    scale_dog_parameters,
+    scale_hough_parameters,
+    select_pyramid_level,
+)
+from utils.roi import (
+    compute_color_mask,
+    compute_masked_difference_of_gaussians,
+    compute_uv_coverage_mask,
+    filter_circles_by_mask,
+    get_mask_bounding_region,
+    resize_mask,
+    shift_circles,
+)
+from utils.scale_space import (
+    compute_scale_space,
+    detect_scale_space_extrema,
+    get_scale_space_sigmas,
+)
+from utils.spatial_index import UniformGridIndex
+from utils.texture_store import texture_store
+from utils.tiling import (
+    compute_tiled_hough_circles,
+    is_tiled_texture,
+    open_texture_memmap,
+)
+from utils.uv_mapping import (
+    get_triangle_faces,
+    get_uv_coordinates,
+    map_pixels_to_surface,
+    map_pixels_to_surface_by_tiles,
+    pixels_to_uv,
+    rasterize_uv_faces,
+)
 
-from config.electrode_detector import DogParameters, HoughParameters
+from config.electrode_detector import (
+    BlobParameters,
+    CacheParameters,
+    DetectorParameters,
+    DogParameters,
+    HoughParameters,
+    PreviewParameters,
+    ROIParameters,
+    ScaleSpaceParameters,
+    TilingParameters,
+    UVMappingParameters,
+)
 from config.colors import HOUGH_CIRCLES_COLOR
 from config.mappings import ModalitiesMapping
 
@@ -21,59 +72,208 @@ class BaseElectrodeDetector(ABC):
     def detect(self) -> list[Electrode]:
         pass
 
+    def set_region_of_interest(self, mesh: vd.Mesh | None):
+        pass
+
 
 class DogHoughElectrodeDetector(BaseElectrodeDetector):
-    def __init__(self):
+    def __init__(self, uv_mapping: str = UVMappingParameters.METHOD, tiled: bool | None = None):
         self.dog = None
         self.circles = None
         self.texture = None
         self.electrodes = []
+        self._texture_file = None
+
+        # DoG and Hough results keyed by texture digest and parameters
+        self._texture_digest = None
+        self._dog_key = None
+        self._image_cache = LRUCache(CacheParameters.MAX_BYTES)
+
+        # last requested parameters and the pyramid level the current results were computed
+        # on; previews run on downsampled levels, detection always on the full resolution
+        self._dog_parameters = None
+        self._hough_parameters = None
+        self._dog_level = 0
+        self._hough_level = 0
+
+        # full resolution detection on tiles of a memory-mapped texture; None decides by
+        # the texture size
+        self.tiled = tiled
 
         self.modality = ModalitiesMapping.HEADSCAN
 
+        # pixel -> surface lookup: "raster" (triangle raster) or "nearest" (closest UV vertex)
+        self.uv_mapping = uv_mapping
+
+        # spatial index over the UV coordinates, built once per mesh
+        self._uv_index = None
+        self._uv_index_key = None
+
+        # texel -> triangle raster, built once per mesh/texture pair
+        self._face_index_map = None
+        self._face_index_map_key = None
+
+        # detection is restricted to the texels covered by this mesh (and optionally to cap
+        # colored texels); None detects on the whole texture
+        self.color_mask = ROIParameters.COLOR_MASK
+        self._roi_mesh = None
+        self._roi_key = None
+        self._roi_faces = None
+        self._roi_faces_key = None
+
     def apply_texture(self, texture_file: str):
+        # the replaced texture is not needed by the detector anymore
+        if texture_file != self._texture_file:
+            texture_store.release(self._texture_file)
         self._texture_file = texture_file
-        self.texture = cv.imread(texture_file)
+
+        # large textures are served from a memory map instead of being held in memory; they
+        # are decided on by the size in the file header and never enter the texture store
+        if is_tiled_texture(texture_file, self.tiled):
+            self.texture = open_texture_memmap(texture_file)
+        else:
+            self.texture = texture_store.get_image(texture_file)
+        self._texture_digest = self._compute_texture_digest()
+        self._dog_key = None
 
     def detect(self, mesh: vd.Mesh) -> list[Electrode]:
         if self.texture is None:
             return []
 
-        for circle in self.circles[0, :]:  # type: ignore
-            vertex = self._get_vertex_from_pixels(
-                (circle[0], circle[1]), mesh, self.texture.shape[0:2]
-            )
-            self.electrodes.append(Electrode(vertex, modality=self.modality, label="None"))
+        if self.get_detection_circles() is None:
+            return []
 
-        electrodes_to_remove = self._get_electrodes_too_close_together()
+        pixels = np.asarray(self.circles[0, :, 0:2], dtype=np.float64)  # type: ignore
 
         self.electrodes = [
-            electrode
-            for i, electrode in enumerate(self.electrodes)
-            if i not in electrodes_to_remove
+            Electrode(vertex, modality=self.modality, label="None")
+            for vertex in self.get_surface_positions(pixels, mesh)
         ]
 
         return self.electrodes
 
+    def get_detection_circles(self) -> np.ndarray | None:
+        """Returns the full resolution circles of the last requested parameters."""
+        if self._is_tiled():
+            self.circles = self._get_tiled_circles()
+        else:
+            self._ensure_full_resolution()
+        return self.circles
+
+    def set_region_of_interest(self, mesh: vd.Mesh | None):
+        """Restricts detection to the texture region covered by the UV triangles of mesh."""
+        if mesh is None or not ROIParameters.ENABLED:
+            self._roi_mesh = None
+            self._roi_key = None
+            return
+
+        self._roi_mesh = mesh
+        self._roi_key = (id(mesh), mesh.npoints, mesh.ncells, self.color_mask)
+
+    def set_detection_parameters(self, dog_parameters: dict, hough_parameters: dict) -> None:
+        """
+        Sets the DoG and Hough parameters of `detect` without computing anything; tiled
+        textures are then only ever filtered tile by tile.
+        """
+        self._dog_parameters = dict(dog_parameters)
+        self._hough_parameters = dict(hough_parameters)
+        # the current results do not belong to these parameters
+        self._dog_level = None
+        self._hough_level = None
+
+    def get_surface_positions(self, pixels: np.ndarray, mesh: vd.Mesh) -> np.ndarray:
+        """Maps full resolution texture pixels to the surface and drops too close pairs."""
+        vertices = self._get_vertices_from_pixels(pixels, mesh)
+        keep = self._get_electrodes_far_enough_apart(vertices)
+        return vertices[keep]
+
     def get_difference_of_gaussians(
         self,
         ksize: int = DogParameters.KSIZE,
         sigma: float = DogParameters.SIGMA,
         F: float = DogParameters.FACTOR,
         threshold_level: int = DogParameters.THRESHOLD_LEVEL,
+        level: int = 0,
     ) -> np.ndarray | None:
-        if self.texture is None:
+        """Computes the DoG and uses it, and its parameters, for the following detections."""
+        dog = self.compute_dog(ksize, sigma, F, threshold_level, level)
+        if dog is None:
             return None
 
-        self.dog = compute_difference_of_gaussians(
-            image=self.texture,
-            ksize=ksize,
-            sigma=sigma,
-            F=F,
-            threshold_level=threshold_level,
+        self._dog_parameters = {
+            "ksize": ksize,
+            "sigma": sigma,
+            "F": F,
+            "threshold_level": threshold_level,
+        }
+        self.dog = dog
+        self._dog_key = self._get_dog_key(
+            level, *scale_dog_parameters(ksize, sigma, 2**-level), F, threshold_level
         )
+        self._dog_level = level
         return self.dog
 
+    def compute_dog(
+        self,
+        ksize: int = DogParameters.KSIZE,
+        sigma: float = DogParameters.SIGMA,
+        F: float = DogParameters.FACTOR,
+        threshold_level: int = DogParameters.THRESHOLD_LEVEL,
+        level: int = 0,
+    ) -> np.ndarray | None:
+        """Returns the DoG of a pyramid level without changing the DoG used for detection."""
+        if self.texture is None:
+            return None
+
+        # the kernel is rescaled along with the image
+        ksize, sigma = scale_dog_parameters(ksize, sigma, 2**-level)
+
+        key = self._get_dog_key(level, ksize, sigma, F, threshold_level)
+        dog = self._image_cache.get(key)
+        if dog is None:
+            roi_mask = self._get_roi_mask(level)
+            if roi_mask is None:
+                dog = compute_difference_of_gaussians(
+                    image=self._get_pyramid_level(level),
+                    ksize=ksize,
+                    sigma=sigma,
+                    F=F,
+                    threshold_level=threshold_level,
+                )
+            else:
+                dog = compute_masked_difference_of_gaussians(
+                    self._get_pyramid_level(level),
+                    roi_mask,
+                    ksize=ksize,
+                    sigma=sigma,
+                    F=F,
+                    threshold_level=threshold_level,
+                )
+            self._image_cache.put(key, dog)
+        return dog
+
+    def set_difference_of_gaussians(
+        self,
+        dog: np.ndarray,
+        ksize: int = DogParameters.KSIZE,
+        sigma: float = DogParameters.SIGMA,
+        F: float = DogParameters.FACTOR,
+        threshold_level: int = DogParameters.THRESHOLD_LEVEL,
+    ) -> None:
+        """Uses a full resolution DoG computed before with these parameters, e.g. a stored one."""
+        self._dog_parameters = {
+            "ksize": ksize,
+            "sigma": sigma,
+            "F": F,
+            "threshold_level": threshold_level,
+        }
+        key = self._get_dog_key(0, *scale_dog_parameters(ksize, sigma, 1), F, threshold_level)
+        self._image_cache.put(key, dog)
+
+        self.dog = dog
+        self._dog_key = key
+        self._dog_level = 0
+
     def get_hough_circles(
         self,
         param1: float = HoughParameters.PARAM1,
@@ -81,65 +281,506 @@ class DogHoughElectrodeDetector(BaseElectrodeDetector):
         min_distance_between_circles: int = HoughParameters.MIN_DISTANCE,
         min_radius: int = HoughParameters.MIN_RADIUS,
         max_radius: int = HoughParameters.MAX_RADIUS,
+        level: int = 0,
+    ) -> np.ndarray | None:
+        """Returns the circles drawn onto a copy of the texture of the given pyramid level."""
+        circles = self.get_circles(
+            param1, param2, min_distance_between_circles, min_radius, max_radius, level
+        )
+        if self.texture is None:
+            return None
+
+        circles_image, _ = draw_circles(
+            self._get_pyramid_level(level), circles, HOUGH_CIRCLES_COLOR
+        )
+        return circles_image
+
+    def get_circles(
+        self,
+        param1: float = HoughParameters.PARAM1,
+        param2: float = HoughParameters.PARAM2,
+        min_distance_between_circles: int = HoughParameters.MIN_DISTANCE,
+        min_radius: int = HoughParameters.MIN_RADIUS,
+        max_radius: int = HoughParameters.MAX_RADIUS,
+        level: int = 0,
     ) -> np.ndarray | None:
+        """Returns the rounded (1, N, 3) circles in pixels of the given pyramid level."""
         if self.dog is None:
             raise Exception("No DoG image available. Please run diff_of_gaussians() first.")
 
         if self.texture is None:
             return None
 
-        circles_image, self.circles = compute_hough_circles(
-            self.texture,
-            self.dog,
+        self._hough_parameters = {
+            "param1": param1,
+            "param2": param2,
+            "min_distance_between_circles": min_distance_between_circles,
+            "min_radius": min_radius,
+            "max_radius": max_radius,
+        }
+
+        # circles are detected on the DoG of the same pyramid level
+        if self._dog_level != level:
+            self.get_difference_of_gaussians(**self._dog_parameters, level=level)  # type: ignore
+
+        min_distance_between_circles, min_radius, max_radius = scale_hough_parameters(
+            min_distance_between_circles, min_radius, max_radius, 2**-level
+        )
+
+        key = (
+            "circles",
+            self._dog_key,
             param1,
             param2,
             min_distance_between_circles,
             min_radius,
             max_radius,
-            HOUGH_CIRCLES_COLOR,
         )
-        return circles_image
+        if key not in self._image_cache:
+            # outside the region of interest the DoG is empty; detect on its bounding box
+            # only, with room for the widest filter of the circle detectors
+            roi_mask = self._get_roi_mask(level)
+            region = (slice(None), slice(None))
+            if roi_mask is not None:
+                region = get_mask_bounding_region(roi_mask, 2 * max_radius)
 
-    def _get_electrodes_too_close_together(self, min_distance: float = 0.075) -> list:
-        electrodes_to_remove = []
-        dist_matrix = np.zeros((len(self.electrodes), len(self.electrodes)))
-        for i, electrode_a in enumerate(self.electrodes):
-            for j, electrode_b in enumerate(self.electrodes):
-                if i != j:
-                    dist = np.linalg.norm(electrode_a.coordinates - electrode_b.coordinates)
-                    if dist < min_distance:
-                        electrodes_to_remove.append(i)
-                        electrodes_to_remove.append(j)
-
-        return electrodes_to_remove
-
-    def _get_vertex_from_pixels(
-        self, pixels: tuple[float, float], mesh: vd.Mesh, image_size
-    ) -> np.ndarray:
-        # Helper function to get the vertex from the mesh that corresponds to
-        # the pixel coordinates
-        #
-        # Written by: Aleksij Kraljic, October 29, 2023
-
-        vertices = mesh.points()
-
-        # extract the uv coordinates from the mesh
-        if "material_0" in mesh.pointdata.keys():
-            uv = mesh.pointdata["material_0"]
-        elif "TCoords" in mesh.pointdata.keys():
-            uv = mesh.pointdata["TCoords"]
+            circles = self._compute_circles(
+                level,
+                region,
+                param1,
+                param2,
+                min_distance_between_circles,
+                min_radius,
+                max_radius,
+            )
+            if roi_mask is not None:
+                circles = filter_circles_by_mask(shift_circles(circles, region), roi_mask)
+
+            if circles is not None:
+                circles = np.uint16(np.around(circles))
+            self._image_cache.put(key, circles)
+
+        self.circles = self._image_cache.get(key)
+        self._hough_level = level
+        return self.circles
+
+    def get_texture_level(self, level: int = 0) -> tuple[tuple, np.ndarray] | None:
+        """Returns a key identifying the texture of a pyramid level together with its image."""
+        if self.texture is None:
+            return None
+        return (self._texture_digest, level), self._get_pyramid_level(level)
+
+    def get_preview_level(self, width: int, height: int, min_radius: int | None = None) -> int:
+        """Returns the pyramid level previews shown in a width x height frame are computed on."""
+        if self.texture is None:
+            return 0
+
+        if min_radius is None:
+            min_radius = HoughParameters.MIN_RADIUS
+            if self._hough_parameters is not None:
+                min_radius = self._hough_parameters["min_radius"]
+
+        return select_pyramid_level(
+            self.texture.shape, (width, height), min_radius, PreviewParameters.MIN_LEVEL_RADIUS
+        )
+
+    def _ensure_full_resolution(self):
+        # previews may have left downsampled results behind; redo them at full resolution
+        # with the last requested parameters (usually straight from the cache)
+        if self._dog_parameters is not None and self._dog_level != 0:
+            self.get_difference_of_gaussians(**self._dog_parameters)
+        if self._hough_parameters is not None and self._hough_level != 0:
+            self.get_circles(**self._hough_parameters)
+
+    def _is_tiled(self) -> bool:
+        # decided when the texture is applied; only tiled textures are memory-mapped
+        return isinstance(self.texture, np.memmap)
+
+    def _get_tiled_circles(self) -> np.ndarray | None:
+        # full resolution circles computed tile by tile with the last requested parameters
+        if self._hough_parameters is None:
+            return None
+
+        dog_parameters = self._dog_parameters or {
+            "ksize": DogParameters.KSIZE,
+            "sigma": DogParameters.SIGMA,
+            "F": DogParameters.FACTOR,
+            "threshold_level": DogParameters.THRESHOLD_LEVEL,
+        }
+        key = (
+            "tiled",
+            self._texture_digest,
+            self._roi_key,
+            *dog_parameters.values(),
+            *self._hough_parameters.values(),
+        )
+        if key not in self._image_cache:
+            detect_circles, halo = self._get_tile_circle_detector(
+                dog_parameters, self._hough_parameters
+            )
+            get_roi_mask = None
+            if self._roi_key is not None:
+                # masks are rasterized per tile; the triangles are prepared once beforehand
+                self._get_roi_faces()
+                get_roi_mask = self._get_tile_roi_mask
+
+            circles = compute_tiled_hough_circles(
+                self.texture,  # type: ignore
+                **dog_parameters,
+                **self._hough_parameters,
+                detect_circles=detect_circles,
+                halo=halo,
+                get_roi_mask=get_roi_mask,
+            )
+            self._image_cache.put(key, circles)
+        return self._image_cache.get(key)
+
+    def _compute_circles(
+        self,
+        level: int,
+        region: tuple[slice, slice],
+        param1: float,
+        param2: float,
+        min_distance_between_circles: int,
+        min_radius: int,
+        max_radius: int,
+    ) -> np.ndarray | None:
+        # Returns the (1, N, 3) circles found in the (row, column) region of the DoG of the
+        # given pyramid level, relative to the region; subclasses replace the Hough transform.
+        return detect_hough_circles(
+            self.dog[region],  # type: ignore
+            param1,
+            param2,
+            min_distance_between_circles,
+            min_radius,
+            max_radius,
+        )
+
+    def _get_tile_circle_detector(
+        self, dog_parameters: dict, hough_parameters: dict
+    ) -> tuple[Callable[[np.ndarray], np.ndarray | None] | None, int | None]:
+        # Returns the per-tile circle detector and the halo it needs; None selects the DoG
+        # and Hough transform of the tiling module.
+        return None, None
+
+    def _get_roi_mask(self, level: int) -> np.ndarray | None:
+        if self._roi_key is None or self.texture is None:
+            return None
+
+        key = ("roi", self._texture_digest, self._roi_key, level)
+        mask = self._image_cache.get(key)
+        if mask is not None:
+            return mask
+
+        if self._is_tiled():
+            # the full resolution mask of a tiled texture is never formed; pyramid levels are
+            # rasterized at their own resolution
+            image = self._get_pyramid_level(level)
+            mask = self._compute_roi_mask(
+                image, (slice(0, image.shape[0]), slice(0, image.shape[1])), level
+            )
+        elif level == 0:
+            face_index_map, _, _ = self._get_face_index_map(self._roi_mesh)  # type: ignore
+            mask = compute_uv_coverage_mask(face_index_map)
+            if self.color_mask:
+                mask &= compute_color_mask(self.texture)
         else:
-            raise Exception("No UV coordinates found in mesh.")
+            mask = resize_mask(self._get_roi_mask(0), self._get_pyramid_level(level).shape)  # type: ignore
+
+        self._image_cache.put(key, mask)
+        return mask
+
+    def _get_tile_roi_mask(self, region: tuple[slice, slice]) -> np.ndarray:
+        return self._compute_roi_mask(self.texture, region, 0)  # type: ignore
+
+    def _compute_roi_mask(
+        self, image: np.ndarray, region: tuple[slice, slice], level: int
+    ) -> np.ndarray:
+        # Returns the mask of a (row, column) region of a pyramid level image; only the
+        # region and a halo covering the growth of the mask are rasterized.
+        margin = int(np.ceil(ROIParameters.MARGIN / 2**level))
+        height, width = image.shape[0:2]
+        halo = 2 * margin
+        padded = (
+            slice(max(region[0].start - halo, 0), min(region[0].stop + halo, height)),
+            slice(max(region[1].start - halo, 0), min(region[1].stop + halo, width)),
+        )
+
+        uv, faces = self._get_roi_faces()
+        mask = compute_uv_coverage_mask(
+            rasterize_uv_faces(uv, faces, image.shape[0:2], region=padded), margin
+        )
+        if self.color_mask:
+            mask &= compute_color_mask(np.ascontiguousarray(image[padded]), margin=margin)
 
-        # convert pixels to uv coordinates
-        uv_image = [
-            (pixels[0] + 0.5) / image_size[0],
-            1 - (pixels[1] + 0.5) / image_size[1],
+        return mask[
+            region[0].start - padded[0].start : region[0].stop - padded[0].start,
+            region[1].start - padded[1].start : region[1].stop - padded[1].start,
         ]
 
-        # find index of closest point in uv with uv_image
-        uv_idx = np.argmin(np.linalg.norm(uv - uv_image, axis=1))  # type: ignore
+    def _get_roi_faces(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._roi_faces is None or self._roi_faces_key != self._roi_key:
+            self._roi_faces = (
+                get_uv_coordinates(self._roi_mesh),  # type: ignore
+                get_triangle_faces(self._roi_mesh),  # type: ignore
+            )
+            self._roi_faces_key = self._roi_key
+        return self._roi_faces
+
+    def _get_dog_key(
+        self, level: int, ksize: int, sigma: float, F: float, threshold_level: int
+    ) -> tuple:
+        return ("dog", self._texture_digest, self._roi_key, level, ksize, sigma, F, threshold_level)
+
+    def _get_pyramid_level(self, level: int) -> np.ndarray:
+        if level == 0:
+            return self.texture  # type: ignore
+
+        key = ("pyramid", self._texture_digest, level)
+        image = self._image_cache.get(key)
+        if image is None:
+            image = compute_pyramid_level(self._get_pyramid_level(level - 1), 1)
+            self._image_cache.put(key, image)
+        return image
+
+    def _compute_texture_digest(self) -> str | None:
+        if self.texture is None:
+            return None
+        if isinstance(self.texture, np.memmap):
+            # the memory-mapped file name already identifies the decoded texture
+            return hashlib.blake2b(str(self.texture.filename).encode(), digest_size=16).hexdigest()
+        return hashlib.blake2b(np.ascontiguousarray(self.texture), digest_size=16).hexdigest()
+
+    def _get_electrodes_far_enough_apart(
+        self, coordinates: np.ndarray, min_distance: float = 0.075
+    ) -> np.ndarray:
+        # Returns a mask of the electrodes without any other electrode closer than
+        # min_distance; both electrodes of every too close pair are discarded.
+        keep = np.ones(len(coordinates), dtype=bool)
+        if len(coordinates) < 2:
+            return keep
+
+        i, j = UniformGridIndex(coordinates, cell_size=min_distance).query_pairs(min_distance)
+        keep[i] = False
+        keep[j] = False
+
+        return keep
+
+    def _get_vertices_from_pixels(self, pixels: np.ndarray, mesh: vd.Mesh) -> np.ndarray:
+        # Maps all pixels to the surface at once, either through the texel -> triangle
+        # raster or through a nearest UV vertex query; pixels outside the UV atlas always
+        # fall back to the closest UV vertex.
+        vertices = np.asarray(mesh.points())
+
+        if self.uv_mapping == "nearest":
+            return vertices[self._get_closest_uv_vertices(pixels, mesh)]
+
+        if self._is_tiled():
+            # a tiled texture is only rasterized on the tiles holding a pixel
+            surface_points, found = map_pixels_to_surface_by_tiles(
+                pixels,
+                self.texture.shape[0:2],  # type: ignore
+                get_uv_coordinates(mesh),
+                get_triangle_faces(mesh),
+                vertices,
+                TilingParameters.TILE_SIZE,
+            )
+        else:
+            face_index_map, uv, faces = self._get_face_index_map(mesh)
+            surface_points, found = map_pixels_to_surface(
+                pixels, face_index_map, uv, faces, vertices
+            )
+
+        if not np.all(found):
+            surface_points[~found] = vertices[self._get_closest_uv_vertices(pixels[~found], mesh)]
+
+        return surface_points
+
+    def _get_closest_uv_vertices(self, pixels: np.ndarray, mesh: vd.Mesh) -> np.ndarray:
+        # Returns the indices of the vertices with UV coordinates closest to the pixels.
+        key = (id(mesh), mesh.npoints)
+        if self._uv_index is None or self._uv_index_key != key:
+            self._uv_index = UniformGridIndex(get_uv_coordinates(mesh))
+            self._uv_index_key = key
+
+        _, indices = self._uv_index.query_nearest(
+            pixels_to_uv(pixels, self.texture.shape[0:2])  # type: ignore
+        )
+        return indices
+
+    def _get_face_index_map(self, mesh: vd.Mesh) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        uv = get_uv_coordinates(mesh)
+        key = (id(mesh), mesh.npoints, mesh.ncells, self.texture.shape[0:2])  # type: ignore
+
+        if self._face_index_map is None or self._face_index_map_key != key:
+            faces = get_triangle_faces(mesh)
+            self._face_index_map = (
+                rasterize_uv_faces(uv, faces, self.texture.shape[0:2]),  # type: ignore
+                faces,
+            )
+            self._face_index_map_key = key
+
+        face_index_map, faces = self._face_index_map
+        return face_index_map, uv, faces
+
+
+class ConnectedComponentElectrodeDetector(DogHoughElectrodeDetector):
+    """
+    Detects electrodes as round connected components of the binary DoG image instead of
+    running the Hough transform on it.
+
+    All components are labeled in one pass and filtered by area, bounding box circularity
+    and equivalent radius from the component statistics. The radius window is the Hough
+    min/max radius widened by BlobParameters.RADIUS_TOLERANCE; the Hough accumulator
+    parameters and minimum distance are not used.
+    """
+
+    def __init__(
+        self,
+        uv_mapping: str = UVMappingParameters.METHOD,
+        tiled: bool | None = None,
+        min_circularity: float = BlobParameters.MIN_CIRCULARITY,
+        radius_tolerance: float = BlobParameters.RADIUS_TOLERANCE,
+    ):
+        super().__init__(uv_mapping=uv_mapping, tiled=tiled)
+        self.min_circularity = min_circularity
+        self.radius_tolerance = radius_tolerance
+
+    def _compute_circles(
+        self,
+        level: int,
+        region: tuple[slice, slice],
+        param1: float,
+        param2: float,
+        min_distance_between_circles: int,
+        min_radius: int,
+        max_radius: int,
+    ) -> np.ndarray | None:
+        return detect_blob_circles(
+            self.dog[region],  # type: ignore
+            min_radius * (1 - self.radius_tolerance),
+            max_radius * (1 + self.radius_tolerance),
+            self.min_circularity,
+        )
+
+    def _get_tile_circle_detector(
+        self, dog_parameters: dict, hough_parameters: dict
+    ) -> tuple[Callable[[np.ndarray], np.ndarray | None] | None, int | None]:
+        max_radius = hough_parameters["max_radius"] * (1 + self.radius_tolerance)
+
+        def detect_circles(tile_image: np.ndarray) -> np.ndarray | None:
+            dog = compute_difference_of_gaussians(tile_image, **dog_parameters)
+            return detect_blob_circles(
+                dog,
+                hough_parameters["min_radius"] * (1 - self.radius_tolerance),
+                max_radius,
+                self.min_circularity,
+            )
+
+        # the circularity bound limits the bounding box side of a kept blob to
+        # 2 * radius / sqrt(min_circularity); its diagonal bounds the reach from the centroid
+        extent = 2 * max_radius / np.sqrt(self.min_circularity)
+        return detect_circles, dog_parameters["ksize"] // 2 + int(np.ceil(np.sqrt(2) * extent))
+
+
+class ScaleSpaceElectrodeDetector(DogHoughElectrodeDetector):
+    """
+    Detects electrodes as local maxima of a gaussian (DoG) scale space across scale and
+    space, so one run covers the whole Hough min/max radius window.
+
+    The scale space is built once per texture, pyramid level and radius window on the
+    coarsest pyramid level that keeps the smallest sigma above ScaleSpaceParameters.MIN_SIGMA,
+    and is cached with the other intermediate images. Every detected circle carries the
+    characteristic scale of its electrode as radius.
+    """
+
+    def __init__(
+        self,
+        uv_mapping: str = UVMappingParameters.METHOD,
+        tiled: bool | None = None,
+        threshold: float = ScaleSpaceParameters.THRESHOLD,
+        scales_per_octave: int = ScaleSpaceParameters.SCALES_PER_OCTAVE,
+    ):
+        super().__init__(uv_mapping=uv_mapping, tiled=tiled)
+        self.threshold = threshold
+        self.scales_per_octave = scales_per_octave
+
+    def _compute_circles(
+        self,
+        level: int,
+        region: tuple[slice, slice],
+        param1: float,
+        param2: float,
+        min_distance_between_circles: int,
+        min_radius: int,
+        max_radius: int,
+    ) -> np.ndarray | None:
+        base_level, sigmas = self._get_scale_space_sigmas(min_radius, max_radius)
+
+        bounds = tuple((axis.start, axis.stop) for axis in region)
+        key = ("scale_space", self._texture_digest, level + base_level, bounds, *sigmas)
+        scale_space = self._image_cache.get(key)
+        if scale_space is None:
+            image = self._get_pyramid_level(level)
+            if image[region].shape == image.shape:
+                image = self._get_pyramid_level(level + base_level)
+            else:
+                image = compute_pyramid_level(np.ascontiguousarray(image[region]), base_level)
+            scale_space = compute_scale_space(image, sigmas)
+            self._image_cache.put(key, scale_space)
+
+        return self._get_scale_space_circles(scale_space, sigmas, base_level)
+
+    def _get_tile_circle_detector(
+        self, dog_parameters: dict, hough_parameters: dict
+    ) -> tuple[Callable[[np.ndarray], np.ndarray | None] | None, int | None]:
+        base_level, sigmas = self._get_scale_space_sigmas(
+            hough_parameters["min_radius"], hough_parameters["max_radius"]
+        )
+
+        def detect_circles(tile_image: np.ndarray) -> np.ndarray | None:
+            scale_space = compute_scale_space(compute_pyramid_level(tile_image, base_level), sigmas)
+            return self._get_scale_space_circles(scale_space, sigmas, base_level)
+
+        # the widest gaussian reaches about four sigmas
+        return detect_circles, int(np.ceil(4 * sigmas[-1] * 2**base_level)) + 1
+
+    def _get_scale_space_sigmas(
+        self, min_radius: float, max_radius: float
+    ) -> tuple[int, np.ndarray]:
+        # Returns the pyramid level (relative to the image) the scale space is built on and
+        # the sigmas in pixels of that level.
+        min_sigma = min_radius * ScaleSpaceParameters.RADIUS_TO_SIGMA
+        max_sigma = max_radius * ScaleSpaceParameters.RADIUS_TO_SIGMA
+
+        base_level = max(0, int(np.floor(np.log2(min_sigma / ScaleSpaceParameters.MIN_SIGMA))))
+        sigmas = get_scale_space_sigmas(
+            min_sigma / 2**base_level, max_sigma / 2**base_level, self.scales_per_octave
+        )
+        return base_level, sigmas
+
+    def _get_scale_space_circles(
+        self, scale_space: np.ndarray, sigmas: np.ndarray, base_level: int
+    ) -> np.ndarray | None:
+        # (1, N, 3) circles in pixels of the image the scale space level was reduced from
+        scales, rows, columns = detect_scale_space_extrema(scale_space, self.threshold)
+        if len(scales) == 0:
+            return None
+
+        factor = 2**base_level
+        radii = sigmas[scales] * factor / ScaleSpaceParameters.RADIUS_TO_SIGMA
+        circles = np.column_stack((columns * factor, rows * factor, radii)).astype(np.float32)
+        return circles[np.newaxis, :, :]
 
-        vertex = vertices[uv_idx]  # type: ignore
 
-        return vertex
+def create_electrode_detector(method: str = DetectorParameters.METHOD) -> DogHoughElectrodeDetector:
+    """Creates the texture electrode detector selected by `method`."""
+    match method:
+        case "hough":
+            return DogHoughElectrodeDetector()
+        case "blob":
+            return ConnectedComponentElectrodeDetector()
+        case "scale_space":
+            return ScaleSpaceElectrodeDetector()
+        case _:
+            raise ValueError(f"Unknown electrode detector: {method}")
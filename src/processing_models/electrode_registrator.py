@@ -42,6 +42,8 @@ class RigidElectrodeRegistrator(BaseElectrodeRegistrator):
 
     def __init__(self):
         self.source_electrodes = []
+        # unit sphere transformation of the last registration
+        self.transformation_matrix = None
 
     def register(self, source_electrodes: list[Electrode], target_electrodes: list[Electrode]):
         self.source_electrodes = source_electrodes
@@ -72,6 +74,7 @@ class RigidElectrodeRegistrator(BaseElectrodeRegistrator):
             ),
             translate=False,
         )
+        self.transformation_matrix = T
 
         for electrode in self.source_electrodes:
             source_vector = electrode.unit_sphere_cartesian_coordinates
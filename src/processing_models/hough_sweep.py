@@ -0,0 +1,145 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+import vedo as vd
+
+from processing_models.electrode_detector import DogHoughElectrodeDetector
+from utils.texture import detect_hough_circles
+
+from config.electrode_detector import DogParameters, HoughSweepParameters
+
+HOUGH_PARAMETER_NAMES = (
+    "param1",
+    "param2",
+    "min_distance_between_circles",
+    "min_radius",
+    "max_radius",
+)
+
+# DoG image shared with the worker processes, attached once per worker
+_shared_dog = None
+_shared_dog_memory = None
+
+
+@dataclass
+class HoughSweepResult:
+    parameters: list[dict]
+    circle_counts: np.ndarray
+    electrode_counts: np.ndarray
+    scores: np.ndarray
+
+    @property
+    def best_index(self) -> int:
+        # ties are broken in favour of candidates losing fewer circles to the spacing filter
+        removed = self.circle_counts - self.electrode_counts
+        return int(np.lexsort((removed, self.scores))[0])
+
+    @property
+    def best_parameters(self) -> dict:
+        return self.parameters[self.best_index]
+
+    def get_score_grid(self, row_parameter: str, column_parameter: str) -> tuple:
+        """Returns the row values, column values and best score per cell, e.g. for a heatmap."""
+        rows = sorted({parameters[row_parameter] for parameters in self.parameters})
+        columns = sorted({parameters[column_parameter] for parameters in self.parameters})
+
+        grid = np.full((len(rows), len(columns)), np.inf)
+        for parameters, score in zip(self.parameters, self.scores):
+            i = rows.index(parameters[row_parameter])
+            j = columns.index(parameters[column_parameter])
+            grid[i, j] = min(grid[i, j], score)
+
+        return rows, columns, grid
+
+
+class HoughParameterSweep:
+    """
+    HoughParameterSweep evaluates a grid of Hough circle parameters on one DoG image and
+    scores every candidate by how closely its number of detected electrodes, after the
+    surface mapping and spacing filter of the detector, matches the expected montage size.
+
+    The DoG image is placed in shared memory once and the Hough transforms run in a
+    process pool; the cheap surface mapping of the circles is done in this process.
+    """
+
+    def __init__(self, max_workers: int | None = HoughSweepParameters.MAX_WORKERS):
+        self.max_workers = max_workers
+
+    def get_parameter_grid(
+        self,
+        param1: tuple = HoughSweepParameters.PARAM1,
+        param2: tuple = HoughSweepParameters.PARAM2,
+        min_distance: tuple = HoughSweepParameters.MIN_DISTANCE,
+        radii: tuple = HoughSweepParameters.RADII,
+    ) -> list[dict]:
+        return [
+            dict(zip(HOUGH_PARAMETER_NAMES, (p1, p2, distance, min_radius, max_radius)))
+            for p1, p2, distance, (min_radius, max_radius) in itertools.product(
+                param1, param2, min_distance, radii
+            )
+            if min_radius <= max_radius
+        ]
+
+    def run(
+        self,
+        detector: DogHoughElectrodeDetector,
+        mesh: vd.Mesh,
+        expected_count: int,
+        parameter_grid: list[dict] | None = None,
+        ksize: int = DogParameters.KSIZE,
+        sigma: float = DogParameters.SIGMA,
+        F: float = DogParameters.FACTOR,
+    ) -> HoughSweepResult | None:
+        if parameter_grid is None:
+            parameter_grid = self.get_parameter_grid()
+
+        # the detector keeps the DoG and parameters it detects with
+        dog = detector.compute_dog(ksize=ksize, sigma=sigma, F=F)
+        if dog is None or len(parameter_grid) == 0:
+            return None
+
+        memory = shared_memory.SharedMemory(create=True, size=dog.nbytes)
+        try:
+            np.ndarray(dog.shape, dtype=dog.dtype, buffer=memory.buf)[:] = dog
+
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_attach_shared_dog,
+                initargs=(memory.name, dog.shape, dog.dtype.str),
+            ) as executor:
+                all_circles = list(executor.map(_detect_circles, parameter_grid))
+        finally:
+            memory.close()
+            memory.unlink()
+
+        circle_counts = np.array([len(circles) for circles in all_circles])
+        electrode_counts = np.array(
+            [
+                len(detector.get_surface_positions(circles, mesh)) if len(circles) > 0 else 0
+                for circles in all_circles
+            ]
+        )
+
+        return HoughSweepResult(
+            parameters=parameter_grid,
+            circle_counts=circle_counts,
+            electrode_counts=electrode_counts,
+            scores=np.abs(electrode_counts - expected_count),
+        )
+
+
+def _attach_shared_dog(name: str, shape: tuple, dtype: str):
+    global _shared_dog, _shared_dog_memory
+    _shared_dog_memory = shared_memory.SharedMemory(name=name)
+    _shared_dog = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_shared_dog_memory.buf)
+
+
+def _detect_circles(parameters: dict) -> np.ndarray:
+    # returns the (N, 2) circle centers in pixels
+    circles = detect_hough_circles(_shared_dog, **parameters)  # type: ignore
+    if circles is None:
+        return np.empty((0, 2))
+    return np.around(circles[0, :, 0:2]).astype(np.float64)
@@ -2,7 +2,7 @@ from config.electrode_detector import DogParameters, HoughParameters
 from config.sizes import ElectrodeSizes
 
 from ui.callbacks.refresh import update_view_config
-from ui.callbacks.display import display_dog, display_hough
+from ui.callbacks.display import schedule_dog, schedule_hough
 
 
 def connect_configuration_boxes(self):
@@ -138,10 +138,9 @@ def connect_configuration_boxes(self):
 
 def _display_dog(self):
     if self.files["texture"] is not None:
-        display_dog(
-            self.images,
+        schedule_dog(
+            self.preview_scheduler,
             self.ui.texture_frame,
-            self.ui.photo_label,
             self.electrode_detector,
             self.ui.kernel_size_spinbox.value(),
             self.ui.sigma_spinbox.value(),
@@ -151,11 +150,15 @@ def _display_dog(self):
 
 def _display_hough(self):
     if self.files["texture"] is not None:
-        display_hough(
-            self.images,
+        schedule_hough(
+            self.preview_scheduler,
             self.ui.texture_frame,
-            self.ui.photo_label,
             self.electrode_detector,
+            (
+                self.ui.kernel_size_spinbox.value(),
+                self.ui.sigma_spinbox.value(),
+                self.ui.diff_factor_spinbox.value(),
+            ),
             self.ui.param1_spinbox.value(),
             self.ui.param2_spinbox.value(),
             self.ui.min_dist_spinbox.value(),
@@ -17,19 +17,7 @@ def connect_fileio_buttons(self):
         )
     )
 
-    self.ui.load_texture_button.clicked.connect(
-        lambda: load_texture(
-            self.files,
-            self.views,
-            self.headmodels,
-            [
-                ("scan", self.ui.headmodel_frame),
-                ("labeling_main", self.ui.labeling_main_frame),
-            ],
-            self.model,
-            self.electrode_detector,
-        )
-    )
+    self.ui.load_texture_button.clicked.connect(lambda: _load_texture(self))
     self.ui.load_mri_button.clicked.connect(
         lambda: load_mri(
             self.files,
@@ -49,3 +37,21 @@ def connect_fileio_buttons(self):
     )
 
     self.ui.export_locations_button.clicked.connect(lambda: save_locations_to_file(self.model))
+
+
+def _load_texture(self):
+    # the texture must not be replaced under a running preview job
+    self.preview_scheduler.wait_for_done()
+    # previews of the previous texture must not be shown again on resizes
+    self.images.clear()
+    load_texture(
+        self.files,
+        self.views,
+        self.headmodels,
+        [
+            ("scan", self.ui.headmodel_frame),
+            ("labeling_main", self.ui.labeling_main_frame),
+        ],
+        self.model,
+        self.electrode_detector,
+    )
@@ -1,4 +1,5 @@
 from ui.callbacks.refresh import (
+    refresh_texture_preview,
     refresh_views_on_tab_change,
     refresh_views_on_resize,
 )
@@ -6,7 +7,21 @@ from ui.callbacks.refresh import (
 
 def connect_tab_changed(self):
     self.ui.tabWidget.currentChanged.connect(
-        lambda: refresh_views_on_tab_change(self.ui.tabWidget, self.views)
+        lambda: refresh_views_on_tab_change(
+            self.ui.tabWidget,
+            self.views,
+            self.images,
+            self.ui.photo_label,
+            self.ui.texture_frame,
+        )
+    )
+    self.ui.tabWidget_texture.currentChanged.connect(
+        lambda: refresh_texture_preview(
+            self.ui.tabWidget_texture,
+            self.images,
+            self.ui.photo_label,
+            self.ui.texture_frame,
+        )
     )
 
 
@@ -20,5 +35,8 @@ def connect_splitter_moved(self):
                 ("labeling_main", self.ui.labeling_main_frame),
                 ("labeling_reference", self.ui.labeling_reference_frame),
             ],
+            self.images,
+            self.ui.photo_label,
+            self.ui.texture_frame,
         ),
     )
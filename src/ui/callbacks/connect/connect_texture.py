@@ -1,38 +1,104 @@
-from ui.callbacks.display import display_dog, display_hough
+from ui.callbacks.display import schedule_dog, schedule_hough, show_image
 from processing_handlers.texture_processing import detect_electrodes
+from processing_models.electrode_detector import create_electrode_detector
+
+from config.electrode_detector import DetectorParameters
 
 
 def connect_texture_buttons(self):
-    self.ui.display_dog_button.clicked.connect(
-        lambda: display_dog(
-            self.images,
-            self.ui.texture_frame,
-            self.ui.photo_label,
-            self.electrode_detector,
-            self.ui.kernel_size_spinbox.value(),
-            self.ui.sigma_spinbox.value(),
-            self.ui.diff_factor_spinbox.value(),
+    self.preview_scheduler.image_ready.connect(
+        lambda key, image: show_image(
+            self.images, key, self.ui.photo_label, self.ui.texture_frame, image
         )
     )
-    self.ui.display_hough_button.clicked.connect(
-        lambda: display_hough(
-            self.images,
-            self.ui.texture_frame,
-            self.ui.photo_label,
-            self.electrode_detector,
-            self.ui.param1_spinbox.value(),
-            self.ui.param2_spinbox.value(),
-            self.ui.min_dist_spinbox.value(),
-            self.ui.min_radius_spinbox.value(),
-            self.ui.max_radius_spinbox.value(),
-        )
+
+    self.ui.display_dog_button.clicked.connect(lambda: _schedule_dog(self))
+    self.ui.display_hough_button.clicked.connect(lambda: _schedule_hough(self))
+
+    self.ui.detector_method_combobox.setCurrentIndex(
+        DetectorParameters.METHODS.index(DetectorParameters.METHOD)
+    )
+    self.ui.detector_method_combobox.currentIndexChanged.connect(
+        lambda index: _set_electrode_detector(self, DetectorParameters.METHODS[index])
     )
 
-    self.ui.proceed_button_1.clicked.connect(
-        lambda: detect_electrodes(
-            self.headmodels["scan"],
-            self.electrode_detector,
-            self.model,
-            self.ui,
-        )
+    self.ui.proceed_button_1.clicked.connect(lambda: _detect_electrodes(self))
+
+
+def _detect_electrodes(self):
+    # the detector state must not change under a running preview job
+    self.preview_scheduler.wait_for_done()
+    detect_electrodes(
+        self.headmodels["scan"],
+        self.electrode_detector,
+        self.model,
+        self.ui,
+    )
+
+
+def _set_electrode_detector(self, method: str):
+    # running previews still use the replaced detector
+    self.preview_scheduler.wait_for_done()
+    electrode_detector = create_electrode_detector(method)
+    electrode_detector.set_detection_parameters(
+        _get_dog_parameters(self), _get_hough_parameters(self)
     )
+    if self.files["texture"] is not None:
+        electrode_detector.apply_texture(self.files["texture"])
+    if self.headmodels["scan"] is not None:
+        electrode_detector.set_region_of_interest(self.headmodels["scan"].mesh)
+    self.electrode_detector = electrode_detector
+
+    # the previews of the replaced detector are recomputed by the new one
+    shown_key = self.images.current_key
+    self.images.clear()
+    self.ui.photo_label.clear()
+    if self.files["texture"] is None:
+        return
+    if shown_key == "dog":
+        _schedule_dog(self)
+    elif shown_key == "hough":
+        _schedule_hough(self)
+
+
+def _schedule_dog(self):
+    schedule_dog(
+        self.preview_scheduler,
+        self.ui.texture_frame,
+        self.electrode_detector,
+        self.ui.kernel_size_spinbox.value(),
+        self.ui.sigma_spinbox.value(),
+        self.ui.diff_factor_spinbox.value(),
+        debounce=False,
+    )
+
+
+def _schedule_hough(self):
+    schedule_hough(
+        self.preview_scheduler,
+        self.ui.texture_frame,
+        self.electrode_detector,
+        tuple(_get_dog_parameters(self).values()),
+        *_get_hough_parameters(self).values(),
+        debounce=False,
+    )
+
+
+def _get_dog_parameters(self) -> dict:
+    # in the keyword names and order of the detector methods
+    return {
+        "ksize": self.ui.kernel_size_spinbox.value(),
+        "sigma": self.ui.sigma_spinbox.value(),
+        "F": self.ui.diff_factor_spinbox.value(),
+    }
+
+
+def _get_hough_parameters(self) -> dict:
+    # in the keyword names and order of the detector methods
+    return {
+        "param1": self.ui.param1_spinbox.value(),
+        "param2": self.ui.param2_spinbox.value(),
+        "min_distance_between_circles": self.ui.min_dist_spinbox.value(),
+        "min_radius": self.ui.min_radius_spinbox.value(),
+        "max_radius": self.ui.max_radius_spinbox.value(),
+    }
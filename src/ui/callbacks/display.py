@@ -1,9 +1,14 @@
 from view.surface_view import SurfaceView
 from processing_models.electrode_detector import DogHoughElectrodeDetector
-from PyQt6.QtGui import QImage, QPixmap
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+from PyQt6.QtCore import QSize
 from PyQt6.QtWidgets import QFrame, QLabel
 
+from ui.image_bridge import numpy_to_qimage
+from ui.image_presenter import ImagePresenter
+from ui.preview_scheduler import PreviewScheduler
+from ui.texture_overlay import CircleLayer
+
 from config.electrode_detector import DogParameters, HoughParameters
 
 
@@ -21,7 +26,7 @@ def set_surface_alpha(surface_view: SurfaceView | None, alpha: float, actor_inde
 
 
 def display_dog(
-    images: dict,
+    images: ImagePresenter,
     frame: QFrame,
     image_label: QLabel,
     dog_hough_detector: DogHoughElectrodeDetector,
@@ -29,64 +34,143 @@ def display_dog(
     sigma: float = DogParameters.SIGMA,
     F: float = DogParameters.FACTOR,
 ):
-    dog = dog_hough_detector.get_difference_of_gaussians(ksize=ksize, sigma=sigma, F=F)
+    image = create_dog_image(frame.size(), dog_hough_detector, ksize, sigma, F)
+    show_image(images, "dog", image_label, frame, image)
 
-    if dog is None:
-        return
 
-    images["dog"] = QImage(
-        dog.data,
-        dog.shape[1],
-        dog.shape[0],
-        QImage.Format.Format_Grayscale8,
-    ).rgbSwapped()
-
-    label_size = frame.size()
-    images["dog"] = images["dog"].scaled(
-        label_size.width(),
-        label_size.height(),
-        Qt.AspectRatioMode.KeepAspectRatio,
-        Qt.TransformationMode.FastTransformation,
+def display_hough(
+    images: ImagePresenter,
+    frame: QFrame,
+    image_label: QLabel,
+    dog_hough_detector: DogHoughElectrodeDetector,
+    param1: float = HoughParameters.PARAM1,
+    param2: float = HoughParameters.PARAM2,
+    min_distance: int = HoughParameters.MIN_DISTANCE,
+    min_radius: int = HoughParameters.MIN_RADIUS,
+    max_radius: int = HoughParameters.MAX_RADIUS,
+):
+    layer = create_hough_layer(
+        frame.size(),
+        dog_hough_detector,
+        param1=param1,
+        param2=param2,
+        min_distance=min_distance,
+        min_radius=min_radius,
+        max_radius=max_radius,
     )
+    show_image(images, "hough", image_label, frame, layer)
 
-    image_label.setPixmap(QPixmap.fromImage(images["dog"]))
 
+def schedule_dog(
+    scheduler: PreviewScheduler,
+    frame: QFrame,
+    dog_hough_detector: DogHoughElectrodeDetector,
+    ksize: int = DogParameters.KSIZE,
+    sigma: float = DogParameters.SIGMA,
+    F: float = DogParameters.FACTOR,
+    debounce: bool = True,
+):
+    frame_size = frame.size()
+    scheduler.schedule(
+        "dog",
+        lambda: create_dog_image(frame_size, dog_hough_detector, ksize, sigma, F),
+        debounce,
+    )
 
-def display_hough(
-    images: dict,
+
+def schedule_hough(
+    scheduler: PreviewScheduler,
     frame: QFrame,
-    image_label: QLabel,
     dog_hough_detector: DogHoughElectrodeDetector,
+    dog_parameters: tuple[int, float, float],
     param1: float = HoughParameters.PARAM1,
     param2: float = HoughParameters.PARAM2,
     min_distance: int = HoughParameters.MIN_DISTANCE,
     min_radius: int = HoughParameters.MIN_RADIUS,
     max_radius: int = HoughParameters.MAX_RADIUS,
+    debounce: bool = True,
 ):
-    hough = dog_hough_detector.get_hough_circles(
+    frame_size = frame.size()
+    ksize, sigma, F = dog_parameters
+
+    def compute() -> CircleLayer | None:
+        # a pending DoG request may have been superseded by this one, so the DoG the
+        # circles are detected on is brought up to date first
+        level = dog_hough_detector.get_preview_level(
+            frame_size.width(), frame_size.height(), min_radius
+        )
+        dog_hough_detector.get_difference_of_gaussians(ksize=ksize, sigma=sigma, F=F, level=level)
+        return create_hough_layer(
+            frame_size,
+            dog_hough_detector,
+            param1=param1,
+            param2=param2,
+            min_distance=min_distance,
+            min_radius=min_radius,
+            max_radius=max_radius,
+        )
+
+    scheduler.schedule("hough", compute, debounce)
+
+
+def create_dog_image(
+    frame_size: QSize,
+    dog_hough_detector: DogHoughElectrodeDetector,
+    ksize: int = DogParameters.KSIZE,
+    sigma: float = DogParameters.SIGMA,
+    F: float = DogParameters.FACTOR,
+) -> QImage | None:
+    # previews are computed on the pyramid level matching the frame size
+    level = dog_hough_detector.get_preview_level(frame_size.width(), frame_size.height())
+    dog = dog_hough_detector.get_difference_of_gaussians(ksize=ksize, sigma=sigma, F=F, level=level)
+
+    if dog is None:
+        return None
+
+    # the cached DoG is wrapped as is; it is scaled to the frame when it is shown
+    return numpy_to_qimage(dog)
+
+
+def create_hough_layer(
+    frame_size: QSize,
+    dog_hough_detector: DogHoughElectrodeDetector,
+    param1: float = HoughParameters.PARAM1,
+    param2: float = HoughParameters.PARAM2,
+    min_distance: int = HoughParameters.MIN_DISTANCE,
+    min_radius: int = HoughParameters.MIN_RADIUS,
+    max_radius: int = HoughParameters.MAX_RADIUS,
+) -> CircleLayer | None:
+    # only the circles are computed here; they are painted over the cached texture pixmap
+    # on the GUI thread
+    level = dog_hough_detector.get_preview_level(
+        frame_size.width(), frame_size.height(), min_radius
+    )
+    circles = dog_hough_detector.get_circles(
         param1=param1,
         param2=param2,
         min_distance_between_circles=min_distance,
         min_radius=min_radius,
         max_radius=max_radius,
+        level=level,
     )
 
-    if hough is None:
-        return
+    texture_level = dog_hough_detector.get_texture_level(level)
+    if texture_level is None:
+        return None
 
-    images["hough"] = QImage(
-        hough.data,
-        hough.shape[1],
-        hough.shape[0],
-        QImage.Format.Format_RGB888,
-    ).rgbSwapped()
-
-    label_size = frame.size()
-    images["hough"] = images["hough"].scaled(
-        label_size.width(),
-        label_size.height(),
-        Qt.AspectRatioMode.KeepAspectRatio,
-        Qt.TransformationMode.FastTransformation,
-    )
+    texture_key, texture = texture_level
+    return CircleLayer(texture_key, texture, circles, frame_size)
+
+
+def show_image(
+    images: ImagePresenter,
+    key: str,
+    image_label: QLabel,
+    frame: QFrame,
+    image: QImage | CircleLayer | None,
+):
+    if image is None:
+        return
 
-    image_label.setPixmap(QPixmap.fromImage(images["hough"]))
+    images.set_preview(key, image)
+    images.show(key, image_label, frame.size())
@@ -2,15 +2,29 @@ from email.mime import image
 from PyQt6.QtWidgets import QTabWidget, QLabel, QFrame
 from PyQt6.QtCore import Qt
 from ui.callbacks.display import display_surface
+from ui.image_presenter import ImagePresenter
 from config.mappings import ModalitiesMapping
 
 from data_models.cap_model import CapModel
 from view.surface_view import SurfaceView
 
 
-def refresh_views_on_tab_change(tab_widget: QTabWidget, views: dict):
+# preview keys of the texture tabs, by tab index
+TEXTURE_TAB_PREVIEWS = {0: "dog", 1: "hough"}
+
+
+def refresh_views_on_tab_change(
+    tab_widget: QTabWidget,
+    views: dict,
+    images: ImagePresenter | None = None,
+    image_label: QLabel | None = None,
+    image_frame: QFrame | None = None,
+):
     t = tab_widget.currentIndex()
     match t:
+        case 1:
+            if images is not None and image_label is not None and image_frame is not None:
+                images.refresh(image_label, image_frame.size())
         case 2:
             display_surface(views["scan"])
         case 3:
@@ -53,35 +67,17 @@ def refresh_count_indicators(
 def refresh_views_on_resize(
     views: dict,
     surface_frames: list[tuple[str, QFrame]],
+    images: ImagePresenter | None = None,
+    image_label: QLabel | None = None,
+    image_frame: QFrame | None = None,
 ):
     for label, frame in surface_frames:
         if views[label] is not None:
             views[label].resize_view(frame.size().width(), frame.size().height())
 
-    # very slow -> commented
-    # if images["dog"] is not None:
-    #     display_dog(
-    #         self.images,
-    #         self.ui.texture_frame,
-    #         self.ui.photo_label,
-    #         self.electrode_detector,
-    #         self.ui.kernel_size_spinbox.value(),
-    #         self.ui.sigma_spinbox.value(),
-    #         self.ui.diff_factor_spinbox.value(),
-    #     )
-
-    # if images["hough"] is not None:
-    #     display_hough(
-    #         self.images,
-    #         self.ui.texture_frame,
-    #         self.ui.photo_label,
-    #         self.electrode_detector,
-    #         self.ui.param1_spinbox.value(),
-    #         self.ui.param2_spinbox.value(),
-    #         self.ui.min_dist_spinbox.value(),
-    #         self.ui.min_radius_spinbox.value(),
-    #         self.ui.max_radius_spinbox.value(),
-    #     )
+    # previews are rescaled from the kept images, not recomputed
+    if images is not None and image_label is not None and image_frame is not None:
+        images.refresh(image_label, image_frame.size())
 
 
 def update_view_config(
@@ -99,3 +95,18 @@ def update_view_config(
             "flagpost_size": flagpost_size,
         }
         view.update_config(config)
+
+
+def refresh_texture_preview(
+    texture_tab_widget: QTabWidget,
+    images: ImagePresenter,
+    image_label: QLabel,
+    image_frame: QFrame,
+):
+    # the DoG tab shows the DoG preview, the Hough tab the circles, as far as computed; the
+    # other tabs keep the preview shown
+    key = TEXTURE_TAB_PREVIEWS.get(texture_tab_widget.currentIndex())
+    if key is None:
+        images.refresh(image_label, image_frame.size())
+    else:
+        images.show(key, image_label, image_frame.size())
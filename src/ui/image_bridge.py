@@ -0,0 +1,33 @@
+import numpy as np
+from PyQt6.QtGui import QImage
+
+_QIMAGE_FORMATS = {
+    1: QImage.Format.Format_Grayscale8,
+    3: QImage.Format.Format_BGR888,
+    4: QImage.Format.Format_ARGB32,
+}
+
+
+def numpy_to_qimage(image: np.ndarray) -> QImage:
+    """
+    Wraps a uint8 grayscale, BGR or BGRA image in a QImage without copying its pixels.
+
+    The QImage keeps a reference to the array, which must not be modified while the
+    QImage is in use. Only arrays with non-contiguous rows are copied first.
+    """
+    if image.dtype != np.uint8:
+        raise ValueError(f"Unsupported image dtype {image.dtype}, expected uint8")
+
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    if channels not in _QIMAGE_FORMATS:
+        raise ValueError(f"Unsupported number of image channels: {channels}")
+
+    if image.strides[1] != channels or (image.ndim == 3 and image.strides[2] != 1):
+        image = np.ascontiguousarray(image)
+
+    qimage = QImage(
+        image.data, image.shape[1], image.shape[0], image.strides[0], _QIMAGE_FORMATS[channels]
+    )
+    # QImage does not own the buffer; the array lives as long as the QImage wrapper
+    qimage._buffer = image
+    return qimage
@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from dataclasses import replace
+
+import numpy as np
+from PyQt6.QtCore import QSize, Qt
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtWidgets import QLabel
+
+from ui.image_bridge import numpy_to_qimage
+from ui.texture_overlay import CircleLayer, CircleOverlay
+
+from config.electrode_detector import PreviewParameters
+
+
+class ImagePresenter:
+    """
+    Keeps the latest preview per key (an image or a circle layer) and the pixmaps shown for
+    it, scaled to the frame sizes they were shown in.
+
+    Showing a key again, e.g. after a window resize or tab switch, reuses the cached pixmap
+    for that frame size or rescales the kept preview; nothing is recomputed. Pixmaps live on
+    the GUI thread, so presenting must happen there.
+    """
+
+    def __init__(
+        self,
+        overlay: CircleOverlay | None = None,
+        max_pixmaps: int = PreviewParameters.MAX_CACHED_PIXMAPS,
+    ):
+        self.overlay = overlay if overlay is not None else CircleOverlay()
+        self.max_pixmaps = max_pixmaps
+        self.current_key = None
+
+        self._previews = {}
+        self._pixmaps = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._previews
+
+    def set_preview(self, key: str, preview: np.ndarray | QImage | CircleLayer) -> None:
+        if isinstance(preview, np.ndarray):
+            preview = numpy_to_qimage(preview)
+
+        self._previews[key] = preview
+        for cached_key in [k for k in self._pixmaps if k[0] == key]:
+            del self._pixmaps[cached_key]
+
+    def get_pixmap(self, key: str, frame_size: QSize) -> QPixmap | None:
+        preview = self._previews.get(key)
+        if preview is None:
+            return None
+
+        cache_key = (key, frame_size.width(), frame_size.height())
+        pixmap = self._pixmaps.get(cache_key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(cache_key)
+            return pixmap
+
+        if isinstance(preview, CircleLayer):
+            pixmap = self.overlay.render(replace(preview, frame_size=frame_size))
+        else:
+            pixmap = QPixmap.fromImage(
+                preview.scaled(
+                    frame_size.width(),
+                    frame_size.height(),
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.FastTransformation,
+                )
+            )
+
+        self._pixmaps[cache_key] = pixmap
+        while len(self._pixmaps) > self.max_pixmaps:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def show(self, key: str, image_label: QLabel, frame_size: QSize) -> bool:
+        """Shows the preview of key scaled to frame_size; returns False if there is none."""
+        pixmap = self.get_pixmap(key, frame_size)
+        if pixmap is None:
+            return False
+
+        self.current_key = key
+        image_label.setPixmap(pixmap)
+        return True
+
+    def refresh(self, image_label: QLabel, frame_size: QSize) -> None:
+        """Shows the current preview again, e.g. scaled to a resized frame."""
+        if self.current_key is not None:
+            self.show(self.current_key, image_label, frame_size)
+
+    def clear(self) -> None:
+        self.current_key = None
+        self._previews.clear()
+        self._pixmaps.clear()
+        self.overlay.clear()
@@ -0,0 +1,102 @@
+import logging
+from collections.abc import Callable
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot
+
+from config.electrode_detector import PreviewParameters
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewScheduler(QObject):
+    """
+    Computes texture previews on a background worker thread.
+
+    Requests arriving within the debounce interval are coalesced into one, and results
+    of requests superseded by a newer one are discarded. Jobs run one at a time, so the
+    detector state they update is never touched by two threads at once.
+    """
+
+    # emits the preview key and the computed result, an image or a layer to render
+    image_ready = pyqtSignal(str, object)
+    _job_finished = pyqtSignal(int, str, object)
+
+    def __init__(self, debounce_ms: int = PreviewParameters.DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._submit_pending)
+
+        self._generation = 0
+        self._pending = None
+
+        self._job_finished.connect(self._on_job_finished)
+
+    def schedule(
+        self, key: str, compute: Callable[[], object | None], debounce: bool = True
+    ) -> None:
+        """Requests a preview; `compute` runs on the worker thread and returns the result."""
+        self._generation += 1
+        self._pending = (self._generation, key, compute)
+
+        if debounce:
+            self._timer.start()
+        else:
+            self._timer.stop()
+            self._submit_pending()
+
+    def wait_for_done(self) -> None:
+        """Runs any pending request and blocks until all submitted jobs have finished."""
+        if self._timer.isActive():
+            self._timer.stop()
+            self._submit_pending()
+        self._pool.waitForDone()
+
+    def _submit_pending(self) -> None:
+        if self._pending is None:
+            return
+        generation, key, compute = self._pending
+        self._pending = None
+        self._pool.start(_PreviewJob(self, generation, key, compute))
+
+    def _is_current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    @pyqtSlot(int, str, object)
+    def _on_job_finished(self, generation: int, key: str, image: object | None) -> None:
+        # a newer request was made while this one was running
+        if not self._is_current(generation) or image is None:
+            return
+        self.image_ready.emit(key, image)
+
+
+class _PreviewJob(QRunnable):
+    def __init__(
+        self,
+        scheduler: PreviewScheduler,
+        generation: int,
+        key: str,
+        compute: Callable[[], object | None],
+    ):
+        super().__init__()
+        self._scheduler = scheduler
+        self._generation = generation
+        self._key = key
+        self._compute = compute
+
+    def run(self) -> None:
+        # skip requests that became stale while waiting in the queue
+        if not self._scheduler._is_current(self._generation):
+            return
+
+        try:
+            image = self._compute()
+        except Exception:
+            logger.exception(f"Computing the {self._key} preview failed")
+            return
+
+        self._scheduler._job_finished.emit(self._generation, self._key, image)
@@ -492,6 +492,26 @@ class Ui_ELK(object):
         self.min_dist_spinbox.setObjectName("min_dist_spinbox")
         self.gridLayout.addWidget(self.min_dist_spinbox, 3, 1, 1, 1)
         self.tabWidget_texture.addTab(self.tab_11, "")
+        self.tab_12 = QtWidgets.QWidget()
+        self.tab_12.setObjectName("tab_12")
+        self.verticalLayout_15 = QtWidgets.QVBoxLayout(self.tab_12)
+        self.verticalLayout_15.setObjectName("verticalLayout_15")
+        self.label_24 = QtWidgets.QLabel(parent=self.tab_12)
+        self.label_24.setMinimumSize(QtCore.QSize(0, 15))
+        self.label_24.setMaximumSize(QtCore.QSize(16777215, 15))
+        self.label_24.setObjectName("label_24")
+        self.verticalLayout_15.addWidget(self.label_24)
+        self.detector_method_combobox = QtWidgets.QComboBox(parent=self.tab_12)
+        self.detector_method_combobox.setMinimumSize(QtCore.QSize(0, 30))
+        self.detector_method_combobox.setMaximumSize(QtCore.QSize(16777215, 30))
+        self.detector_method_combobox.setObjectName("detector_method_combobox")
+        self.detector_method_combobox.addItem("")
+        self.detector_method_combobox.addItem("")
+        self.detector_method_combobox.addItem("")
+        self.verticalLayout_15.addWidget(self.detector_method_combobox)
+        spacerItem = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Policy.Minimum, QtWidgets.QSizePolicy.Policy.Expanding)
+        self.verticalLayout_15.addItem(spacerItem)
+        self.tabWidget_texture.addTab(self.tab_12, "")
         self.verticalLayout_7.addWidget(self.tabWidget_texture)
         self.skip_button_1 = QtWidgets.QPushButton(parent=self.widget_3)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Minimum, QtWidgets.QSizePolicy.Policy.Minimum)
@@ -1074,6 +1094,11 @@ class Ui_ELK(object):
         self.label_20.setText(_translate("ELK", "Radius Range"))
         self.display_hough_button.setText(_translate("ELK", "Display"))
         self.tabWidget_texture.setTabText(self.tabWidget_texture.indexOf(self.tab_11), _translate("ELK", "Hough"))
+        self.label_24.setText(_translate("ELK", "Detector"))
+        self.detector_method_combobox.setItemText(0, _translate("ELK", "Hough"))
+        self.detector_method_combobox.setItemText(1, _translate("ELK", "Blob"))
+        self.detector_method_combobox.setItemText(2, _translate("ELK", "Scale space"))
+        self.tabWidget_texture.setTabText(self.tabWidget_texture.indexOf(self.tab_12), _translate("ELK", "Method"))
         self.skip_button_1.setText(_translate("ELK", "Skip"))
         self.proceed_button_1.setText(_translate("ELK", "Proceed"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tab), _translate("ELK", "Texture"))
@@ -1,6 +1,6 @@
 from config.mappings import ModalitiesMapping
 from ui.state_manager.state_machine import States, State
-from ui.callbacks.display import display_dog
+from ui.callbacks.display import schedule_dog
 from ui.callbacks.refresh import refresh_count_indicators
 
 
@@ -188,14 +188,14 @@ def initialize_processing_states(self):
             lambda: self.model.clear_electrodes_by_modality(ModalitiesMapping.HEADSCAN)
         )
         self.state_machine[state_name].add_callback(
-            lambda: display_dog(
-                self.images,
+            lambda: schedule_dog(
+                self.preview_scheduler,
                 self.ui.texture_frame,
-                self.ui.photo_label,
                 self.electrode_detector,
                 self.ui.kernel_size_spinbox.value(),
                 self.ui.sigma_spinbox.value(),
                 self.ui.diff_factor_spinbox.value(),
+                debounce=False,
             )
         )
 
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+
+import numpy as np
+from PyQt6.QtCore import QPointF, QSize, Qt
+from PyQt6.QtGui import QColor, QPainter, QPixmap
+
+from ui.image_bridge import numpy_to_qimage
+
+from config.colors import HOUGH_CIRCLES_COLOR
+
+
+@dataclass
+class CircleLayer:
+    """Circles found on a texture image, to be shown over it in a frame of the given size."""
+
+    texture_key: tuple
+    texture: np.ndarray
+    circles: np.ndarray | None
+    frame_size: QSize
+
+
+class CircleOverlay:
+    """
+    Shows detected circles as a layer painted over a display-scaled texture pixmap.
+
+    The base pixmap is scaled from the texture once per texture and frame size and kept,
+    so a new set of circles only paints the circles onto a display-sized copy of it; the
+    full resolution texture is never copied or converted on parameter changes.
+    Pixmaps live on the GUI thread, so rendering must happen there.
+    """
+
+    def __init__(self, color: tuple[int, int, int] = HOUGH_CIRCLES_COLOR):
+        self.color = QColor(*color)
+        self._base_key = None
+        self._base_pixmap = None
+
+    def render(self, layer: CircleLayer) -> QPixmap:
+        pixmap = self._get_base_pixmap(layer).copy()
+        if layer.circles is None:
+            return pixmap
+
+        scale = pixmap.width() / layer.texture.shape[1]
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(self.color)
+        for x, y, radius in layer.circles[0].astype(np.float64) * scale:
+            painter.drawEllipse(QPointF(x, y), radius, radius)
+        painter.end()
+
+        return pixmap
+
+    def clear(self) -> None:
+        self._base_key = None
+        self._base_pixmap = None
+
+    def _get_base_pixmap(self, layer: CircleLayer) -> QPixmap:
+        key = (layer.texture_key, layer.frame_size.width(), layer.frame_size.height())
+        if key != self._base_key:
+            image = numpy_to_qimage(layer.texture)
+            self._base_pixmap = QPixmap.fromImage(
+                image.scaled(
+                    layer.frame_size.width(),
+                    layer.frame_size.height(),
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+            )
+            self._base_key = key
+
+        return self._base_pixmap  # type: ignore
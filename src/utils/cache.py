@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+import numpy as np
+
+
+class LRUCache:
+    """Least recently used cache bounded by the total size in bytes of its values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._total_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        nbytes = compute_nbytes(value)
+
+        if key in self._entries:
+            self._total_bytes -= self._entries.pop(key)[1]
+
+        # values larger than the whole cache are not worth keeping
+        if nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = (value, nbytes)
+        self._total_bytes += nbytes
+
+        while self._total_bytes > self.max_bytes:
+            _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_nbytes
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._entries:
+            return default
+        value, nbytes = self._entries.pop(key)
+        self._total_bytes -= nbytes
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._total_bytes = 0
+
+
+def compute_nbytes(value: Any) -> int:
+    """Returns the memory held by the numpy arrays in a (nested) value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(compute_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(compute_nbytes(item) for item in value.values())
+    return 0
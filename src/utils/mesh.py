@@ -1,5 +1,6 @@
 import vedo as vd
 from vedo import utils
+from vedo.utils import numpy2vtk, vtk2numpy
 import numpy as np
 
 # import vtk
@@ -44,6 +45,64 @@ def rescale_to_original_size(mesh: vd.Mesh, scale: float) -> float:
     return 1.0
 
 
+# point data arrays are stored under their name with this prefix
+POINT_DATA_PREFIX = "pointdata_"
+
+
+def get_mesh_arrays(mesh: vd.Mesh) -> dict[str, np.ndarray]:
+    """
+    Returns the points, polygons and point data (e.g. UV coordinates) of the mesh as numpy
+    arrays, to be stored and rebuilt with `create_mesh_from_arrays`.
+    """
+    polydata = mesh.inputdata()
+    polys = polydata.GetPolys()
+    arrays = {
+        "points": vtk2numpy(polydata.GetPoints().GetData()),
+        "poly_offsets": vtk2numpy(polys.GetOffsetsArray()),
+        "poly_connectivity": vtk2numpy(polys.GetConnectivityArray()),
+    }
+
+    point_data = polydata.GetPointData()
+    for i in range(point_data.GetNumberOfArrays()):
+        array = point_data.GetArray(i)
+        if array is not None and array.GetName():
+            arrays[POINT_DATA_PREFIX + array.GetName()] = vtk2numpy(array)
+
+    tcoords = point_data.GetTCoords()
+    if tcoords is not None and tcoords.GetName():
+        arrays["tcoords_name"] = np.array(tcoords.GetName())
+
+    return arrays
+
+
+def create_mesh_from_arrays(arrays: dict[str, np.ndarray]) -> vd.Mesh:
+    """Rebuilds a mesh from the arrays returned by `get_mesh_arrays`."""
+    points = vtk.vtkPoints()
+    points.SetData(numpy2vtk(arrays["points"]))
+
+    polys = vtk.vtkCellArray()
+    polys.SetData(
+        numpy2vtk(arrays["poly_offsets"], dtype=np.int64),
+        numpy2vtk(arrays["poly_connectivity"], dtype=np.int64),
+    )
+
+    polydata = vtk.vtkPolyData()
+    polydata.SetPoints(points)
+    polydata.SetPolys(polys)
+
+    tcoords_name = str(arrays["tcoords_name"]) if "tcoords_name" in arrays else None
+    for key, values in arrays.items():
+        if not key.startswith(POINT_DATA_PREFIX):
+            continue
+        name = key[len(POINT_DATA_PREFIX) :]
+        array = numpy2vtk(values, name=name)
+        polydata.GetPointData().AddArray(array)
+        if name == tcoords_name:
+            polydata.GetPointData().SetTCoords(array)
+
+    return vd.Mesh(polydata)
+
+
 def align_with_landmarks(
     mesh, source_landmarks, target_landmarks, rigid=False, affine=False, least_squares=False
 ):
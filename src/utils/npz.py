@@ -0,0 +1,78 @@
+import os
+import struct
+import zipfile
+from collections.abc import Callable
+
+import numpy as np
+
+# fixed part of a zip local file header, followed by the file name and the extra field
+_LOCAL_HEADER_SIZE = 30
+
+
+def save_npz(filename: str, arrays: dict[str, np.ndarray]) -> None:
+    """
+    Writes arrays to an uncompressed .npz file, so that `load_npz` can memory-map them.
+
+    The file is written under a temporary name and renamed, so an interrupted save never
+    leaves a truncated file behind.
+    """
+    partial_file = f"{filename}.{os.getpid()}.partial"
+    try:
+        with open(partial_file, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(partial_file, filename)
+    finally:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+
+
+def load_npz(filename: str, select: Callable[[str], bool] | None = None) -> dict[str, np.ndarray]:
+    """
+    Returns the arrays of an uncompressed .npz file as read-only memory maps.
+
+    Only the zip directory and the .npy headers are read; the array data stays on disk
+    until it is accessed. `select` picks the array names to open. Compressed members are
+    read into memory.
+    """
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive, open(filename, "rb") as file:
+        for info in archive.infolist():
+            name = info.filename.removesuffix(".npy")
+            if select is not None and not select(name):
+                continue
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+
+            arrays[name] = _map_member(filename, file, info)
+    return arrays
+
+
+def _map_member(filename: str, file, info: zipfile.ZipInfo) -> np.ndarray:
+    file.seek(info.header_offset)
+    local_header = file.read(_LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+    file.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+
+    version = np.lib.format.read_magic(file)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+    if dtype.hasobject:
+        raise ValueError(f"{info.filename} holds Python objects and cannot be memory-mapped")
+
+    # empty arrays cannot be mapped
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+
+    return np.memmap(
+        filename,
+        dtype=dtype,
+        mode="r",
+        offset=file.tell(),
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
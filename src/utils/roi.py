@@ -0,0 +1,164 @@
+import cv2 as cv
+import numpy as np
+
+from utils.texture import compute_difference_of_gaussians
+
+from config.electrode_detector import ROIParameters
+
+
+def compute_uv_coverage_mask(
+    face_index_map: np.ndarray, margin: int = ROIParameters.MARGIN
+) -> np.ndarray:
+    """
+    Returns the boolean mask of texels covered by a mesh triangle, grown by `margin` pixels
+    so that electrodes on the border of a UV island are not cut off.
+    """
+    mask = (face_index_map >= 0).view(np.uint8)
+    if margin > 0:
+        kernel = cv.getStructuringElement(cv.MORPH_ELLIPSE, (2 * margin + 1, 2 * margin + 1))
+        mask = cv.dilate(mask, kernel)
+    return mask.view(bool)
+
+
+def compute_color_mask(
+    image: np.ndarray,
+    lower_hsv: tuple[int, int, int] = ROIParameters.CAP_LOWER_HSV,
+    upper_hsv: tuple[int, int, int] = ROIParameters.CAP_UPPER_HSV,
+    margin: int = ROIParameters.MARGIN,
+) -> np.ndarray:
+    """Returns the boolean mask of pixels within an HSV color range, closed over `margin`."""
+    hsv = cv.cvtColor(image, cv.COLOR_BGR2HSV)
+    mask = cv.inRange(hsv, np.array(lower_hsv), np.array(upper_hsv))
+    if margin > 0:
+        # electrodes are not cap colored; closing fills them into the cap region
+        kernel = cv.getStructuringElement(cv.MORPH_ELLIPSE, (2 * margin + 1, 2 * margin + 1))
+        mask = cv.morphologyEx(mask, cv.MORPH_CLOSE, kernel)
+    return mask > 0
+
+
+def resize_mask(mask: np.ndarray, shape: tuple[int, ...]) -> np.ndarray:
+    """Resizes a boolean mask; a target pixel is set if any source pixel under it is set."""
+    if mask.shape == tuple(shape[0:2]):
+        return mask
+    resized = cv.resize(
+        mask.view(np.uint8) * 255, (shape[1], shape[0]), interpolation=cv.INTER_AREA
+    )
+    return resized > 0
+
+
+def get_mask_spans(
+    mask: np.ndarray, tile_size: int, halo: int
+) -> list[tuple[tuple[slice, slice], tuple[slice, slice]]]:
+    """
+    Returns (core, padded) regions covering the tiles that contain a masked pixel.
+
+    The covered tiles of every row of tiles are joined into one span from the first to
+    the last covered tile, which keeps the number of filter calls low for masks spread
+    over the texture while still skipping the empty margins of the rows.
+    """
+    height, width = mask.shape[0:2]
+    spans = []
+    for y0 in range(0, height, tile_size):
+        y1 = min(y0 + tile_size, height)
+        columns = np.flatnonzero(mask[y0:y1].any(axis=0))
+        if len(columns) == 0:
+            continue
+
+        x0 = columns[0] // tile_size * tile_size
+        x1 = min((columns[-1] // tile_size + 1) * tile_size, width)
+        core = (slice(y0, y1), slice(x0, x1))
+        padded = (
+            slice(max(y0 - halo, 0), min(y1 + halo, height)),
+            slice(max(x0 - halo, 0), min(x1 + halo, width)),
+        )
+        spans.append((core, padded))
+    return spans
+
+
+def get_mask_bounding_region(mask: np.ndarray, halo: int) -> tuple[slice, slice]:
+    """Returns the (row, column) slices of the bounding box of a mask, grown by `halo`."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    columns = np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0:
+        return slice(0, 0), slice(0, 0)
+
+    height, width = mask.shape[0:2]
+    return (
+        slice(max(rows[0] - halo, 0), min(rows[-1] + 1 + halo, height)),
+        slice(max(columns[0] - halo, 0), min(columns[-1] + 1 + halo, width)),
+    )
+
+
+def compute_masked_difference_of_gaussians(
+    image: np.ndarray,
+    mask: np.ndarray,
+    ksize: int,
+    sigma: float,
+    F: float,
+    threshold_level: int,
+    tile_size: int = ROIParameters.TILE_SIZE,
+) -> np.ndarray:
+    """
+    Computes the binary DoG image only on the tiles covering the mask and zeroes it
+    outside the mask.
+
+    Regions are padded by the kernel radius, so the DoG inside the mask is identical to
+    the DoG of the whole image.
+    """
+    spans = get_mask_spans(mask, tile_size, ksize // 2)
+    if len(spans) > 1:
+        # filter the bounding box of all spans in one call when the halos of separate spans
+        # would cost more than the empty texels of the bounding box
+        bounding_core = _get_bounding_region([core for core, _ in spans])
+        bounding_padded = _get_bounding_region([padded for _, padded in spans])
+        if _get_area(bounding_padded) <= sum(_get_area(padded) for _, padded in spans):
+            spans = [(bounding_core, bounding_padded)]
+
+    dog = np.zeros(image.shape[0:2], dtype=np.uint8)
+    for core, padded in spans:
+        region_dog = compute_difference_of_gaussians(
+            np.ascontiguousarray(image[padded]), ksize, sigma, F, threshold_level
+        )
+        dog[core] = region_dog[
+            core[0].start - padded[0].start : core[0].stop - padded[0].start,
+            core[1].start - padded[1].start : core[1].stop - padded[1].start,
+        ]
+
+    dog[~mask] = 0
+    return dog
+
+
+def shift_circles(circles: np.ndarray | None, region: tuple[slice, slice]) -> np.ndarray | None:
+    """Moves (1, N, 3) circles found in a region of an image to image coordinates."""
+    if circles is None:
+        return None
+
+    circles = circles.copy()
+    circles[0, :, 0] += region[1].start
+    circles[0, :, 1] += region[0].start
+    return circles
+
+
+def filter_circles_by_mask(circles: np.ndarray | None, mask: np.ndarray) -> np.ndarray | None:
+    """Drops the (1, N, 3) circles whose center lies outside the mask."""
+    if circles is None:
+        return None
+
+    height, width = mask.shape
+    xs = np.clip(np.rint(circles[0, :, 0]), 0, width - 1).astype(np.int64)
+    ys = np.clip(np.rint(circles[0, :, 1]), 0, height - 1).astype(np.int64)
+
+    inside = mask[ys, xs]
+    if not np.any(inside):
+        return None
+    return circles[:, inside, :]
+
+
+def _get_area(region: tuple[slice, slice]) -> int:
+    return (region[0].stop - region[0].start) * (region[1].stop - region[1].start)
+
+
+def _get_bounding_region(regions: list[tuple[slice, slice]]) -> tuple[slice, slice]:
+    rows = slice(min(r[0].start for r in regions), max(r[0].stop for r in regions))
+    columns = slice(min(r[1].start for r in regions), max(r[1].stop for r in regions))
+    return rows, columns
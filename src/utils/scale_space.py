@@ -0,0 +1,57 @@
+import cv2 as cv
+import numpy as np
+
+from utils.texture import rgb2gray
+
+from config.electrode_detector import ScaleSpaceParameters
+
+
+def get_scale_space_sigmas(
+    min_sigma: float,
+    max_sigma: float,
+    scales_per_octave: int = ScaleSpaceParameters.SCALES_PER_OCTAVE,
+) -> np.ndarray:
+    """
+    Returns the geometric series of gaussian sigmas sampling [min_sigma, max_sigma], padded
+    with one scale below and above so that every sampled scale has neighbours in scale.
+    """
+    step = 2 ** (1 / scales_per_octave)
+    count = int(np.ceil(np.log(max_sigma / min_sigma) / np.log(step))) + 1
+    return min_sigma * step ** np.arange(-1, count + 1)
+
+
+def compute_scale_space(image: np.ndarray, sigmas: np.ndarray) -> np.ndarray:
+    """
+    Computes the (S, H, W) difference of gaussians stack of an image, one layer per sigma.
+
+    Layer i is G(sigma_i * step) - G(sigma_i), which approximates the scale normalized
+    Laplacian and is positive on blobs darker than their surroundings.
+    """
+    gray = rgb2gray(image) if image.ndim == 3 else image
+    gray = gray.astype(np.float32)
+
+    step = sigmas[1] / sigmas[0]
+    blurred = [
+        cv.GaussianBlur(gray, (0, 0), sigma) for sigma in np.append(sigmas, sigmas[-1] * step)
+    ]
+    return np.stack([blurred[i + 1] - blurred[i] for i in range(len(sigmas))])
+
+
+def detect_scale_space_extrema(
+    scale_space: np.ndarray, threshold: float = ScaleSpaceParameters.THRESHOLD
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds the local maxima of a DoG stack over its 3x3x3 neighbourhood in scale and space.
+
+    Returns the scale indices, rows and columns of the maxima above `threshold`; the first
+    and last layers only serve as neighbours.
+    """
+    kernel = np.ones((3, 3), dtype=np.uint8)
+    spatial_maxima = np.stack([cv.dilate(layer, kernel) for layer in scale_space])
+    neighbourhood_maxima = np.maximum(
+        np.maximum(spatial_maxima[:-2], spatial_maxima[1:-1]), spatial_maxima[2:]
+    )
+
+    inner = scale_space[1:-1]
+    scales, rows, columns = np.nonzero((inner == neighbourhood_maxima) & (inner > threshold))
+    return scales + 1, rows, columns
@@ -0,0 +1,199 @@
+import itertools
+
+import numpy as np
+
+# largest block of cells searched around a query before falling back to brute force
+MAX_SEARCH_CELLS = 1024
+# cells looked up at once when gathering the candidates of many queries
+MAX_GATHERED_CELLS = 2**18
+# cells along one axis of the grid, so that cell keys fit into int64 in three dimensions
+MAX_AXIS_CELLS = 2**20
+# point pairs compared at once by the brute force fallbacks
+MAX_BRUTE_FORCE_PAIRS = 2**20
+
+
+class UniformGridIndex:
+    """
+    Uniform grid (spatial hash) over a static set of points for batched neighbour queries.
+
+    Points are bucketed into cubic cells and the cells are stored as a sorted key
+    array, so nearest-neighbour and radius queries only visit the cells around each
+    query and run vectorized over all queries at once.
+    """
+
+    def __init__(
+        self, points: np.ndarray, cell_size: float | None = None, points_per_cell: int = 4
+    ):
+        self.points = np.asarray(points, dtype=np.float64)
+        if self.points.ndim != 2:
+            raise ValueError("Points must be a (N, D) array.")
+
+        self.dimensions = self.points.shape[1]
+
+        if len(self.points) > 0:
+            self._origin = self.points.min(axis=0)
+            extent = self.points.max(axis=0) - self._origin
+        else:
+            self._origin = np.zeros(self.dimensions)
+            extent = np.zeros(self.dimensions)
+
+        if cell_size is None:
+            cell_size = self._estimate_cell_size(extent, points_per_cell)
+        # a tiny cell (e.g. estimated for nearly coplanar points) must not overflow the keys
+        self.cell_size = max(float(cell_size), float(extent.max(initial=0)) / MAX_AXIS_CELLS)
+        if self.cell_size <= 0:
+            self.cell_size = 1.0
+
+        self._grid_shape = np.floor(extent / self.cell_size).astype(np.int64) + 1
+        self._strides = np.cumprod(np.concatenate(([1], self._grid_shape[:-1])))
+
+        keys = self._cell_keys(self._cell_coordinates(self.points))
+        self._order = np.argsort(keys, kind="stable")
+        self._cell_keys_sorted, self._cell_starts, self._cell_counts = np.unique(
+            keys[self._order], return_index=True, return_counts=True
+        )
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def query_nearest(self, queries: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the distances to and the indices of the closest point for every query."""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, self.dimensions)
+        distances = np.full(len(queries), np.inf)
+        indices = np.full(len(queries), -1, dtype=np.int64)
+
+        if len(self.points) == 0 or len(queries) == 0:
+            return distances, indices
+
+        # a neighbour found within `rings` cell sizes of the query is guaranteed to be the
+        # closest one; unresolved queries search growing shells of cells around them
+        unresolved = np.arange(len(queries))
+        inner_rings, rings = -1, 1
+        while len(unresolved) > 0 and (2 * rings + 1) ** self.dimensions <= MAX_SEARCH_CELLS:
+            query_ids, point_ids = self._gather_candidates(
+                queries[unresolved], rings=rings, inner_rings=inner_rings
+            )
+            query_ids = unresolved[query_ids]
+            if len(query_ids) > 0:
+                candidate_distances = np.linalg.norm(
+                    self.points[point_ids] - queries[query_ids], axis=1
+                )
+                order = np.lexsort((candidate_distances, query_ids))
+                first = np.ones(len(order), dtype=bool)
+                first[1:] = query_ids[order][1:] != query_ids[order][:-1]
+                best = order[first]
+                closer = candidate_distances[best] < distances[query_ids[best]]
+                best = best[closer]
+                distances[query_ids[best]] = candidate_distances[best]
+                indices[query_ids[best]] = point_ids[best]
+
+            unresolved = unresolved[distances[unresolved] > rings * self.cell_size]
+            inner_rings, rings = rings, 2 * rings
+
+        # the remaining (far away) queries are resolved by brute force
+        chunk_size = max(1, MAX_BRUTE_FORCE_PAIRS // len(self.points))
+        for start in range(0, len(unresolved), chunk_size):
+            chunk = unresolved[start : start + chunk_size]
+            chunk_distances = np.linalg.norm(
+                self.points[np.newaxis, :, :] - queries[chunk, np.newaxis, :], axis=2
+            )
+            indices[chunk] = np.argmin(chunk_distances, axis=1)
+            distances[chunk] = chunk_distances[np.arange(len(chunk)), indices[chunk]]
+
+        return distances, indices
+
+    def query_radius(self, queries: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """Returns (query index, point index) pairs closer than `radius` to each other."""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, self.dimensions)
+        if len(self.points) == 0 or len(queries) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        rings = max(1, int(np.ceil(radius / self.cell_size)))
+        if (2 * rings + 1) ** self.dimensions > MAX_SEARCH_CELLS:
+            # the radius spans too many cells, e.g. of an index built for a smaller radius
+            return self._query_radius_brute_force(queries, radius)
+        query_ids, point_ids = self._gather_candidates(queries, rings=rings)
+
+        distances = np.linalg.norm(self.points[point_ids] - queries[query_ids], axis=1)
+        within = distances < radius
+        return query_ids[within], point_ids[within]
+
+    def query_pairs(self, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """Returns all index pairs (i, j), i < j, of indexed points closer than `radius`."""
+        i, j = self.query_radius(self.points, radius)
+        keep = i < j
+        return i[keep], j[keep]
+
+    def _query_radius_brute_force(
+        self, queries: np.ndarray, radius: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        query_ids = [np.empty(0, dtype=np.int64)]
+        point_ids = [np.empty(0, dtype=np.int64)]
+        chunk_size = max(1, MAX_BRUTE_FORCE_PAIRS // len(self.points))
+        for start in range(0, len(queries), chunk_size):
+            chunk_distances = np.linalg.norm(
+                self.points[np.newaxis, :, :]
+                - queries[start : start + chunk_size, np.newaxis, :],
+                axis=2,
+            )
+            chunk_queries, chunk_points = np.nonzero(chunk_distances < radius)
+            query_ids.append(chunk_queries + start)
+            point_ids.append(chunk_points)
+        return np.concatenate(query_ids), np.concatenate(point_ids)
+
+    def _gather_candidates(
+        self, queries: np.ndarray, rings: int, inner_rings: int = -1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # collects every point in the (2 * rings + 1)^D block of cells around each query,
+        # skipping the inner (2 * inner_rings + 1)^D block; all cells of a chunk of queries
+        # are looked up at once, so single queries cost a few array operations
+        offsets = np.array(
+            list(itertools.product(range(-rings, rings + 1), repeat=self.dimensions)),
+            dtype=np.int64,
+        )
+        offsets = offsets[np.max(np.abs(offsets), axis=1) > inner_rings]
+        query_cells = self._cell_coordinates(queries)
+
+        query_ids = [np.empty(0, dtype=np.int64)]
+        point_ids = [np.empty(0, dtype=np.int64)]
+        chunk_size = max(1, MAX_GATHERED_CELLS // len(offsets))
+        for start in range(0, len(queries), chunk_size):
+            chunk_cells = query_cells[start : start + chunk_size]
+            cells = (offsets[:, np.newaxis, :] + chunk_cells[np.newaxis, :, :]).reshape(
+                -1, self.dimensions
+            )
+            cell_queries = np.tile(np.arange(start, start + len(chunk_cells)), len(offsets))
+
+            inside = np.all((cells >= 0) & (cells < self._grid_shape), axis=1)
+            keys = self._cell_keys(cells[inside])
+
+            positions = np.searchsorted(self._cell_keys_sorted, keys)
+            positions = np.minimum(positions, len(self._cell_keys_sorted) - 1)
+            occupied = self._cell_keys_sorted[positions] == keys
+
+            cell_queries = cell_queries[inside][occupied]
+            starts = self._cell_starts[positions[occupied]]
+            counts = self._cell_counts[positions[occupied]]
+
+            offsets_in_cell = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            query_ids.append(np.repeat(cell_queries, counts))
+            point_ids.append(self._order[np.repeat(starts, counts) + offsets_in_cell])
+
+        return np.concatenate(query_ids), np.concatenate(point_ids)
+
+    def _cell_coordinates(self, points: np.ndarray) -> np.ndarray:
+        return np.floor((points - self._origin) / self.cell_size).astype(np.int64)
+
+    def _cell_keys(self, cells: np.ndarray) -> np.ndarray:
+        return cells @ self._strides
+
+    def _estimate_cell_size(self, extent: np.ndarray, points_per_cell: int) -> float:
+        # cells sized so that on average `points_per_cell` points fall into each cell
+        extent = extent[extent > 0]
+        if len(extent) == 0:
+            return 1.0
+        volume = np.prod(extent)
+        cells = max(1.0, len(self.points) / points_per_cell)
+        return float((volume / cells) ** (1 / len(extent)))
@@ -0,0 +1,115 @@
+import cv2 as cv
+import numpy as np
+
+from utils.roi import (
+    compute_color_mask,
+    compute_masked_difference_of_gaussians,
+    compute_uv_coverage_mask,
+    filter_circles_by_mask,
+    get_mask_bounding_region,
+    get_mask_spans,
+    resize_mask,
+    shift_circles,
+)
+from utils.texture import compute_difference_of_gaussians
+
+IMAGE_SHAPE = (150, 220)
+
+
+def _create_mask(seed: int = 0) -> np.ndarray:
+    # a few separate disks, as left by the UV islands of a cap
+    rng = np.random.default_rng(seed)
+    mask = np.zeros(IMAGE_SHAPE, dtype=np.uint8)
+    for x, y, radius in zip(
+        rng.integers(0, IMAGE_SHAPE[1], 4), rng.integers(0, IMAGE_SHAPE[0], 4), (5, 12, 20, 30)
+    ):
+        cv.circle(mask, (int(x), int(y)), int(radius), 1, -1)
+    return mask.view(bool)
+
+
+def test_compute_uv_coverage_mask():
+    face_index_map = np.full(IMAGE_SHAPE, -1, dtype=np.int64)
+    face_index_map[50:60, 70:90] = 3
+    mask = compute_uv_coverage_mask(face_index_map, margin=4)
+
+    # every texel within the margin of a covered texel, brute force
+    ys, xs = np.mgrid[0 : IMAGE_SHAPE[0], 0 : IMAGE_SHAPE[1]]
+    dy = np.maximum(np.maximum(50 - ys, ys - 59), 0)
+    dx = np.maximum(np.maximum(70 - xs, xs - 89), 0)
+    assert np.all(mask[dx**2 + dy**2 <= 9])
+    assert not np.any(mask[np.maximum(dx, dy) > 4])
+    assert np.array_equal(compute_uv_coverage_mask(face_index_map, margin=0), face_index_map >= 0)
+
+
+def test_compute_color_mask():
+    image = np.zeros((*IMAGE_SHAPE, 3), dtype=np.uint8)
+    image[:, 100:] = (255, 0, 0)
+    mask = compute_color_mask(image, (110, 100, 100), (130, 255, 255), margin=0)
+    assert np.all(mask[:, 100:]) and not np.any(mask[:, :100])
+
+
+def test_resize_mask():
+    mask = np.zeros((100, 100), dtype=bool)
+    mask[41, 57] = True
+    resized = resize_mask(mask, (25, 25, 3))
+    # a single source pixel still sets the target pixel under it
+    assert np.array_equal(np.argwhere(resized), [[10, 14]])
+    assert resize_mask(mask, (100, 100)) is mask
+
+
+def test_get_mask_spans():
+    mask = _create_mask()
+    spans = get_mask_spans(mask, tile_size=32, halo=5)
+
+    covered = np.zeros(IMAGE_SHAPE, dtype=bool)
+    for core, padded in spans:
+        assert not np.any(covered[core])
+        covered[core] = True
+        for core_slice, padded_slice, size in zip(core, padded, IMAGE_SHAPE):
+            assert padded_slice.start == max(core_slice.start - 5, 0)
+            assert padded_slice.stop == min(core_slice.stop + 5, size)
+    # every masked pixel lies in exactly one core
+    assert np.all(covered[mask])
+
+
+def test_get_mask_bounding_region():
+    mask = _create_mask(seed=1)
+    rows, columns = np.nonzero(mask)
+    region = get_mask_bounding_region(mask, halo=3)
+    assert region == (
+        slice(max(rows.min() - 3, 0), min(rows.max() + 4, IMAGE_SHAPE[0])),
+        slice(max(columns.min() - 3, 0), min(columns.max() + 4, IMAGE_SHAPE[1])),
+    )
+    assert get_mask_bounding_region(np.zeros(IMAGE_SHAPE, dtype=bool), 3) == (
+        slice(0, 0),
+        slice(0, 0),
+    )
+
+
+def test_compute_masked_difference_of_gaussians():
+    rng = np.random.default_rng(2)
+    image = rng.integers(0, 256, (*IMAGE_SHAPE, 3), dtype=np.uint8)
+    image = cv.GaussianBlur(image, (5, 5), 0)
+    for seed in range(3):
+        mask = _create_mask(seed)
+        for ksize, tile_size in ((5, 16), (11, 32), (41, 64)):
+            dog = compute_difference_of_gaussians(image, ksize, 2.0, 1.6, 1)
+            masked_dog = compute_masked_difference_of_gaussians(
+                image, mask, ksize, 2.0, 1.6, 1, tile_size
+            )
+            # equal to the whole-image DoG inside the mask and zero outside
+            assert np.array_equal(masked_dog[mask], dog[mask]), (seed, ksize)
+            assert not np.any(masked_dog[~mask])
+
+
+def test_shift_and_filter_circles():
+    circles = np.array([[[3.0, 4.0, 2.0], [30.0, 10.0, 5.0], [10.4, 20.6, 1.0]]])
+    shifted = shift_circles(circles, (slice(20, 60), slice(40, 90)))
+    assert np.array_equal(shifted[0, :, 0:2], [[43.0, 24.0], [70.0, 30.0], [50.4, 40.6]])
+    assert np.array_equal(circles[0, 0], [3.0, 4.0, 2.0])
+
+    mask = np.zeros(IMAGE_SHAPE, dtype=bool)
+    mask[24, 43] = mask[41, 50] = True
+    assert np.array_equal(filter_circles_by_mask(shifted, mask), shifted[:, [0, 2]])
+    assert filter_circles_by_mask(shifted, np.zeros(IMAGE_SHAPE, dtype=bool)) is None
+    assert shift_circles(None, (slice(0, 1), slice(0, 1))) is None
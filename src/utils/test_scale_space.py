@@ -0,0 +1,53 @@
+import numpy as np
+
+from utils.scale_space import (
+    compute_scale_space,
+    detect_scale_space_extrema,
+    get_scale_space_sigmas,
+)
+
+
+def test_get_scale_space_sigmas():
+    sigmas = get_scale_space_sigmas(1.6, 12.0, scales_per_octave=3)
+    assert np.allclose(sigmas[1:] / sigmas[:-1], 2 ** (1 / 3))
+    # one padding scale on either side of the sampled range
+    assert np.isclose(sigmas[1], 1.6)
+    assert sigmas[-3] < 12.0 <= sigmas[-2]
+
+
+def test_detect_scale_space_extrema():
+    rng = np.random.default_rng(0)
+    scale_space = rng.normal(0, 10, (5, 23, 31)).astype(np.float32)
+    scales, rows, columns = detect_scale_space_extrema(scale_space, threshold=5)
+
+    # brute force over the 3x3x3 neighbourhoods, clipped to the image
+    expected = set()
+    count, height, width = scale_space.shape
+    for s in range(1, count - 1):
+        for r in range(height):
+            for c in range(width):
+                neighbourhood = scale_space[
+                    s - 1 : s + 2, max(r - 1, 0) : r + 2, max(c - 1, 0) : c + 2
+                ]
+                value = scale_space[s, r, c]
+                if value > 5 and value == neighbourhood.max():
+                    expected.add((s, r, c))
+    assert set(zip(scales.tolist(), rows.tolist(), columns.tolist())) == expected
+
+
+def test_dark_blob_scale():
+    # a dark gaussian blob is the strongest extremum, at its center and near its scale
+    blob_sigma = 4.0
+    ys, xs = np.mgrid[0:96, 0:128]
+    image = 200 - 150 * np.exp(-((xs - 70) ** 2 + (ys - 40) ** 2) / (2 * blob_sigma**2))
+    image = np.repeat(image[..., np.newaxis], 3, axis=2).astype(np.uint8)
+
+    sigmas = get_scale_space_sigmas(1.6, 12.0)
+    scale_space = compute_scale_space(image, sigmas)
+    assert scale_space.shape == (len(sigmas), 96, 128)
+
+    scales, rows, columns = detect_scale_space_extrema(scale_space, threshold=1)
+    strongest = np.argmax(scale_space[scales, rows, columns])
+    assert (rows[strongest], columns[strongest]) == (40, 70)
+    step = sigmas[1] / sigmas[0]
+    assert blob_sigma / step <= sigmas[scales[strongest]] * np.sqrt(step) <= blob_sigma * step
@@ -0,0 +1,67 @@
+import numpy as np
+
+from utils.spatial_index import UniformGridIndex
+
+
+def _get_pairs_brute_force(queries: np.ndarray, points: np.ndarray, radius: float) -> set:
+    distances = np.linalg.norm(queries[:, np.newaxis, :] - points[np.newaxis, :, :], axis=2)
+    return set(zip(*(indices.tolist() for indices in np.nonzero(distances < radius))))
+
+
+def _get_point_sets() -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    line = np.linspace(0, 1, 50)
+    return {
+        "uniform": rng.uniform(0, 1, (300, 3)),
+        "clustered": np.concatenate((rng.normal(0, 0.01, (150, 3)), rng.normal(1, 0.01, (150, 3)))),
+        # nearly collinear and coplanar points, which make the estimated cells tiny
+        "collinear": np.column_stack((line, 1e-7 * line, 1e-9 * line)),
+        "coplanar": np.column_stack((rng.uniform(0, 1, (100, 2)), 1e-9 * rng.uniform(0, 1, 100))),
+        "two_points": np.array([[0.0, 0.0, 0.0], [1.0, 1e-7, 1e-7]]),
+        "duplicates": np.zeros((20, 3)),
+        "single": np.array([[0.3, 0.2, 0.1]]),
+    }
+
+
+def test_query_nearest():
+    rng = np.random.default_rng(1)
+    for name, points in _get_point_sets().items():
+        queries = np.concatenate((rng.uniform(-0.5, 1.5, (200, 3)), points[:10]))
+        distances, indices = UniformGridIndex(points).query_nearest(queries)
+
+        expected = np.linalg.norm(queries[:, np.newaxis, :] - points[np.newaxis, :, :], axis=2)
+        assert np.allclose(distances, expected.min(axis=1)), name
+        assert np.allclose(expected[np.arange(len(queries)), indices], distances), name
+
+
+def test_query_radius():
+    rng = np.random.default_rng(2)
+    for name, points in _get_point_sets().items():
+        queries = np.concatenate((rng.uniform(-0.5, 1.5, (200, 3)), points[:10]))
+        for cell_size in (None, 0.05, 1e-6):
+            index = UniformGridIndex(points, cell_size=cell_size)
+            for radius in (0.01, 0.1, 0.5):
+                query_ids, point_ids = index.query_radius(queries, radius)
+                pairs = set(zip(query_ids.tolist(), point_ids.tolist()))
+                assert len(pairs) == len(query_ids), (name, cell_size, radius)
+                assert pairs == _get_pairs_brute_force(queries, points, radius), (
+                    name,
+                    cell_size,
+                    radius,
+                )
+
+
+def test_query_pairs():
+    for name, points in _get_point_sets().items():
+        i, j = UniformGridIndex(points).query_pairs(0.05)
+        expected = {(a, b) for a, b in _get_pairs_brute_force(points, points, 0.05) if a < b}
+        assert set(zip(i.tolist(), j.tolist())) == expected, name
+
+
+def test_grid_keys():
+    # points far apart with a tiny cell keep the grid keys within int64
+    points = np.array([[0.0, 0.0, 0.0], [1e9, 1e9, 1e9], [1e9, 0.0, 1.0]])
+    index = UniformGridIndex(points, cell_size=1e-9)
+    distances, indices = index.query_nearest(points)
+    assert np.array_equal(indices, [0, 1, 2])
+    assert np.all(distances == 0)
@@ -0,0 +1,41 @@
+import cv2 as cv
+import numpy as np
+
+from config.electrode_detector import DogParameters
+from utils.texture import (
+    compute_difference_of_gaussians,
+    compute_dog_kernel,
+    compute_separable_difference_of_gaussians,
+    rgb2gray,
+)
+
+
+def _create_image(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (160, 200, 3), dtype=np.uint8)
+    return cv.GaussianBlur(image, (7, 7), 0)
+
+
+def test_auto_method():
+    image = _create_image()
+    for ksize in range(3, 41, 2):
+        sigma = ksize / 2.4
+        separable = DogParameters.SEPARABLE_MIN_KSIZE <= ksize <= DogParameters.SEPARABLE_MAX_KSIZE
+        expected = compute_difference_of_gaussians(
+            image, ksize, sigma, 1.1, 1, method="separable" if separable else "filter2d"
+        )
+        assert np.array_equal(
+            compute_difference_of_gaussians(image, ksize, sigma, 1.1, 1, method="auto"), expected
+        ), ksize
+
+
+def test_separable_matches_filter2d():
+    gray = rgb2gray(_create_image(seed=1))
+    for ksize in range(3, 41, 2):
+        sigma = ksize / 2.4
+        dog = cv.filter2D(src=gray, ddepth=-1, kernel=compute_dog_kernel(ksize, sigma, 1.1))
+        separable_dog = compute_separable_difference_of_gaussians(gray, ksize, sigma, 1.1)
+        # rounding differs by at most one gray level on a few pixels
+        difference = np.abs(dog.astype(np.int64) - separable_dog)
+        assert difference.max() <= 1, ksize
+        assert np.count_nonzero(difference) <= 1e-3 * difference.size, ksize
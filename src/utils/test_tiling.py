@@ -0,0 +1,151 @@
+import cv2 as cv
+import numpy as np
+
+from config.electrode_detector import TilingParameters
+from utils.texture import compute_difference_of_gaussians
+from utils.tiling import (
+    compute_tiled_hough_circles,
+    get_texture_shape,
+    is_tiled_texture,
+    iter_tiles,
+    merge_seam_circles,
+    open_texture_memmap,
+)
+
+IMAGE_SHAPE = (230, 310, 3)
+
+
+def _create_marker_image(seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    # single red pixels on a noisy background, and their (x, y) positions
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 200, IMAGE_SHAPE, dtype=np.uint8)
+    markers = np.unique(rng.integers(0, [IMAGE_SHAPE[1], IMAGE_SHAPE[0]], (80, 2)), axis=0)
+    image[markers[:, 1], markers[:, 0]] = (0, 0, 255)
+    return image, markers
+
+
+def _detect_markers(tile_image: np.ndarray) -> np.ndarray | None:
+    ys, xs = np.nonzero(np.all(tile_image == (0, 0, 255), axis=2))
+    if len(xs) == 0:
+        return None
+    return np.column_stack((xs, ys, np.ones(len(xs)))).astype(np.float32)[np.newaxis]
+
+
+def _sort_centers(circles: np.ndarray) -> np.ndarray:
+    centers = np.asarray(circles[0, :, 0:2], dtype=np.int64)
+    return centers[np.lexsort((centers[:, 1], centers[:, 0]))]
+
+
+def test_iter_tiles():
+    coverage = np.zeros(IMAGE_SHAPE[0:2], dtype=np.int64)
+    for core, padded in iter_tiles(IMAGE_SHAPE, tile_size=64, halo=7):
+        coverage[core] += 1
+        for core_slice, padded_slice, size in zip(core, padded, IMAGE_SHAPE):
+            assert padded_slice.start == max(core_slice.start - 7, 0)
+            assert padded_slice.stop == min(core_slice.stop + 7, size)
+    # the cores partition the image
+    assert np.all(coverage == 1)
+
+
+def test_tile_dog_matches_image_dog():
+    image, _ = _create_marker_image()
+    ksize, sigma, F, threshold_level = 9, 2.0, 1.5, 1
+    dog = compute_difference_of_gaussians(image, ksize, sigma, F, threshold_level)
+    for core, padded in iter_tiles(IMAGE_SHAPE, tile_size=64, halo=ksize // 2):
+        tile_dog = compute_difference_of_gaussians(image[padded], ksize, sigma, F, threshold_level)
+        offset = (core[0].start - padded[0].start, core[1].start - padded[1].start)
+        tile_core = (
+            slice(offset[0], offset[0] + core[0].stop - core[0].start),
+            slice(offset[1], offset[1] + core[1].stop - core[1].start),
+        )
+        assert np.array_equal(tile_dog[tile_core], dog[core])
+
+
+def _compute_tiled_markers(image: np.ndarray, tile_size: int, **kwargs) -> np.ndarray | None:
+    return compute_tiled_hough_circles(
+        image,
+        ksize=3,
+        sigma=1.0,
+        F=1.5,
+        threshold_level=1,
+        param1=1.0,
+        param2=1.0,
+        min_distance_between_circles=1,
+        min_radius=1,
+        max_radius=1,
+        tile_size=tile_size,
+        detect_circles=_detect_markers,
+        halo=3,
+        **kwargs,
+    )
+
+
+def test_compute_tiled_hough_circles():
+    image, markers = _create_marker_image(seed=1)
+    expected = markers[np.lexsort((markers[:, 1], markers[:, 0]))]
+    for tile_size in (17, 64, 1000):
+        circles = _compute_tiled_markers(image, tile_size)
+        # every marker is found once, by the tile its center falls into
+        assert np.array_equal(_sort_centers(circles), expected)
+
+
+def test_compute_tiled_hough_circles_roi():
+    image, markers = _create_marker_image(seed=2)
+    roi_mask = np.zeros(IMAGE_SHAPE[0:2], dtype=bool)
+    roi_mask[40:150, 100:250] = True
+    requested = []
+
+    def get_roi_mask(core: tuple[slice, slice]) -> np.ndarray:
+        requested.append(core)
+        return roi_mask[core]
+
+    circles = _compute_tiled_markers(image, 32, get_roi_mask=get_roi_mask)
+    inside = markers[roi_mask[markers[:, 1], markers[:, 0]]]
+    assert np.array_equal(_sort_centers(circles), inside[np.lexsort((inside[:, 1], inside[:, 0]))])
+    # masks are requested tile by tile
+    assert len(requested) == len(iter_tiles(IMAGE_SHAPE, 32, 3))
+
+
+def test_merge_seam_circles():
+    rng = np.random.default_rng(3)
+    tile_circles = [
+        np.column_stack((rng.uniform(0, 40, (n, 2)), np.ones(n))) for n in (15, 0, 20, 12)
+    ]
+    min_distance = 5.0
+    merged = merge_seam_circles(tile_circles, min_distance)
+
+    # brute force: walk the circles in tile order, dropping those too close to a kept
+    # circle of an earlier tile
+    kept = []
+    for tile, circles in enumerate(tile_circles):
+        for circle in circles:
+            if all(
+                other_tile == tile or np.linalg.norm(circle[0:2] - other[0:2]) >= min_distance
+                for other_tile, other in kept
+            ):
+                kept.append((tile, circle))
+    assert np.array_equal(merged, np.array([circle for _, circle in kept]))
+
+
+def test_open_texture_memmap(tmp_path, monkeypatch):
+    image, _ = _create_marker_image(seed=4)
+    texture_file = str(tmp_path / "texture.png")
+    cv.imwrite(texture_file, image)
+    cache_dir = str(tmp_path / "cache")
+
+    assert get_texture_shape(texture_file) == IMAGE_SHAPE[0:2]
+    monkeypatch.setattr(TilingParameters, "MIN_PIXELS", IMAGE_SHAPE[0] * IMAGE_SHAPE[1] - 1)
+    assert is_tiled_texture(texture_file)
+    assert not is_tiled_texture(texture_file, tiled=False)
+
+    # written in strips smaller than the image
+    monkeypatch.setattr(TilingParameters, "TILE_SIZE", 64)
+    memmap = open_texture_memmap(texture_file, cache_dir)
+    assert isinstance(memmap, np.memmap)
+    assert np.array_equal(memmap, image)
+
+    # later calls map the decoded file
+    cache_files = list((tmp_path / "cache").iterdir())
+    assert len(cache_files) == 1
+    assert np.array_equal(open_texture_memmap(texture_file, cache_dir), image)
+    assert list((tmp_path / "cache").iterdir()) == cache_files
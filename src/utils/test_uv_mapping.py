@@ -0,0 +1,95 @@
+import numpy as np
+
+from utils.uv_mapping import (
+    compute_barycentric_weights,
+    map_pixels_to_surface,
+    map_pixels_to_surface_by_tiles,
+    pixels_to_uv,
+    rasterize_uv_faces,
+)
+
+IMAGE_SHAPE = (97, 131)
+
+
+def _create_uv_grid(size: int = 9, seed: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # a jittered grid of non-overlapping triangles covering part of the texture
+    rng = np.random.default_rng(seed)
+    u, v = np.meshgrid(np.linspace(0.1, 0.9, size), np.linspace(0.05, 0.8, size))
+    uv = np.column_stack((u.ravel(), v.ravel()))
+    uv += rng.uniform(-0.2, 0.2, uv.shape) * 0.8 / (size - 1)
+
+    corners = np.arange(size * size).reshape(size, size)[:-1, :-1].ravel()
+    faces = np.concatenate(
+        (
+            np.column_stack((corners, corners + 1, corners + size + 1)),
+            np.column_stack((corners, corners + size + 1, corners + size)),
+        )
+    )
+    vertices = np.column_stack((uv * [2.0, 3.0], uv[:, 0] * uv[:, 1]))
+    return uv, faces, vertices
+
+
+def _get_texel_weights(uv: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    # barycentric weights of every texel center in every triangle, brute force
+    height, width = IMAGE_SHAPE
+    ys, xs = np.mgrid[0:height, 0:width]
+    texels = pixels_to_uv(np.column_stack((xs.ravel(), ys.ravel())), IMAGE_SHAPE)
+    weights = np.empty((len(faces), len(texels), 3))
+    for face, (a, b, c) in enumerate(faces):
+        repeated = np.repeat(uv[[a, b, c]][np.newaxis], len(texels), axis=0)
+        weights[face] = compute_barycentric_weights(
+            texels, repeated[:, 0], repeated[:, 1], repeated[:, 2]
+        )
+    return weights
+
+
+def test_rasterize_uv_faces():
+    uv, faces, _ = _create_uv_grid()
+    face_index_map = rasterize_uv_faces(uv, faces, IMAGE_SHAPE).ravel()
+    min_weights = _get_texel_weights(uv, faces).min(axis=2)
+
+    # every covered texel lies in its triangle, every texel well inside a triangle is covered
+    covered = np.flatnonzero(face_index_map >= 0)
+    assert np.all(min_weights[face_index_map[covered], covered] > -1e-6)
+    inside = np.any(min_weights > 1e-6, axis=0)
+    assert np.all(face_index_map[inside] >= 0)
+    assert np.all(face_index_map[~np.any(min_weights > -1e-6, axis=0)] == -1)
+
+
+def test_rasterize_uv_faces_region():
+    uv, faces, _ = _create_uv_grid(seed=1)
+    face_index_map = rasterize_uv_faces(uv, faces, IMAGE_SHAPE)
+    for region in (
+        (slice(0, 40), slice(0, 50)),
+        (slice(37, 97), slice(64, 131)),
+        (slice(90, 97), slice(0, 131)),
+    ):
+        # small chunks split the triangles of the region over many passes
+        for chunk_pixels in (1, 64, 2**22):
+            assert np.array_equal(
+                rasterize_uv_faces(uv, faces, IMAGE_SHAPE, chunk_pixels, region=region),
+                face_index_map[region],
+            )
+
+
+def test_map_pixels_to_surface():
+    uv, faces, vertices = _create_uv_grid(seed=2)
+    face_index_map = rasterize_uv_faces(uv, faces, IMAGE_SHAPE)
+
+    rng = np.random.default_rng(3)
+    pixels = rng.integers(0, [IMAGE_SHAPE[1], IMAGE_SHAPE[0]], (500, 2)).astype(np.float64)
+    points, found = map_pixels_to_surface(pixels, face_index_map, uv, faces, vertices)
+    xs, ys = pixels.astype(np.int64).T
+    assert np.array_equal(found, face_index_map[ys, xs] >= 0)
+    assert np.all(np.isnan(points[~found]))
+
+    # the surface is linear in UV inside every triangle
+    pixel_uv = pixels_to_uv(pixels[found], IMAGE_SHAPE)
+    assert np.allclose(points[found, 0:2], pixel_uv * [2.0, 3.0])
+
+    for tile_size in (16, 50, 1000):
+        tiled_points, tiled_found = map_pixels_to_surface_by_tiles(
+            pixels, IMAGE_SHAPE, uv, faces, vertices, tile_size
+        )
+        assert np.array_equal(tiled_found, found)
+        assert np.allclose(tiled_points[found], points[found])
@@ -2,6 +2,7 @@ import cv2 as cv
 import numpy as np
 
 from config.colors import HOUGH_CIRCLES_COLOR
+from config.electrode_detector import BlobParameters, DogParameters
 
 # Hough circle detection functions
 def compute_hough_circles(color_image, dog_image,
@@ -11,11 +12,16 @@ def compute_hough_circles(color_image, dog_image,
                           rgb_circles_color: tuple[int, int, int] = HOUGH_CIRCLES_COLOR) -> tuple[np.ndarray, list[np.uint16] | None]:
     """Compute circles on the difference of gaussians (DoG) image using Hough circle detection."""    
     
-    circles = cv.HoughCircles(dog_image,
-                                cv.HOUGH_GRADIENT, 1, minDist=min_distance_between_circles,
-                                param1=param1, param2=param2,
-                                minRadius=min_radius, maxRadius=max_radius)
+    circles = detect_hough_circles(dog_image, param1, param2,
+                                   min_distance_between_circles,
+                                   min_radius, max_radius)
+            
+    return draw_circles(color_image, circles, rgb_circles_color)
 
+def draw_circles(color_image, circles: np.ndarray | None,
+                 rgb_circles_color: tuple[int, int, int] = HOUGH_CIRCLES_COLOR) -> tuple[np.ndarray, list[np.uint16] | None]:
+    """Draw filled circles onto a copy of the color image; returns it with the rounded circles."""
+    
     circles_image = color_image.copy()
     if circles is not None:
         circles = np.uint16(np.around(circles))                                  # type: ignore
@@ -26,18 +32,88 @@ def compute_hough_circles(color_image, dog_image,
             
     return (circles_image, circles)                                              # type: ignore
 
+def detect_hough_circles(dog_image: np.ndarray,
+                         param1: float, param2: float,
+                         min_distance_between_circles: int,
+                         min_radius: int, max_radius: int) -> np.ndarray | None:
+    """Detect circles on the DoG image; returns the (1, N, 3) OpenCV circles array or None."""
+    
+    return cv.HoughCircles(dog_image,
+                           cv.HOUGH_GRADIENT, 1, minDist=min_distance_between_circles,
+                           param1=param1, param2=param2,
+                           minRadius=min_radius, maxRadius=max_radius)
+
+# Connected component (blob) detection functions
+def detect_blob_circles(dog_image: np.ndarray,
+                        min_radius: float, max_radius: float,
+                        min_circularity: float = BlobParameters.MIN_CIRCULARITY) -> np.ndarray | None:
+    """Detect round blobs in the binary DoG image; returns (1, N, 3) circles like cv.HoughCircles.
+    
+    Every connected component of non-zero pixels is labeled in one pass, and components are
+    kept by the radius of the disc of equal area and by how well they fill the disc spanning
+    their bounding box (1 for a disc, lower for elongated or ragged blobs)."""
+    
+    _, _, stats, centroids = cv.connectedComponentsWithStatsWithAlgorithm(
+        dog_image, 8, cv.CV_32S, cv.CCL_GRANA)
+    
+    # label 0 is the background
+    areas = stats[1:, cv.CC_STAT_AREA].astype(np.float64)
+    extents = np.maximum(stats[1:, cv.CC_STAT_WIDTH], stats[1:, cv.CC_STAT_HEIGHT])
+    
+    radii = np.sqrt(areas / np.pi)
+    circularity = areas / (np.pi / 4 * extents.astype(np.float64)**2)
+    
+    keep = (radii >= min_radius) & (radii <= max_radius) & (circularity >= min_circularity)
+    if not np.any(keep):
+        return None
+    
+    circles = np.column_stack((centroids[1:][keep], radii[keep])).astype(np.float32)
+    return circles[np.newaxis, :, :]
+
 # Difference of Gaussians (DoG) texture processing functions
 def compute_difference_of_gaussians(image: np.ndarray,
                                     ksize: int, sigma: float, F: float,
-                                    threshold_level: int) -> np.ndarray:
-    """Compute difference of gaussians (DoG) image."""
+                                    threshold_level: int,
+                                    method: str = DogParameters.METHOD) -> np.ndarray:
+    """Compute difference of gaussians (DoG) image.
+    
+    method selects the filtering strategy: "filter2d" applies the dense 2D DoG kernel
+    (OpenCV uses direct convolution for tiny and DFT-based convolution for large kernels),
+    "separable" subtracts two separable gaussian passes and "auto" picks the one measured
+    faster for ksize (see DogParameters). "filter2d" reproduces the original implementation
+    bit for bit; "separable", and hence "auto", is only approximately equal to it, as the
+    two round differently and may differ by one gray level on a few pixels."""
+    
+    if method == "auto":
+        separable = DogParameters.SEPARABLE_MIN_KSIZE <= ksize <= DogParameters.SEPARABLE_MAX_KSIZE
+        method = "separable" if separable else "filter2d"
     
-    dog_kernel = compute_dog_kernel(ksize, sigma, F)
     gray = rgb2gray(image)
-    dog = cv.filter2D(src=gray, ddepth=-1, kernel=dog_kernel)
+    match method:
+        case "filter2d":
+            dog_kernel = compute_dog_kernel(ksize, sigma, F)
+            dog = cv.filter2D(src=gray, ddepth=-1, kernel=dog_kernel)
+        case "separable":
+            dog = compute_separable_difference_of_gaussians(gray, ksize, sigma, F)
+        case _:
+            raise ValueError(f"Unknown DoG filtering method: {method}")
     
     return gray2binary(dog, threshold_level)
 
+def compute_separable_difference_of_gaussians(gray: np.ndarray,
+                                              ksize: int, sigma: float,
+                                              F: float) -> np.ndarray:
+    """Compute DoG of a grayscale image as the difference of two separable gaussian passes."""
+    
+    k1_1d = cv.getGaussianKernel(ksize, sigma)
+    k2_1d = cv.getGaussianKernel(ksize, sigma*F)
+    
+    blurred_1 = cv.sepFilter2D(gray, cv.CV_32F, k1_1d, k1_1d)
+    blurred_2 = cv.sepFilter2D(gray, cv.CV_32F, k2_1d, k2_1d)
+    
+    # saturating, rounding conversion back to 8 bits as in cv.filter2D
+    return cv.subtract(blurred_2, blurred_1, dtype=cv.CV_8U)
+
 def compute_dog_kernel(ksize: int, sigma: float, F: float) -> np.ndarray:
     """Compute difference of gaussians (DoG) kernel."""
     
@@ -52,6 +128,53 @@ def compute_dog_kernel(ksize: int, sigma: float, F: float) -> np.ndarray:
     # calculate difference of gaussians
     return k2 - k1
 
+# Image pyramid functions
+def compute_pyramid_level(image: np.ndarray, level: int) -> np.ndarray:
+    """Downsample image by a factor of 2**level with gaussian pyramid reduction."""
+    
+    for _ in range(level):
+        image = cv.pyrDown(image)
+    return image
+
+def select_pyramid_level(image_shape: tuple[int, ...],
+                         target_size: tuple[int, int],
+                         min_radius: int, min_level_radius: float) -> int:
+    """Select the coarsest pyramid level that still covers target_size (width, height)
+    when fitted with kept aspect ratio, without shrinking min_radius below min_level_radius."""
+    
+    height, width = image_shape[0:2]
+    target_width, target_height = target_size
+    if target_width <= 0 or target_height <= 0:
+        return 0
+    
+    fitted_scale = min(target_width / width, target_height / height, 1.0)
+    level = int(np.floor(np.log2(1 / fitted_scale)))
+    
+    if min_radius > min_level_radius:
+        level = min(level, int(np.floor(np.log2(min_radius / min_level_radius))))
+    else:
+        level = 0
+    
+    return max(level, 0)
+
+def scale_dog_parameters(ksize: int, sigma: float, scale: float) -> tuple[int, float]:
+    """Rescale DoG kernel size (kept odd) and sigma to an image resized by scale."""
+    
+    scaled_ksize = max(3, int(round(ksize * scale)) | 1)
+    return scaled_ksize, sigma * scale
+
+def scale_hough_parameters(min_distance_between_circles: int,
+                           min_radius: int, max_radius: int,
+                           scale: float) -> tuple[int, int, int]:
+    """Rescale Hough circle distance and radii to an image resized by scale.
+    
+    The Canny (param1) and accumulator (param2) thresholds are left unchanged."""
+    
+    scaled_min_distance = max(1, int(round(min_distance_between_circles * scale)))
+    scaled_min_radius = max(1, int(np.floor(min_radius * scale)))
+    scaled_max_radius = max(scaled_min_radius, int(np.ceil(max_radius * scale)))
+    return scaled_min_distance, scaled_min_radius, scaled_max_radius
+
 # Color conversion functions
 def rgb2gray(rgb_image: np.ndarray) -> np.ndarray:
     """Convert RGB image to grayscale."""
@@ -61,6 +184,13 @@ def rgb2gray(rgb_image: np.ndarray) -> np.ndarray:
 def gray2binary(image: np.ndarray, level: int) -> np.ndarray:
     """Convert grayscale image to binary image."""
     
+    if image.dtype == np.uint8 and float(level).is_integer() and 0 <= level <= 255:
+        # single lookup table pass; pixels equal to level are kept as they are
+        table = np.full(256, 255, dtype=np.uint8)
+        table[:int(level)] = 0
+        table[int(level)] = level
+        return cv.LUT(image, table, dst=image)
+    
     image[image < level] = 0
     image[image > level] = 255
     return image
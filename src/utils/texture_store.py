@@ -0,0 +1,112 @@
+import os
+import threading
+
+import cv2 as cv
+import numpy as np
+from vedo.utils import numpy2vtk
+
+from utils.cache import LRUCache
+
+from config.electrode_detector import CacheParameters
+
+try:
+    import vedo.vtkclasses as vtk
+except ImportError:
+    import vtkmodules.all as vtk
+
+
+class TextureStore:
+    """
+    Process-wide store of decoded texture images, keyed by file path.
+
+    A texture file is decoded once and handed out as a read-only view of the same pixel
+    buffer to every OpenCV consumer. The VTK texture built from it is kept as well, so
+    re-texturing a mesh reuses the same texture object instead of reading the file again.
+    Entries are invalidated when the file size or modification time changes.
+
+    The store is bounded by the bytes of its decoded and VTK pixel buffers; the least
+    recently used textures are dropped beyond `max_bytes`, and a texture is dropped right
+    away when its user replaces it. Views handed out before stay valid.
+    """
+
+    def __init__(self, max_bytes: int = CacheParameters.TEXTURE_MAX_BYTES):
+        self._entries = LRUCache(max_bytes)
+        self._lock = threading.Lock()
+
+    def get_image(self, texture_file: str) -> np.ndarray | None:
+        """Returns the decoded BGR image (OpenCV layout) as a read-only view."""
+        entry = self._get_entry(texture_file)
+        if entry is None:
+            return None
+        return entry["image"].view()
+
+    def get_vtk_texture(self, texture_file: str):
+        """Returns the vtkTexture of the texture file."""
+        entry = self._get_entry(texture_file)
+        if entry is None:
+            return None
+
+        with self._lock:
+            if entry["vtk_texture"] is None:
+                entry["vtk_texture"], entry["vtk_pixels"] = _create_vtk_texture(entry["image"])
+                # account for the VTK copy, unless the entry was dropped meanwhile
+                path = os.path.abspath(texture_file)
+                if self._entries.get(path) is entry:
+                    self._entries.put(path, entry)
+            return entry["vtk_texture"]
+
+    def release(self, texture_file: str | None) -> None:
+        """Drops the texture of a file, e.g. once it is replaced by another one."""
+        if texture_file is None:
+            return
+        with self._lock:
+            self._entries.pop(os.path.abspath(texture_file))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get_entry(self, texture_file: str) -> dict | None:
+        path = os.path.abspath(texture_file)
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry["version"] != version:
+                image = cv.imread(path)
+                if image is None:
+                    return None
+                image.flags.writeable = False
+                entry = {"version": version, "image": image, "vtk_texture": None}
+                # textures larger than the store are handed out without being kept
+                self._entries.put(path, entry)
+            return entry
+
+
+def _create_vtk_texture(image: np.ndarray) -> tuple:
+    # VTK expects RGB rows starting at the bottom of the image, so the BGR rows of the
+    # decoded image are flipped and reordered once, in a single pass. vtkTexture has no
+    # channel swizzle and OpenCV copies arrays with negative strides, so no single buffer
+    # serves both without a copy on one side; the copy is made once per texture here.
+    height, width = image.shape[0:2]
+    channels = image.shape[2] if image.ndim == 3 else 1
+    pixels = np.ascontiguousarray(image[::-1, :, ::-1] if channels > 1 else image[::-1])
+
+    scalars = numpy2vtk(pixels.reshape(-1, channels), dtype=np.uint8, deep=False)
+    scalars.SetName("TextureScalars")
+
+    image_data = vtk.vtkImageData()
+    image_data.SetDimensions(width, height, 1)
+    image_data.GetPointData().SetScalars(scalars)
+    # the VTK array does not own the buffer; keep the numpy array alive with the image
+    image_data._pixels = pixels
+
+    texture = vtk.vtkTexture()
+    texture.SetInputData(image_data)
+    texture._image_data = image_data
+    return texture, pixels
+
+
+# the texture store shared by the whole process
+texture_store = TextureStore()
@@ -0,0 +1,212 @@
+import hashlib
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2 as cv
+import numpy as np
+from vtkmodules.vtkIOImage import vtkImageReader2Factory
+
+from utils.spatial_index import UniformGridIndex
+from utils.texture import compute_difference_of_gaussians, detect_hough_circles
+
+from config.electrode_detector import TilingParameters
+
+
+def iter_tiles(
+    image_shape: tuple[int, ...], tile_size: int, halo: int
+) -> list[tuple[tuple[slice, slice], tuple[slice, slice]]]:
+    """
+    Splits an image into square tiles.
+
+    Returns (core, padded) pairs of (row, column) slices; the core regions partition the
+    image and every padded region extends its core by `halo` pixels, clipped to the image.
+    """
+    height, width = image_shape[0:2]
+    tiles = []
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            y1, x1 = min(y0 + tile_size, height), min(x0 + tile_size, width)
+            core = (slice(y0, y1), slice(x0, x1))
+            padded = (
+                slice(max(y0 - halo, 0), min(y1 + halo, height)),
+                slice(max(x0 - halo, 0), min(x1 + halo, width)),
+            )
+            tiles.append((core, padded))
+    return tiles
+
+
+def compute_tiled_hough_circles(
+    image: np.ndarray,
+    ksize: int,
+    sigma: float,
+    F: float,
+    threshold_level: int,
+    param1: float,
+    param2: float,
+    min_distance_between_circles: int,
+    min_radius: int,
+    max_radius: int,
+    tile_size: int = TilingParameters.TILE_SIZE,
+    max_workers: int | None = TilingParameters.MAX_WORKERS,
+    detect_circles: Callable[[np.ndarray], np.ndarray | None] | None = None,
+    halo: int | None = None,
+    get_roi_mask: Callable[[tuple[slice, slice]], np.ndarray] | None = None,
+) -> np.ndarray | None:
+    """
+    Detects DoG/Hough circles tile by tile, so that only the tiles being processed are
+    held in memory in full.
+
+    The halo covers the DoG kernel radius, which makes the DoG of every tile core identical
+    to the DoG of the whole image, plus the largest circle radius, so that circles centered
+    in a core are seen whole. Every circle is kept by the tile its center falls into, and
+    circles closer than the minimum distance across tile seams are merged. Returns the
+    circles in the (1, N, 3) layout of cv.HoughCircles, or None when there are none.
+
+    Other circle detectors can be run on the same tiles by passing `detect_circles`, which
+    maps a color tile to its circles, together with the `halo` it needs. With
+    `get_roi_mask`, which returns the region of interest mask of a tile core, only the tiles
+    whose core overlaps the region are processed and only circles centered in it are kept;
+    the masks are computed tile by tile as well.
+    """
+    if halo is None:
+        halo = ksize // 2 + max_radius
+
+    def detect_dog_hough_circles(tile_image: np.ndarray) -> np.ndarray | None:
+        dog = compute_difference_of_gaussians(tile_image, ksize, sigma, F, threshold_level)
+        return detect_hough_circles(
+            dog, param1, param2, min_distance_between_circles, min_radius, max_radius
+        )
+
+    if detect_circles is None:
+        detect_circles = detect_dog_hough_circles
+
+    def process_tile(tile: tuple[tuple[slice, slice], tuple[slice, slice]]) -> np.ndarray:
+        core, padded = tile
+        roi_mask = None if get_roi_mask is None else get_roi_mask(core)
+        if roi_mask is not None and not roi_mask.any():
+            return np.empty((0, 3), dtype=np.float32)
+
+        circles = detect_circles(np.ascontiguousarray(image[padded]))
+        if circles is None:
+            return np.empty((0, 3), dtype=np.float32)
+
+        circles = circles[0].copy()
+        circles[:, 0] += padded[1].start
+        circles[:, 1] += padded[0].start
+
+        # keep the circles centered in the core of this tile
+        inside = (
+            (circles[:, 0] >= core[1].start)
+            & (circles[:, 0] < core[1].stop)
+            & (circles[:, 1] >= core[0].start)
+            & (circles[:, 1] < core[0].stop)
+        )
+        circles = circles[inside]
+
+        if roi_mask is not None:
+            rows = np.clip(np.rint(circles[:, 1]) - core[0].start, 0, roi_mask.shape[0] - 1)
+            columns = np.clip(np.rint(circles[:, 0]) - core[1].start, 0, roi_mask.shape[1] - 1)
+            circles = circles[roi_mask[rows.astype(np.int64), columns.astype(np.int64)]]
+        return circles
+
+    tiles = iter_tiles(image.shape, tile_size, halo)
+
+    # threads suffice, OpenCV releases the GIL while filtering
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tile_circles = list(executor.map(process_tile, tiles))
+
+    circles = merge_seam_circles(tile_circles, min_distance_between_circles)
+    if len(circles) == 0:
+        return None
+
+    return circles[np.newaxis, :, :]
+
+
+def merge_seam_circles(tile_circles: list[np.ndarray], min_distance: float) -> np.ndarray:
+    """
+    Concatenates the circles of all tiles and drops circles closer than `min_distance` to a
+    circle of an earlier tile, mirroring the minimum distance rule of cv.HoughCircles.
+    """
+    tile_ids = np.repeat(np.arange(len(tile_circles)), [len(c) for c in tile_circles])
+    circles = np.concatenate(tile_circles) if len(tile_circles) > 0 else np.empty((0, 3))
+    if len(circles) < 2:
+        return circles
+
+    i, j = UniformGridIndex(circles[:, 0:2], cell_size=min_distance).query_pairs(min_distance)
+    seam = tile_ids[i] != tile_ids[j]
+    i, j = i[seam], j[seam]
+
+    # walk the seam pairs in tile order; a circle is dropped only by a circle still kept
+    order = np.lexsort((i, j))
+    keep = np.ones(len(circles), dtype=bool)
+    for first, second in zip(i[order], j[order]):
+        if keep[first]:
+            keep[second] = False
+
+    return circles[keep]
+
+
+def get_texture_shape(texture_file: str) -> tuple[int, int] | None:
+    """Returns the (height, width) of an image file from its header, without decoding it."""
+    reader = vtkImageReader2Factory.CreateImageReader2(texture_file)
+    if reader is None:
+        return None
+    reader.SetFileName(texture_file)
+    reader.UpdateInformation()
+    x0, x1, y0, y1, _, _ = reader.GetDataExtent()
+    return y1 - y0 + 1, x1 - x0 + 1
+
+
+def is_tiled_texture(texture_file: str, tiled: bool | None = None) -> bool:
+    """
+    Returns whether a texture is detected on tiles of a memory map; None decides by the
+    texture size, without decoding it.
+    """
+    if tiled is not None:
+        return tiled
+    shape = get_texture_shape(texture_file)
+    return shape is not None and shape[0] * shape[1] > TilingParameters.MIN_PIXELS
+
+
+def get_texture_memmap_file(texture_file: str, cache_dir: str = TilingParameters.CACHE_DIR) -> Path:
+    """Returns the .npy file of a decoded texture, keyed by its path, size and mtime."""
+    stat = os.stat(texture_file)
+    key = f"{os.path.abspath(texture_file)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return Path(cache_dir) / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.npy"
+
+
+def open_texture_memmap(
+    texture_file: str, cache_dir: str = TilingParameters.CACHE_DIR
+) -> np.ndarray | None:
+    """
+    Returns the decoded texture as a read-only memory map.
+
+    The texture is decoded once into an uncompressed .npy file in `cache_dir`; later calls
+    map that file directly. The decoded image only lives while it is copied into the file,
+    strip by strip, and is neither returned nor kept.
+    """
+    cache_file = get_texture_memmap_file(texture_file, cache_dir)
+
+    if not cache_file.exists():
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        image = cv.imread(texture_file)
+        if image is None:
+            return None
+
+        # write to a temporary name so that an interrupted write never leaves a partial cache
+        partial_file = cache_file.with_suffix(f".{os.getpid()}.partial")
+        memmap = np.lib.format.open_memmap(
+            str(partial_file), mode="w+", dtype=image.dtype, shape=image.shape
+        )
+        for start in range(0, image.shape[0], TilingParameters.TILE_SIZE):
+            memmap[start : start + TilingParameters.TILE_SIZE] = image[
+                start : start + TilingParameters.TILE_SIZE
+            ]
+            # written strips are handed to the page cache instead of staying dirty in memory
+            memmap.flush()
+        del memmap, image
+        os.replace(partial_file, cache_file)
+
+    return np.load(cache_file, mmap_mode="r")
@@ -0,0 +1,275 @@
+import numpy as np
+import vedo as vd
+from vedo.utils import vtk2numpy
+
+from config.electrode_detector import UVMappingParameters
+
+
+def get_uv_coordinates(mesh: vd.Mesh) -> np.ndarray:
+    """Returns the per-vertex UV (texture) coordinates of the mesh."""
+    if "material_0" in mesh.pointdata.keys():
+        return np.asarray(mesh.pointdata["material_0"])
+    elif "TCoords" in mesh.pointdata.keys():
+        return np.asarray(mesh.pointdata["TCoords"])
+    else:
+        raise Exception("No UV coordinates found in mesh.")
+
+
+def get_triangle_faces(mesh: vd.Mesh) -> np.ndarray:
+    """Returns the (F, 3) vertex indices of the mesh triangles."""
+    polys = mesh.inputdata().GetPolys()
+    offsets = vtk2numpy(polys.GetOffsetsArray())
+    if len(offsets) > 1 and np.all(np.diff(offsets) == 3):
+        return vtk2numpy(polys.GetConnectivityArray()).reshape(-1, 3).astype(np.int64)
+
+    # triangulation keeps the points (and therefore the UV coordinates) unchanged
+    return np.asarray(mesh.clone().triangulate().faces(), dtype=np.int64)
+
+
+def pixels_to_uv(pixels: np.ndarray, image_shape: tuple[int, ...]) -> np.ndarray:
+    """Converts (x, y) pixel coordinates to UV coordinates of the pixel centers."""
+    height, width = image_shape[0:2]
+    pixels = np.asarray(pixels, dtype=np.float64)
+    return np.column_stack(
+        (
+            (pixels[:, 0] + 0.5) / width,
+            1 - (pixels[:, 1] + 0.5) / height,
+        )
+    )
+
+
+def compute_barycentric_weights(
+    points: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray
+) -> np.ndarray:
+    """Computes the barycentric weights of 2D points with respect to triangles (a, b, c)."""
+    v0 = b - a
+    v1 = c - a
+    v2 = points - a
+
+    d00 = np.einsum("ij,ij->i", v0, v0)
+    d01 = np.einsum("ij,ij->i", v0, v1)
+    d11 = np.einsum("ij,ij->i", v1, v1)
+    d20 = np.einsum("ij,ij->i", v2, v0)
+    d21 = np.einsum("ij,ij->i", v2, v1)
+
+    denominator = d00 * d11 - d01 * d01
+    # degenerate triangles get all their weight on the first corner
+    degenerate = np.abs(denominator) < np.finfo(np.float64).tiny
+    denominator[degenerate] = 1.0
+
+    w1 = (d11 * d20 - d01 * d21) / denominator
+    w2 = (d00 * d21 - d01 * d20) / denominator
+    w1[degenerate] = 0.0
+    w2[degenerate] = 0.0
+
+    return np.column_stack((1 - w1 - w2, w1, w2))
+
+
+def rasterize_uv_faces(
+    uv: np.ndarray,
+    faces: np.ndarray,
+    image_shape: tuple[int, ...],
+    chunk_pixels: int = UVMappingParameters.RASTER_CHUNK_PIXELS,
+    region: tuple[slice, slice] | None = None,
+) -> np.ndarray:
+    """
+    Rasterizes the mesh triangles into texture space.
+
+    Returns an (H, W) int32 map holding, for every texel, the index of the triangle
+    covering its center, or -1 where no triangle is mapped to the texel. With a (row,
+    column) `region` of the image, only that region is rasterized and the map has its shape.
+    """
+    height, width = image_shape[0:2]
+    if region is None:
+        region = (slice(0, height), slice(0, width))
+    rows, columns = region
+    face_index_map = np.full((rows.stop - rows.start, columns.stop - columns.start), -1, np.int32)
+    # the candidate pixels of a chunk take several times the memory of the map itself; keep
+    # them to a fraction of the region so that small regions stay small
+    chunk_pixels = max(1, min(chunk_pixels, face_index_map.size // 16))
+
+    if len(faces) == 0 or face_index_map.size == 0:
+        return face_index_map
+
+    # triangle corners in (continuous) pixel coordinates
+    corners = uv[faces]
+    corners_x = corners[..., 0] * width - 0.5
+    corners_y = (1 - corners[..., 1]) * height - 0.5
+
+    # only the triangles whose pixel bounding box overlaps the region are rasterized
+    x0 = np.ceil(corners_x.min(axis=1))
+    x1 = np.floor(corners_x.max(axis=1))
+    y0 = np.ceil(corners_y.min(axis=1))
+    y1 = np.floor(corners_y.max(axis=1))
+    region_faces = np.flatnonzero(
+        (x0 < columns.stop) & (x1 >= columns.start) & (y0 < rows.stop) & (y1 >= rows.start)
+    )
+    if len(region_faces) == 0:
+        return face_index_map
+    corners_x, corners_y = corners_x[region_faces], corners_y[region_faces]
+
+    # pixel bounding box of every triangle, clipped to the region
+    x0 = np.clip(x0[region_faces], columns.start, columns.stop - 1).astype(np.int64)
+    x1 = np.clip(x1[region_faces], columns.start, columns.stop - 1).astype(np.int64)
+    y0 = np.clip(y0[region_faces], rows.start, rows.stop - 1).astype(np.int64)
+    y1 = np.clip(y1[region_faces], rows.start, rows.stop - 1).astype(np.int64)
+
+    box_widths = np.maximum(x1 - x0 + 1, 0)
+    box_heights = np.maximum(y1 - y0 + 1, 0)
+    box_sizes = box_widths * box_heights
+
+    edge_coefficients = _compute_edge_coefficients(corners_x, corners_y)
+
+    # process the triangles in chunks so that the candidate pixels stay bounded in memory
+    cumulative_sizes = np.cumsum(box_sizes)
+    chunk_bounds = np.searchsorted(
+        cumulative_sizes, np.arange(chunk_pixels, cumulative_sizes[-1], chunk_pixels)
+    )
+    chunk_bounds = np.unique(np.concatenate(([0], chunk_bounds, [len(region_faces)])))
+
+    for start, stop in zip(chunk_bounds[:-1], chunk_bounds[1:]):
+        face_ids = np.arange(start, stop)
+        face_ids = face_ids[box_sizes[face_ids] > 0]
+        if len(face_ids) == 0:
+            continue
+
+        # scanline rows of the triangle bounding boxes
+        heights = box_heights[face_ids]
+        row_faces = np.repeat(face_ids, heights)
+        row_offsets = np.arange(len(row_faces)) - np.repeat(np.cumsum(heights) - heights, heights)
+        ys = y0[row_faces] + row_offsets
+
+        # a texel center is inside the triangle when all three edge functions
+        # a*x + b*y + c are non-negative; solve for the covered x-span of each row
+        coefficients = edge_coefficients[row_faces]
+        a = coefficients[:, :, 0]
+        rhs = -(coefficients[:, :, 1] * ys[:, np.newaxis] + coefficients[:, :, 2])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bounds = rhs / a
+        lower = np.where(a > 0, bounds, -np.inf).max(axis=1)
+        upper = np.where(a < 0, bounds, np.inf).min(axis=1)
+        empty_rows = np.any((a == 0) & (rhs > 0), axis=1)
+
+        xs_start = np.maximum(np.ceil(lower), x0[row_faces]).astype(np.int64)
+        xs_stop = np.minimum(np.floor(upper), x1[row_faces]).astype(np.int64)
+        spans = np.where(empty_rows, 0, np.maximum(xs_stop - xs_start + 1, 0))
+
+        # expand the row spans to texels
+        span_offsets = np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+        xs = np.repeat(xs_start, spans) + span_offsets
+        face_index_map[np.repeat(ys, spans) - rows.start, xs - columns.start] = np.repeat(
+            region_faces[row_faces], spans
+        )
+
+    return face_index_map
+
+
+def _compute_edge_coefficients(corners_x: np.ndarray, corners_y: np.ndarray) -> np.ndarray:
+    """
+    Computes the (F, 3, 3) coefficients (a, b, c) of the edge functions a*x + b*y + c of
+    every triangle, oriented to be positive inside the triangle.
+    """
+    x1, y1 = corners_x, corners_y
+    x2, y2 = np.roll(corners_x, -1, axis=1), np.roll(corners_y, -1, axis=1)
+
+    a = -(y2 - y1)
+    b = x2 - x1
+    c = (y2 - y1) * x1 - (x2 - x1) * y1
+
+    # orient the edges by the sign of the triangle area; degenerate triangles cover nothing
+    area = (x2[:, 0] - x1[:, 0]) * (corners_y[:, 2] - y1[:, 0]) - (y2[:, 0] - y1[:, 0]) * (
+        corners_x[:, 2] - x1[:, 0]
+    )
+    orientation = np.sign(area)[:, np.newaxis]
+
+    coefficients = np.stack((a, b, c), axis=-1) * orientation[..., np.newaxis]
+    # small slack so that texel centers lying exactly on an edge are not dropped
+    coefficients[..., 2] += UVMappingParameters.EDGE_TOLERANCE * np.abs(area)[:, np.newaxis]
+    coefficients[orientation[:, 0] == 0, :, 2] = -1.0
+
+    return coefficients
+
+
+def map_pixels_to_surface(
+    pixels: np.ndarray,
+    face_index_map: np.ndarray,
+    uv: np.ndarray,
+    faces: np.ndarray,
+    vertices: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Maps (x, y) pixel coordinates to points on the mesh surface.
+
+    The surface point is interpolated inside the triangle covering the pixel with
+    barycentric weights. Returns the (N, 3) points and a boolean mask of the pixels
+    that are covered by a triangle; uncovered pixels are left as NaN.
+    """
+    pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+    xs, ys = _get_texel_indices(pixels, face_index_map.shape)
+    return _interpolate_surface_points(
+        pixels, face_index_map[ys, xs], face_index_map.shape, uv, faces, vertices
+    )
+
+
+def map_pixels_to_surface_by_tiles(
+    pixels: np.ndarray,
+    image_shape: tuple[int, ...],
+    uv: np.ndarray,
+    faces: np.ndarray,
+    vertices: np.ndarray,
+    tile_size: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Maps pixels to the surface like `map_pixels_to_surface`, but rasterizes only the
+    tile_size x tile_size tiles of the image that hold a pixel, one tile at a time.
+    """
+    pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+    height, width = image_shape[0:2]
+    xs, ys = _get_texel_indices(pixels, image_shape)
+
+    face_ids = np.full(len(pixels), -1, dtype=np.int64)
+    tiles = (ys // tile_size) * ((width + tile_size - 1) // tile_size) + xs // tile_size
+    for tile in np.unique(tiles):
+        in_tile = tiles == tile
+        y0 = ys[in_tile][0] // tile_size * tile_size
+        x0 = xs[in_tile][0] // tile_size * tile_size
+        region = (slice(y0, min(y0 + tile_size, height)), slice(x0, min(x0 + tile_size, width)))
+        face_index_map = rasterize_uv_faces(uv, faces, image_shape, region=region)
+        face_ids[in_tile] = face_index_map[ys[in_tile] - y0, xs[in_tile] - x0]
+
+    return _interpolate_surface_points(pixels, face_ids, image_shape, uv, faces, vertices)
+
+
+def _get_texel_indices(
+    pixels: np.ndarray, image_shape: tuple[int, ...]
+) -> tuple[np.ndarray, np.ndarray]:
+    height, width = image_shape[0:2]
+    xs = np.clip(np.rint(pixels[:, 0]), 0, width - 1).astype(np.int64)
+    ys = np.clip(np.rint(pixels[:, 1]), 0, height - 1).astype(np.int64)
+    return xs, ys
+
+
+def _interpolate_surface_points(
+    pixels: np.ndarray,
+    face_ids: np.ndarray,
+    image_shape: tuple[int, ...],
+    uv: np.ndarray,
+    faces: np.ndarray,
+    vertices: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    found = face_ids >= 0
+
+    points = np.full((len(pixels), 3), np.nan)
+    if not np.any(found):
+        return points, found
+
+    triangles = faces[face_ids[found]]
+    weights = compute_barycentric_weights(
+        pixels_to_uv(pixels[found], image_shape),
+        uv[triangles[:, 0]],
+        uv[triangles[:, 1]],
+        uv[triangles[:, 2]],
+    )
+    points[found] = np.einsum("ij,ijk->ik", weights, vertices[triangles])
+
+    return points, found